@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .crud import get_data_version
+from .database import run_db
+
+CACHE_BACKEND = os.getenv('API_CACHE_BACKEND', 'local')
+CACHE_URL = os.getenv('API_CACHE_URL', 'redis://localhost:6379/0')
+CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '1024'))
+# Server-side lifetime of an entry; the data version invalidates it sooner
+CACHE_TTL = float(os.getenv('API_CACHE_TTL', '3600'))
+# Client/proxy freshness before revalidating with If-None-Match
+CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', '60'))
+# How long a looked-up data version is trusted before asking the database again
+DATA_VERSION_TTL = float(os.getenv('API_DATA_VERSION_TTL', '5'))
+
+
+class LocalCache:
+    """Thread-safe in-process cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Shared cache for several API workers; needs the optional ``redis`` package."""
+
+    def __init__(self, url=CACHE_URL, ttl=CACHE_TTL, prefix='telepharm:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._client.set(self.prefix + key, value, ex=int(ttl or self.ttl))
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+BACKENDS = {
+    'local': LocalCache,
+    'redis': RedisCache
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide response cache, creating the configured backend on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if CACHE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown API_CACHE_BACKEND {CACHE_BACKEND!r}; expected one of {sorted(BACKENDS)}")
+            _cache = BACKENDS[CACHE_BACKEND]()
+    return _cache
+
+
+def set_cache(cache):
+    """Plug in any object with get/set/clear, e.g. a shared backend or a test double."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+_version = (None, 0.0)
+
+
+async def current_data_version() -> int:
+    """Data version stamped by the pipeline, looked up at most every DATA_VERSION_TTL seconds."""
+    global _version
+    version, checked_at = _version
+    if version is None or time.monotonic() - checked_at > DATA_VERSION_TTL:
+        version = await run_db(get_data_version)
+        _version = (version, time.monotonic())
+    return version
+
+
+def request_key(request: Request) -> str:
+    """Cache key for a request: its path and sorted query parameters."""
+    return request.url.path + '?' + '&'.join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def make_etag(version: int, key: str) -> str:
+    """ETag that changes only when the data version does, so it can be checked without the query."""
+    return f'"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return '*' in tags or etag in tags
+
+
+async def cached_json(request: Request, load: Callable[[], Awaitable[Any]]) -> Response:
+    """Serve a JSON response from the cache, revalidating by ETag and filling the cache on a miss.
+
+    ``load`` may return pre-encoded JSON bytes, which are cached as they are.
+    Entries are keyed on the current data version, so bumping the version in
+    the database invalidates every cached response across all workers.
+    """
+    version = await current_data_version()
+    key = request_key(request)
+    etag = make_etag(version, key)
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={CACHE_MAX_AGE}'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cache = get_cache()
+    body = cache.get(f"{version}:{key}")
+    headers['X-Cache'] = 'HIT' if body is not None else 'MISS'
+    if body is None:
+        body = await load()
+        if not isinstance(body, bytes):
+            body = json.dumps(jsonable_encoder(body)).encode()
+        cache.set(f"{version}:{key}", body)
+    return Response(content=body, media_type='application/json', headers=headers)
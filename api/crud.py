@@ -1,122 +1,259 @@
-from typing import List
-from .schemas import TopProduct, ChannelActivity, MessageSearch
+from typing import List, Optional, Tuple
+from datetime import date
+from .encoding import cursor_columns, dump_cursor, dump_rows
+from .metrics import timed_query
+import base64
 import logging
-
-logging.basicConfig(
-    filename='api/logs/api.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+import psycopg2
 
 logger = logging.getLogger(__name__)
 
-def get_top_products(db, limit: int) -> List[TopProduct]:
-    """Get top products from messages and image classifications."""
-    with db.cursor() as cur:
+def get_data_version(db) -> int:
+    """Current data version bumped by the pipeline after dbt; 0 before the first bump."""
+    try:
+        with timed_query('get_data_version') as query, db.cursor() as cur:
+            cur.execute("SELECT version FROM raw.data_version")
+            row = cur.fetchone()
+            query.rows = cur.rowcount
+    except psycopg2.errors.UndefinedTable:
+        db.rollback()
+        return 0
+    return row[0] if row else 0
+
+def get_top_products(db, limit: int) -> bytes:
+    """Get top products from the pre-aggregated product-mention mart, as a JSON array of TopProduct.
+
+    Counts are distinct messages mentioning a product in text or image, built
+    incrementally by dbt from the product dictionary seed.
+    """
+    with timed_query('get_top_products') as query, db.cursor() as cur:
+        cur.execute("""
+            SELECT product, mention_count
+            FROM raw_marts.agg_top_products
+            ORDER BY mention_count DESC, product
+            LIMIT %s
+        """, (limit,))
+        query.rows = cur.rowcount
+        return dump_cursor(cur)
+
+def get_channel_activity(db, channel_name: str, date_from: Optional[date] = None, date_to: Optional[date] = None) -> bytes:
+    """Get daily posting activity for a channel from the incremental rollup marts, as a JSON array of ChannelActivity.
+
+    ``object_detections`` is aggregated to JSON text in Postgres and passed through unparsed.
+
+    ``date_from``/``date_to`` bound the days returned (inclusive); either may be omitted.
+    """
+    with timed_query('get_channel_activity') as query, db.cursor() as cur:
+        cur.execute("""
+            SELECT
+                a.date_id::TEXT AS date_id,
+                a.message_count,
+                a.image_count,
+                COALESCE(
+                    JSON_AGG(
+                        JSON_BUILD_OBJECT(
+                            'object_class', d.object_class,
+                            'detection_count', d.detection_count,
+                            'avg_confidence', d.avg_confidence
+                        ) ORDER BY d.detection_count DESC, d.object_class
+                    ) FILTER (WHERE d.object_class IS NOT NULL),
+                    '[]'
+                )::TEXT AS object_detections
+            FROM raw_marts.agg_channel_daily a
+            LEFT JOIN raw_marts.agg_channel_daily_detections d
+                ON d.channel_id = a.channel_id AND d.date_id = a.date_id
+            WHERE a.channel_name = %(channel_name)s
+              AND (%(date_from)s::DATE IS NULL OR a.date_id >= %(date_from)s::DATE)
+              AND (%(date_to)s::DATE IS NULL OR a.date_id <= %(date_to)s::DATE)
+            GROUP BY a.date_id, a.message_count, a.image_count
+            ORDER BY a.date_id DESC
+        """, {'channel_name': channel_name, 'date_from': date_from, 'date_to': date_to})
+        query.rows = cur.rowcount
+        return dump_cursor(cur, json_columns=('object_detections',))
+
+# Period lengths accepted by get_channel_comparison (Postgres DATE_TRUNC units)
+GRANULARITIES = ('day', 'week', 'month')
+
+def get_channel_comparison(db, channels: List[str], granularity: str = 'day', date_from: Optional[date] = None, date_to: Optional[date] = None) -> bytes:
+    """Activity series of several channels in one query, as a JSON array of ChannelComparison.
+
+    Days come from ``dim_dates``, so every channel gets a row for every
+    period in the range (zero counts included). Each row is truncated to
+    ``granularity`` (weeks start on Monday). Periods are labelled by their
+    first day, but only count days within [from, to]. Rows are ordered by
+    channel, then period. Channels sort in byte order (C collation), the
+    order Python's sorted() gives. Unknown channels are left out.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    with timed_query('get_channel_comparison') as query, db.cursor() as cur:
         cur.execute("""
-            WITH text_mentions AS (
+            WITH periods AS (
+                SELECT d.date_id::DATE AS date_id, DATE_TRUNC(%(granularity)s, d.date_id)::DATE AS period
+                FROM raw_marts.dim_dates d
+                WHERE (%(date_from)s::DATE IS NULL OR d.date_id >= %(date_from)s::DATE)
+                  AND (%(date_to)s::DATE IS NULL OR d.date_id <= %(date_to)s::DATE)
+            ),
+            channels AS (
+                SELECT channel_id, channel_name
+                FROM raw_marts.dim_channels
+                WHERE channel_name = ANY(%(channels)s)
+            ),
+            activity AS (
                 SELECT
-                    UNNEST(ARRAY['pill', 'cream', 'syringe', 'bottle']) AS product,
-                    COUNT(*) AS mention_count
-                FROM raw_marts.fct_messages
-                WHERE text ILIKE ANY (ARRAY['%pill%', '%cream%', '%syringe%', '%bottle%'])
-                GROUP BY product
-            ), image_mentions AS (
+                    c.channel_id,
+                    c.channel_name,
+                    p.period,
+                    COALESCE(SUM(a.message_count), 0)::BIGINT AS message_count,
+                    COALESCE(SUM(a.image_count), 0)::BIGINT AS image_count
+                FROM channels c
+                CROSS JOIN periods p
+                LEFT JOIN raw_marts.agg_channel_daily a
+                    ON a.channel_id = c.channel_id AND a.date_id = p.date_id
+                GROUP BY c.channel_id, c.channel_name, p.period
+            ),
+            detections AS (
                 SELECT
-                    object_class AS product,
-                    COUNT(*) AS mention_count
-                FROM raw_staging.stg_image_classifications
-                GROUP BY object_class
+                    d.channel_id,
+                    p.period,
+                    d.object_class,
+                    SUM(d.detection_count)::BIGINT AS detection_count,
+                    SUM(d.avg_confidence * d.detection_count) / SUM(d.detection_count) AS avg_confidence
+                FROM raw_marts.agg_channel_daily_detections d
+                JOIN channels c ON c.channel_id = d.channel_id
+                JOIN periods p ON p.date_id = d.date_id
+                GROUP BY d.channel_id, p.period, d.object_class
             )
             SELECT
-                COALESCE(t.product, i.product) AS product,
-                COALESCE(t.mention_count, 0) + COALESCE(i.mention_count, 0) AS mention_count
-            FROM text_mentions t
-            FULL OUTER JOIN image_mentions i ON t.product = i.product
-            ORDER BY mention_count DESC
-            LIMIT %s
-        """, (limit,))
-        results = cur.fetchall()
-        logger.info(f"DEBUG get_top_products: results = {results}")
-    return [TopProduct(product=row[0], mention_count=row[1]) for row in results]
+                a.channel_name,
+                a.period::TEXT AS period,
+                a.message_count,
+                a.image_count,
+                COALESCE(
+                    JSON_AGG(
+                        JSON_BUILD_OBJECT(
+                            'object_class', d.object_class,
+                            'detection_count', d.detection_count,
+                            'avg_confidence', d.avg_confidence
+                        ) ORDER BY d.detection_count DESC, d.object_class
+                    ) FILTER (WHERE d.object_class IS NOT NULL),
+                    '[]'
+                )::TEXT AS object_detections
+            FROM activity a
+            LEFT JOIN detections d ON d.channel_id = a.channel_id AND d.period = a.period
+            GROUP BY a.channel_name, a.period, a.message_count, a.image_count
+            ORDER BY a.channel_name COLLATE "C", a.period
+        """, {
+            'channels': list(channels),
+            'granularity': granularity,
+            'date_from': date_from,
+            'date_to': date_to
+        })
+        query.rows = cur.rowcount
+        return dump_cursor(cur, json_columns=('object_detections',))
+
+def encode_cursor(rank: float, message_id: int) -> str:
+    """Opaque keyset cursor for the last row of a search page."""
+    return base64.urlsafe_b64encode(f"{rank!r}:{message_id}".encode()).decode()
 
-def get_channel_activity(db, channel_name: str) -> List[ChannelActivity]:
-    """Get posting activity for a channel."""
-    with db.cursor() as cur:
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        rank, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return float(rank), int(message_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def search_messages(db, query: str, limit: int = 50, after: Optional[Tuple[float, int]] = None) -> Tuple[bytes, Optional[str]]:
+    """Ranked full-text + trigram search with keyset pagination.
+
+    Matches either the English/simple tsvector or a trigram-indexed substring
+    (which also covers Amharic text the English parser cannot stem). Returns
+    the page as a JSON array of MessageSearch and the cursor for the next one,
+    or None on the last page.
+    ``after`` is a decoded cursor: the (rank, message_id) of the previous page's last row.
+    """
+    after_rank, after_id = after or (None, None)
+    with timed_query('search_messages') as query, db.cursor() as cur:
         cur.execute("""
-            WITH
-                ic_agg AS (
-                    SELECT
-                        fm.date_id,
-                        d.date_id AS dim_date_id,
-                        ic.object_class,
-                        COUNT(ic.classification_id) AS detection_count,
-                        AVG(ic.confidence) AS avg_confidence
-                    FROM raw_marts.fct_messages fm
-                    JOIN raw_marts.dim_channels c ON fm.channel_id = c.channel_id
-                    JOIN raw_marts.dim_dates d ON fm.date_id = d.date_id
-                    LEFT JOIN raw_staging.stg_image_classifications ic ON fm.message_id = ic.message_id
-                    WHERE c.channel_name = %s AND ic.object_class IS NOT NULL
-                    GROUP BY fm.date_id, d.date_id, ic.object_class
-                ),
-                activity AS (
-                    SELECT
-                        d.date_id::TEXT,
-                        COUNT(fm.message_id) AS message_count,
-                        SUM(CASE WHEN fm.has_image THEN 1 ELSE 0 END) AS image_count,
-                        JSON_AGG(
-                            JSON_BUILD_OBJECT(
-                                'object_class', ic_agg.object_class,
-                                'detection_count', ic_agg.detection_count,
-                                'avg_confidence', ic_agg.avg_confidence
-                            )
-                        ) AS object_detections
-                    FROM raw_marts.fct_messages fm
-                    JOIN raw_marts.dim_channels c ON fm.channel_id = c.channel_id
-                    JOIN raw_marts.dim_dates d ON fm.date_id = d.date_id
-                    LEFT JOIN ic_agg ON fm.date_id = ic_agg.dim_date_id
-                    WHERE c.channel_name = %s
-                    GROUP BY d.date_id
-                    ORDER BY d.date_id DESC
-                )
+            WITH q AS (
+                SELECT websearch_to_tsquery('english', %(query)s)
+                    || websearch_to_tsquery('simple', %(query)s) AS tsq
+            ),
+            matches AS (
+                SELECT
+                    fm.message_id,
+                    fm.channel_id,
+                    fm.load_timestamp,
+                    fm.text,
+                    (ts_rank(fm.search_vector, q.tsq) + similarity(fm.text, %(query)s))::FLOAT8 AS rank
+                FROM raw_marts.fct_messages fm, q
+                WHERE fm.search_vector @@ q.tsq
+                   OR fm.text ILIKE %(pattern)s
+            )
             SELECT
-                date_id,
-                message_count,
-                image_count,
-                COALESCE(object_detections, '[]') AS object_detections
-            FROM activity
-        """, (channel_name, channel_name))
+                m.message_id::TEXT AS message_id,
+                c.channel_name,
+                m.load_timestamp::TEXT AS message_date,
+                m.text,
+                m.rank
+            FROM matches m
+            JOIN raw_marts.dim_channels c ON m.channel_id = c.channel_id
+            WHERE %(after_rank)s::FLOAT8 IS NULL
+               OR (m.rank, m.message_id) < (%(after_rank)s::FLOAT8, %(after_id)s::BIGINT)
+            ORDER BY m.rank DESC, m.message_id DESC
+            LIMIT %(limit)s
+        """, {
+            'query': query,
+            'pattern': f'%{query}%',
+            'after_rank': after_rank,
+            'after_id': after_id,
+            'limit': limit
+        })
         results = cur.fetchall()
-    return [
-        ChannelActivity(
-            date_id=row[0],
-            message_count=row[1],
-            image_count=row[2],
-            object_detections=row[3] or []
-        ) for row in results
-    ]
-
-def search_messages(db, query: str) -> List[MessageSearch]:
-    """Search messages by keyword."""
-    with db.cursor() as cur:
+        columns = cursor_columns(cur)
+        query.rows = len(results)
+    next_cursor = encode_cursor(results[-1][4], int(results[-1][0])) if len(results) == limit else None
+    return dump_rows(columns, results), next_cursor
+
+# Columns of the flat export: one row per message and detection
+EXPORT_COLUMNS = [
+    'message_id', 'channel_name', 'date_id', 'text', 'has_image', 'image_file',
+    'message_length', 'object_class', 'confidence', 'model_version'
+]
+
+def iter_export_batches(db, channel_name: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None, batch_size: int = 10_000):
+    """Yield lists of export rows (EXPORT_COLUMNS) from a server-side cursor.
+
+    Messages are left-joined with the current model's detections, so a message
+    with no detections appears once with NULL detection columns. Only
+    ``batch_size`` rows are held in memory at a time.
+    """
+    with timed_query('iter_export_batches') as query, db.cursor(name='export_messages') as cur:
+        cur.itersize = batch_size
         cur.execute("""
             SELECT
                 fm.message_id,
                 c.channel_name,
-                fm.load_timestamp::TEXT AS message_date,
-                fm.text
+                fm.date_id,
+                fm.text,
+                fm.has_image,
+                fm.image_file,
+                fm.message_length,
+                ic.object_class,
+                ic.confidence,
+                ic.model_version
             FROM raw_marts.fct_messages fm
             JOIN raw_marts.dim_channels c ON fm.channel_id = c.channel_id
-            WHERE fm.text ILIKE %s
-            ORDER BY fm.load_timestamp DESC
-            LIMIT 50
-        """, (f'%{query}%',))
-        results = cur.fetchall()
-    return [
-        MessageSearch(
-            message_id=row[0],
-            channel_name=row[1],
-            message_date=row[2],
-            text=row[3]
-        ) for row in results
-    ]
+            LEFT JOIN raw_staging.stg_image_classifications ic ON fm.message_id = ic.message_id
+            WHERE (%(channel_name)s::TEXT IS NULL OR c.channel_name = %(channel_name)s)
+              AND (%(date_from)s::DATE IS NULL OR fm.date_id >= %(date_from)s::DATE)
+              AND (%(date_to)s::DATE IS NULL OR fm.date_id <= %(date_to)s::DATE)
+            ORDER BY fm.message_id, ic.classification_id
+        """, {'channel_name': channel_name, 'date_from': date_from, 'date_to': date_to})
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            query.rows += len(rows)
+            yield rows
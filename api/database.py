@@ -1,6 +1,13 @@
 import psycopg2
+from psycopg2 import pool as pg_pool
 from dotenv import load_dotenv
 import os
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -14,10 +21,130 @@ db_params = {
     'port': os.getenv('POSTGRES_PORT')
 }
 
-def get_db():
-    """provide a database connection"""
-    conn = psycopg2.connect(**db_params, options="-c search_path=raw_marts,raw_staging,public")
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+# Seconds a request waits for a free connection before failing
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+# Connections idle longer than this are pinged before being handed out
+POOL_CHECK_AFTER = float(os.getenv('DB_POOL_CHECK_AFTER', '30'))
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool that waits when exhausted and health-checks idle connections."""
+
+    def __init__(self, minconn, maxconn, timeout=POOL_TIMEOUT, check_after=POOL_CHECK_AFTER, **connect_kwargs):
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.timeout = timeout
+        self.check_after = check_after
+
+    def getconn(self):
+        """Check out a healthy connection, replacing one that has gone stale."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        try:
+            conn = self._pool.getconn()
+            idle = time.monotonic() - self._last_used.get(id(conn), 0)
+            if idle > self.check_after and not self._is_healthy(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """Return a connection, resetting its transaction or closing it if broken."""
+        try:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+            if conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+        self._last_used.clear()
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    @staticmethod
+    def _is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                POOL_MIN,
+                POOL_MAX,
+                options="-c search_path=raw_marts,raw_staging,public",
+                **db_params
+            )
+    return _pool
+
+
+def close_pool():
+    """Close every pooled connection; called on application shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def pooled_connection():
+    """Check a connection out of the pool for the duration of a with-block."""
+    pool = get_pool()
+    conn = pool.getconn()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+
+# One executor thread per pooled connection, so offloaded queries never queue twice
+_executor = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix='db')
+
+
+def _call_with_connection(func, *args, **kwargs):
+    with pooled_connection() as conn:
+        return func(conn, *args, **kwargs)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking crud function on a pooled connection without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, functools.partial(_call_with_connection, func, *args, **kwargs)
+    )
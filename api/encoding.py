@@ -0,0 +1,56 @@
+from typing import Iterable, Iterator, Sequence
+
+import orjson
+
+# Rows fetched per round trip when encoding straight from a cursor
+FETCH_SIZE = 1000
+
+
+def encode_rows(columns: Sequence[str], rows: Iterable[tuple], json_columns: Sequence[str] = ()) -> Iterator[bytes]:
+    """Encode rows as JSON objects, one bytes value per row.
+
+    Columns listed in ``json_columns`` must already hold JSON text (e.g. a
+    ``JSON_AGG(...)::TEXT`` column) and are spliced in verbatim instead of
+    being parsed into Python objects and encoded again.
+    """
+    plain = [i for i, name in enumerate(columns) if name not in json_columns]
+    spliced = [(orjson.dumps(columns[i]), i) for i, name in enumerate(columns) if name in json_columns]
+    for row in rows:
+        encoded = orjson.dumps({columns[i]: row[i] for i in plain})
+        if not spliced:
+            yield encoded
+            continue
+        parts = [encoded[:-1]]
+        for key, i in spliced:
+            parts.append((b',' if len(parts) > 1 or plain else b'') + key + b':' + (row[i] or 'null').encode())
+        parts.append(b'}')
+        yield b''.join(parts)
+
+
+def iter_cursor(cur, fetch_size: int = FETCH_SIZE) -> Iterator[tuple]:
+    """Yield a cursor's rows in fetchmany batches."""
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def cursor_columns(cur) -> list:
+    return [column.name for column in cur.description]
+
+
+def dump_rows(columns: Sequence[str], rows: Iterable[tuple], json_columns: Sequence[str] = ()) -> bytes:
+    """Encode rows as a JSON array of objects."""
+    return b'[' + b','.join(encode_rows(columns, rows, json_columns)) + b']'
+
+
+def dump_cursor(cur, json_columns: Sequence[str] = ()) -> bytes:
+    """Encode an executed cursor's result as a JSON array without building intermediate models."""
+    return dump_rows(cursor_columns(cur), iter_cursor(cur), json_columns)
+
+
+def concat_arrays(parts: Iterable[bytes]) -> bytes:
+    """Join encoded JSON arrays into one, e.g. the results of queries fanned out in parallel."""
+    items = [part[1:-1] for part in parts if part != b'[]']
+    return b'[' + b','.join(items) + b']'
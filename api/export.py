@@ -0,0 +1,132 @@
+import io
+import os
+import csv
+import logging
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .crud import EXPORT_COLUMNS, iter_export_batches
+from .database import pooled_connection
+from .encoding import encode_rows
+
+logger = logging.getLogger(__name__)
+
+# Rows per server-side cursor fetch, and per streamed chunk / Parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv('API_EXPORT_BATCH_SIZE', '10000'))
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def ndjson_chunks(columns: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per batch."""
+    for rows in batches:
+        yield b'\n'.join(encode_rows(columns, rows)) + b'\n'
+
+
+def csv_chunks(columns: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('message_id', pa.int64()),
+        ('channel_name', pa.string()),
+        ('date_id', pa.date32()),
+        ('text', pa.string()),
+        ('has_image', pa.bool_()),
+        ('image_file', pa.string()),
+        ('message_length', pa.int32()),
+        ('object_class', pa.string()),
+        ('confidence', pa.float64()),
+        ('model_version', pa.string())
+    ])
+
+
+def parquet_chunks(columns: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Parquet file with one row group per batch, streamed as row groups are written.
+
+    Needs the optional ``pyarrow`` package.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            table = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+                schema=schema
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    'ndjson': ndjson_chunks,
+    'csv': csv_chunks,
+    'parquet': parquet_chunks
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def stream_export(fmt: str, channel_name: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Iterator[bytes]:
+    """Stream an export in ``fmt``, holding one pooled connection until the last chunk is sent."""
+    with pooled_connection() as conn:
+        batches = iter_export_batches(conn, channel_name, date_from, date_to, EXPORT_BATCH_SIZE)
+        try:
+            yield from ENCODERS[fmt](EXPORT_COLUMNS, batches)
+        except Exception as e:
+            # Headers are already sent, so the client only sees a truncated body
+            logger.error(f"Export failed mid-stream (format={fmt}, channel={channel_name}): {str(e)}")
+            raise
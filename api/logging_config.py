@@ -0,0 +1,43 @@
+import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+LOG_FILE = os.getenv('API_LOG_FILE', 'api/logs/api.log')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+def setup_logging(filename: str = LOG_FILE, level: int = logging.INFO) -> None:
+    """Send log records through an in-memory queue to a file written by a background thread.
+
+    Handlers on the request path only enqueue the record, so a slow disk never
+    blocks the event loop or a DB worker thread. Calling it again is a no-op.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(records))
+    _listener = QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records to the file and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
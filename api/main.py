@@ -1,26 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException
-from typing import List
-from .schemas import ChannelActivity, TopProduct, MessageSearch
-from .crud import get_top_products, get_channel_activity, search_messages
-from .database import get_db
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from datetime import date
+from .schemas import ChannelActivity, ChannelComparison, TopProduct, MessageSearch
+from .crud import (
+    GRANULARITIES, get_top_products, get_channel_activity, get_channel_comparison, search_messages, decode_cursor
+)
+from .database import get_pool, close_pool, run_db
+from .cache import cached_json
+from .encoding import concat_arrays
+from .export import EXPORT_FORMATS, parquet_available, stream_export
+from .logging_config import setup_logging
+from .metrics import observe_request, render_metrics
+import os
+import time
+import asyncio
 import logging
 
-# Set up logging
-logging.basicConfig(
-    filename='api/logs/api.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Log through a queue so file writes stay off the request path
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="TelePharm Insights API", version="1.0.0")
+# Channels per query when a comparison is fanned out over pooled connections
+COMPARE_CHUNK_SIZE = int(os.getenv('API_COMPARE_CHUNK_SIZE', '10'))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the connection pool on startup and close it on shutdown."""
+    get_pool()
+    logger.info("Database connection pool opened")
+    yield
+    close_pool()
+    logger.info("Database connection pool closed")
+
+app = FastAPI(title="TelePharm Insights API", version="1.0.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Observe each request's latency, labelled by route template rather than raw path."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        observe_request(request.method, route.path if route else "unmatched", status, time.perf_counter() - start)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/api/reports/top-products", response_model=List[TopProduct])
-async def top_products(limit: int = 10, db=Depends(get_db)):
+async def top_products(request: Request, limit: int = 10):
     """Get the most frequently mentioned products."""
     try:
-        results = get_top_products(db, limit)
+        results = await cached_json(request, lambda: run_db(get_top_products, limit))
         logger.info(f"Fetched top {limit} products")
         return results
     except Exception as e:
@@ -28,23 +68,109 @@ async def top_products(limit: int = 10, db=Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/channels/{channel_name}/activity", response_model=List[ChannelActivity])
-async def channel_activity(channel_name: str, db=Depends(get_db)):
-    """Get posting activity for a specific channel"""
+async def channel_activity(
+    request: Request,
+    channel_name: str,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
+    """Get daily posting activity for a specific channel, optionally within [from, to]."""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
     try:
-        results = get_channel_activity(db, channel_name)
+        results = await cached_json(
+            request, lambda: run_db(get_channel_activity, channel_name, date_from, date_to)
+        )
         logger.info(f"Fetched activity for channel={channel_name}")
         return results
     except Exception as e:
         logger.error(f"Error fetching activity for channel={channel_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/channels/compare", response_model=List[ChannelComparison])
+async def compare_channels(
+    request: Request,
+    channels: List[str] = Query(..., description="repeat for each channel: ?channels=a&channels=b"),
+    granularity: str = "day",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    parallel: bool = False
+):
+    """Compare the activity of several channels per day, week or month, optionally within [from, to].
+
+    All series come from one set-based query. With ``parallel``, channels are
+    split into chunks of API_COMPARE_CHUNK_SIZE and queried concurrently on
+    separate pooled connections.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    names = sorted(set(channels))
+    chunks = [names[i:i + COMPARE_CHUNK_SIZE] for i in range(0, len(names), COMPARE_CHUNK_SIZE)]
+
+    async def load():
+        if not parallel or len(chunks) == 1:
+            return await run_db(get_channel_comparison, names, granularity, date_from, date_to)
+        # Chunks hold consecutive names in Python's sort order, which the query's
+        # COLLATE "C" ordering matches, so concatenating keeps the channel order
+        parts = await asyncio.gather(*(
+            run_db(get_channel_comparison, chunk, granularity, date_from, date_to) for chunk in chunks
+        ))
+        return concat_arrays(parts)
+
+    try:
+        results = await cached_json(request, load)
+        logger.info(f"Compared {len(names)} channels by {granularity}")
+        return results
+    except Exception as e:
+        logger.error(f"Error comparing channels={names}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/search/messages", response_model=List[MessageSearch])
-async def search_messages_endpoint(query: str, db=Depends(get_db)):
-    """Search message containing a specific keyword."""
+async def search_messages_endpoint(
+    query: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """Search message containing a specific keyword, best matches first.
+
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next page.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        results = search_messages(db, query)
+        body, next_cursor = await run_db(search_messages, query, limit, after)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
         logger.info(f"Searched messages for query={query}")
-        return results
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"Error searching messages for query={query}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/export/messages")
+async def export_messages(
+    fmt: str = Query("ndjson", alias="format"),
+    channel: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
+    """Stream messages joined with their detections as NDJSON, CSV or Parquet.
+
+    Rows come from a server-side cursor in fixed-size batches, so memory stays
+    flat however many rows match.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    logger.info(f"Exporting messages as {fmt} for channel={channel} from={date_from} to={date_to}")
+    return StreamingResponse(
+        stream_export(fmt, channel, date_from, date_to),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="messages.{fmt}"'}
+    )
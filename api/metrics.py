@@ -0,0 +1,64 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+
+# Latency buckets from 1 ms to 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1_000, 5_000, 10_000, 100_000, 1_000_000)
+
+REQUEST_LATENCY = Histogram(
+    'telepharm_api_request_duration_seconds',
+    'API request latency until the response headers are sent',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+QUERY_DURATION = Histogram(
+    'telepharm_api_db_query_duration_seconds',
+    'Time spent in a crud function: query, fetch and encoding',
+    ['function'],
+    buckets=LATENCY_BUCKETS
+)
+QUERY_ROWS = Histogram(
+    'telepharm_api_db_query_rows',
+    'Rows returned by a crud function',
+    ['function'],
+    buckets=ROW_BUCKETS
+)
+
+
+class QueryStats:
+    """Row count filled in by the crud function being timed."""
+
+    def __init__(self):
+        self.rows = 0
+
+
+@contextmanager
+def timed_query(function: str) -> Iterator[QueryStats]:
+    """Record a crud function's duration and ``rows`` when it completes successfully."""
+    stats = QueryStats()
+    start = time.perf_counter()
+    yield stats
+    QUERY_DURATION.labels(function).observe(time.perf_counter() - start)
+    QUERY_ROWS.labels(function).observe(stats.rows)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of the API's metrics, and its content type.
+
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so every
+    worker's samples are merged into one scrape.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -14,8 +14,17 @@ class ChannelActivity(BaseModel):
     object_detections: List[dict]
 
 
+class ChannelComparison(BaseModel):
+    channel_name: str
+    period: str
+    message_count: int
+    image_count: int
+    object_detections: List[dict]
+
+
 class MessageSearch(BaseModel):
     message_id: str
     channel_name: str
     message_date: str
     text: str
+    rank: Optional[float] = None
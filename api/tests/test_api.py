@@ -13,6 +13,16 @@ async def test_top_products():
         assert "product" in response.json()[0]
         assert "mention_count" in response.json()[0]
 
+@pytest.mark.asyncio
+async def test_top_products_revalidation():
+    response = client.get("/api/reports/top-products?limit=5")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+    revalidated = client.get("/api/reports/top-products?limit=5", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
 @pytest.mark.asyncio
 async def test_channel_activity():
     response = client.get("/api/channels/Chemed123/activity")
@@ -24,6 +34,35 @@ async def test_channel_activity():
             assert "message_count" in response.json()[0]
             assert "object_detections" in response.json()[0]
 
+@pytest.mark.asyncio
+async def test_channel_activity_date_range():
+    response = client.get("/api/channels/Chemed123/activity?from=2025-01-01&to=2025-01-31")
+    assert response.status_code in [200, 500]
+    if response.status_code == 200:
+        for day in response.json():
+            assert "2025-01-01" <= day["date_id"] <= "2025-01-31"
+
+@pytest.mark.asyncio
+async def test_channel_activity_invalid_range():
+    response = client.get("/api/channels/Chemed123/activity?from=2025-02-01&to=2025-01-01")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_compare_channels():
+    response = client.get("/api/channels/compare?channels=tikvahpharma&channels=Chemed123&granularity=week")
+    assert response.status_code in [200, 500]
+    if response.status_code == 200:
+        rows = response.json()
+        assert [r["channel_name"] for r in rows] == sorted(r["channel_name"] for r in rows)
+        if rows:
+            assert {"period", "message_count", "image_count", "object_detections"} <= set(rows[0])
+
+@pytest.mark.asyncio
+async def test_compare_channels_invalid_params():
+    assert client.get("/api/channels/compare?channels=Chemed123&granularity=year").status_code == 400
+    assert client.get("/api/channels/compare?channels=Chemed123&from=2025-02-01&to=2025-01-01").status_code == 400
+    assert client.get("/api/channels/compare").status_code == 422
+
 @pytest.mark.asyncio
 async def test_search_messages():
     response = client.get("/api/search/messages?query=paracetamol")
@@ -32,3 +71,33 @@ async def test_search_messages():
     if response.json():
         assert "message_id" in response.json()[0]
         assert "channel_name" in response.json()[0]
+
+@pytest.mark.asyncio
+async def test_search_messages_pagination():
+    response = client.get("/api/search/messages?query=paracetamol&limit=2")
+    assert response.status_code == 200
+    assert len(response.json()) <= 2
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor:
+        next_page = client.get(f"/api/search/messages?query=paracetamol&limit=2&cursor={cursor}")
+        assert next_page.status_code == 200
+        first_ids = {row["message_id"] for row in response.json()}
+        assert not first_ids & {row["message_id"] for row in next_page.json()}
+
+@pytest.mark.asyncio
+async def test_search_messages_invalid_cursor():
+    response = client.get("/api/search/messages?query=paracetamol&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_messages_ndjson():
+    response = client.get("/api/export/messages?format=ndjson&from=2025-01-01&to=2025-01-31")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    for line in response.text.splitlines():
+        assert "message_id" in line
+
+@pytest.mark.asyncio
+async def test_export_messages_invalid_format():
+    response = client.get("/api/export/messages?format=xml")
+    assert response.status_code == 400
@@ -0,0 +1,24 @@
+import time
+from api.cache import LocalCache, make_etag
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"  # a is now the most recently used
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(max_entries=10, ttl=60)
+    cache.set("a", b"1", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_etag_changes_with_data_version():
+    key = "/api/reports/top-products?limit=5"
+    assert make_etag(1, key) == make_etag(1, key)
+    assert make_etag(1, key) != make_etag(2, key)
+    assert make_etag(1, key) != make_etag(1, "/api/reports/top-products?limit=10")
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from api import database
+from api.database import ConnectionPool, PoolTimeout, run_db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.pings += 1
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool."""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.pings = 0
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Every connection the pool opens, in order; psycopg2.connect is the fake factory."""
+    opened = []
+
+    def connect(*args, **kwargs):
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    monkeypatch.setattr(psycopg2, 'connect', connect)
+    return opened
+
+
+def test_idle_connection_is_pinged_and_kept_when_healthy(connections):
+    pool = ConnectionPool(1, 1, check_after=0)
+    conn = pool.getconn()
+    pings = conn.pings
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == pings + 1
+
+
+def test_recently_used_connection_is_not_pinged(connections):
+    pool = ConnectionPool(1, 1, check_after=60)
+    conn = pool.getconn()
+    pings = conn.pings
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == pings
+
+
+def test_stale_broken_connection_is_replaced_on_checkout(connections):
+    pool = ConnectionPool(1, 1, check_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed and not replacement.closed
+    assert len(connections) == 2
+
+
+def test_connection_broken_while_in_use_is_closed_on_return(connections):
+    pool = ConnectionPool(1, 1, check_after=60)
+    conn = pool.getconn()
+    conn.broken = True
+    pool.putconn(conn)
+    assert conn.closed
+
+    assert pool.getconn() is connections[1]
+
+
+def test_exhausted_pool_waits_then_times_out(connections):
+    pool = ConnectionPool(1, 1, timeout=0.05)
+    conn = pool.getconn()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - start >= 0.05
+
+    # A connection returned while waiting is handed to the waiter
+    threading.Timer(0.02, pool.putconn, args=(conn,)).start()
+    pool.timeout = 1
+    assert pool.getconn() is conn
+
+
+def test_failed_connect_releases_its_slot(connections, monkeypatch):
+    pool = ConnectionPool(0, 1, timeout=0.05)
+
+    def refuse(*args, **kwargs):
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(psycopg2, 'connect', refuse)
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+
+
+@pytest.mark.asyncio
+async def test_run_db_bounds_blocking_calls_and_keeps_the_loop_responsive(monkeypatch):
+    @contextmanager
+    def fake_connection():
+        yield object()
+
+    monkeypatch.setattr(database, 'pooled_connection', fake_connection)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def slow_query(conn, seconds):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(seconds)
+        with lock:
+            running.pop()
+        return seconds
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    calls = database.POOL_MAX * 2
+    tick_task = asyncio.create_task(ticker())
+    start = time.monotonic()
+    results = await asyncio.gather(*(run_db(slow_query, 0.1) for _ in range(calls)))
+    elapsed = time.monotonic() - start
+    tick_task.cancel()
+
+    assert results == [0.1] * calls
+    # At most one blocking call per pooled connection; the rest queue in the executor
+    assert max(peak) == database.POOL_MAX
+    assert elapsed >= 0.2
+    # The event loop kept running while every executor thread was blocked
+    assert ticks >= 10
@@ -0,0 +1,31 @@
+import json
+from api.encoding import concat_arrays, dump_rows
+
+def test_dump_rows_matches_json():
+    rows = [("pill", 3), ("cream", 1)]
+    assert json.loads(dump_rows(["product", "mention_count"], rows)) == [
+        {"product": "pill", "mention_count": 3},
+        {"product": "cream", "mention_count": 1}
+    ]
+
+def test_dump_rows_passes_json_columns_through():
+    detections = '[{"object_class": "pill", "detection_count": 2, "avg_confidence": 0.91}]'
+    rows = [("2025-01-01", 4, detections), ("2025-01-02", 0, None)]
+    body = dump_rows(["date_id", "message_count", "object_detections"], rows, json_columns=("object_detections",))
+    assert detections.encode() in body
+    assert json.loads(body) == [
+        {"date_id": "2025-01-01", "message_count": 4, "object_detections": json.loads(detections)},
+        {"date_id": "2025-01-02", "message_count": 0, "object_detections": None}
+    ]
+
+def test_dump_rows_only_json_columns():
+    body = dump_rows(["a", "b"], [('{"x": 1}', '[1, 2]')], json_columns=("a", "b"))
+    assert json.loads(body) == [{"a": {"x": 1}, "b": [1, 2]}]
+
+def test_dump_rows_empty():
+    assert dump_rows(["product"], []) == b"[]"
+
+def test_concat_arrays_skips_empty_parts():
+    parts = [dump_rows(["a"], [(1,), (2,)]), b"[]", dump_rows(["a"], [(3,)])]
+    assert json.loads(concat_arrays(parts)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert concat_arrays([b"[]", b"[]"]) == b"[]"
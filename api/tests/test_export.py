@@ -0,0 +1,39 @@
+import io
+import csv
+import json
+import datetime
+import pytest
+from api.crud import EXPORT_COLUMNS
+from api.export import csv_chunks, ndjson_chunks, parquet_chunks
+
+ROWS = [
+    (i, "Chemed123", datetime.date(2025, 1, 1 + i % 28), f"msg {i}", i % 2 == 0, None, 5,
+     "pill" if i % 3 else None, 0.8 if i % 3 else None, "yolov8n" if i % 3 else None)
+    for i in range(25)
+]
+
+def batches():
+    return iter([ROWS[:10], ROWS[10:20], ROWS[20:]])
+
+def test_ndjson_one_chunk_per_batch():
+    chunks = list(ndjson_chunks(EXPORT_COLUMNS, batches()))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).splitlines()
+    assert [json.loads(line)["message_id"] for line in lines] == list(range(25))
+
+def test_csv_has_header_and_all_rows():
+    text = b"".join(csv_chunks(EXPORT_COLUMNS, batches())).decode()
+    records = list(csv.DictReader(io.StringIO(text)))
+    assert len(records) == 25
+    assert records[0]["channel_name"] == "Chemed123"
+
+def test_csv_empty_export_is_header_only():
+    text = b"".join(csv_chunks(EXPORT_COLUMNS, iter([]))).decode()
+    assert text.strip() == ",".join(EXPORT_COLUMNS)
+
+def test_parquet_streams_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = b"".join(parquet_chunks(EXPORT_COLUMNS, batches()))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.num_row_groups == 3
+    assert parquet.read().column("message_id").to_pylist() == list(range(25))
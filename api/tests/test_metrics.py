@@ -0,0 +1,38 @@
+import logging
+from logging.handlers import QueueHandler
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from api.main import app
+from api.metrics import timed_query
+
+client = TestClient(app)
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_metrics_endpoint_exposes_request_latency():
+    client.get("/api/export/messages?format=xml")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'telepharm_api_request_duration_seconds_count{method="GET",route="/api/export/messages",status="400"}'
+        in response.text
+    )
+
+def test_unmatched_paths_share_one_route_label():
+    before = sample("telepharm_api_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    after = sample("telepharm_api_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    assert after - before == 2
+
+def test_timed_query_records_duration_and_rows():
+    before = sample("telepharm_api_db_query_rows_sum", function="test_query")
+    with timed_query("test_query") as query:
+        query.rows = 42
+    assert sample("telepharm_api_db_query_rows_sum", function="test_query") - before == 42
+    assert sample("telepharm_api_db_query_duration_seconds_count", function="test_query") >= 1
+
+def test_logging_goes_through_a_queue():
+    assert any(isinstance(handler, QueueHandler) for handler in logging.getLogger().handlers)
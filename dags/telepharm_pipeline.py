@@ -1,98 +1,245 @@
-from dagster import job, op, ScheduleDefinition, get_dagster_logger
-import subprocess
+from dagster import (
+    AssetExecutionContext,
+    AssetKey,
+    AssetSelection,
+    DagsterRunStatus,
+    DailyPartitionsDefinition,
+    Definitions,
+    Failure,
+    MaterializeResult,
+    MetadataValue,
+    MultiPartitionKey,
+    MultiPartitionsDefinition,
+    RunRequest,
+    SkipReason,
+    StaticPartitionsDefinition,
+    asset,
+    define_asset_job,
+    get_dagster_logger,
+    multiprocess_executor,
+    run_status_sensor,
+    schedule
+)
 import os
+import sys
+import time
+import asyncio
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 logger = get_dagster_logger()
 
-@op
-def scrape_telegram_data(context):
-    """Run Telegram scraping script."""
-    logger.info("Starting Telegram scrape")
-    try:
-        result = subprocess.run(
-            ["python", "scripts/scrape_telegram.py"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info(f"Scrape completed: {result.stdout}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Scrape failed: {e.stderr}")
-        raise
-
-@op
-def load_raw_to_postgres(context):
-    """Load raw data to PostgreSQL."""
-    logger.info("Starting data load to PostgreSQL")
+# The pipeline steps are the scripts/ modules, imported and run in-process
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from channels import CHANNELS  # noqa: E402
+from pipeline_metrics import record_stage, push_metrics, timed_stage  # noqa: E402
+
+START_DATE = os.getenv('PIPELINE_START_DATE', '2025-01-01')
+# Steps of one run executing at the same time, each in its own process
+MAX_CONCURRENT_STEPS = int(os.getenv('PIPELINE_MAX_CONCURRENT_STEPS', '4'))
+DBT_ARGS = ['--project-dir', 'dbt/telepharm_dbt', '--profiles-dir', 'dbt']
+
+# One partition per scrape date and channel; end_offset=1 includes today
+partitions = MultiPartitionsDefinition({
+    'date': DailyPartitionsDefinition(start_date=START_DATE, end_offset=1),
+    'channel': StaticPartitionsDefinition(CHANNELS)
+})
+
+
+def partition_of(context):
+    """(date, channel) of the partition being materialized."""
+    keys = context.partition_key.keys_by_dimension
+    return keys['date'], keys['channel']
+
+
+def elapsed_since(start):
+    return MetadataValue.float(round(time.perf_counter() - start, 2))
+
+
+@asset(partitions_def=partitions, group_name='ingest')
+def telegram_messages(context: AssetExecutionContext):
+    """Scrape one channel into its date partition of the JSON lake.
+
+    Only today's partition is scraped. A past partition already holds what
+    was scraped that day; a backfill leaves it as it is so that loading and
+    enrichment can rerun.
+    """
+    from telegram_scraper import DATA_DIR, current_partition, scrape_partition
+
+    date_str, channel = partition_of(context)
+    if date_str != current_partition():
+        logger.warning(f"Not scraping past partition {channel} {date_str}; keeping its existing lake files")
+        return MaterializeResult(metadata={
+            'scraped': False,
+            'partition_dir': MetadataValue.path(str(DATA_DIR / date_str / channel))
+        })
+    start = time.perf_counter()
+    output_file = asyncio.run(scrape_partition(channel, date_str))
+    if output_file is None:
+        raise Failure(f"Scraping {channel} failed; see scripts/logs/scraping.log")
+    logger.info(f"Scraped {channel} into {output_file}")
+    return MaterializeResult(metadata={
+        'scraped': True,
+        'seconds': elapsed_since(start),
+        'output_file': MetadataValue.path(str(output_file))
+    })
+
+
+@asset(partitions_def=partitions, deps=[telegram_messages], group_name='ingest')
+def raw_telegram_messages(context: AssetExecutionContext):
+    """Bulk-load the partition's lake files into raw.telegram_messages, skipping files already loaded."""
+    import psycopg2
+    from load_to_postgres import (
+        db_params, create_raw_table, create_manifest_table, fetch_manifest, lake_files, plan_files, load_files
+    )
+
+    date_str, channel = partition_of(context)
+    start = time.perf_counter()
+    conn = psycopg2.connect(**db_params)
     try:
-        result = subprocess.run(
-            ["python", "scripts/load_to_postgres.py"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info(f"Load completed: {result.stdout}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Load failed: {e.stderr}")
-        raise
-
-@op
-def run_yolo_enrichment(context):
-    """Run YOLOv8 enrichment on images."""
-    logger.info("Starting YOLOv8 enrichment")
+        create_raw_table(conn)
+        create_manifest_table(conn)
+        with timed_stage('load', channel) as items:
+            pending = plan_files(lake_files('json', date_str, channel), fetch_manifest(conn), conn)
+            summary = load_files(pending, conn, bulk=True)
+            items.update(summary)
+    finally:
+        conn.close()
+    push_metrics('load', channel=channel)
+    if summary['failed']:
+        raise Failure(f"{summary['failed']} file(s) failed to load for {channel} on {date_str}")
+    logger.info(f"Loaded {channel} {date_str}: {summary}")
+    return MaterializeResult(metadata={
+        'seconds': elapsed_since(start),
+        **{key: MetadataValue.int(value) for key, value in summary.items()}
+    })
+
+
+@asset(partitions_def=partitions, deps=[raw_telegram_messages], group_name='ingest')
+def image_detections(context: AssetExecutionContext):
+    """Run YOLO over the partition's images not yet classified by the current model."""
+    import psycopg2
+    from load_to_postgres import db_params
+    from enrich_with_yolo import WORKER_SOCKET, create_classifications_table, enrich_images, get_detector
+
+    date_str, channel = partition_of(context)
+    start = time.perf_counter()
+    # Loaded before connecting, so a detector that fails to load leaks no connection
+    detector = get_detector(WORKER_SOCKET)
+    model_version = detector.model_version
     try:
-        result = subprocess.run(
-            ["python", "scripts/enrich_with_yolo.py"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info(f"Enrichment completed: {result.stdout}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Enrichment failed: {e.stderr}")
-        raise
-
-@op
-def run_dbt_transformations(context):
-    """Run dbt transformations and tests."""
-    logger.info("Starting dbt run")
+        conn = psycopg2.connect(**db_params)
+        try:
+            create_classifications_table(conn)
+            stats = enrich_images(conn, detector, channel=channel, scrape_date=date_str)
+        finally:
+            conn.close()
+    finally:
+        detector.close()
+    push_metrics('enrich', channel=channel)
+    logger.info(f"Enriched {channel} {date_str}: {stats}")
+    return MaterializeResult(metadata={
+        'seconds': elapsed_since(start),
+        'model_version': model_version,
+        'images': MetadataValue.int(stats['images']),
+        'detections': MetadataValue.int(stats['detections']),
+        'reused': MetadataValue.int(stats['reused']),
+        'failed': MetadataValue.int(stats['failed']),
+        'images_per_sec': MetadataValue.float(float(stats['images_per_sec']))
+    })
+
+
+def invoke_dbt(*args):
+    """Run a dbt command in-process and return its wall-clock seconds."""
+    from dbt.cli.main import dbtRunner
+
+    start = time.perf_counter()
+    result = dbtRunner().invoke([*args, *DBT_ARGS])
+    if not result.success:
+        raise Failure(f"dbt {' '.join(args)} failed: {result.exception}")
+    return round(time.perf_counter() - start, 2)
+
+
+@asset(deps=[raw_telegram_messages, image_detections], group_name='transform')
+def dbt_marts(context: AssetExecutionContext):
+    """Build and test the incremental dbt marts, then bump the API's data version."""
+    import psycopg2
+    from load_to_postgres import db_params
+    from data_version import create_data_version_table, bump_data_version
+
+    timings = {}
+    for command in ('seed', 'run', 'test'):
+        timings[f"dbt_{command}_seconds"] = invoke_dbt(command)
+        record_stage(f"dbt_{command}", timings[f"dbt_{command}_seconds"])
+    push_metrics('transform')
+    conn = psycopg2.connect(**db_params)
     try:
-        run_result = subprocess.run(
-            ["make", "dbt-run"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info(f"dbt run completed: {run_result.stdout}")
+        create_data_version_table(conn)
+        version = bump_data_version(conn)
+    finally:
+        conn.close()
+    logger.info(f"dbt marts built {timings}; data version is now {version}")
+    return MaterializeResult(metadata={
+        **{key: MetadataValue.float(value) for key, value in timings.items()},
+        'data_version': MetadataValue.int(version)
+    })
+
+
+# Scrape -> load -> enrich for one (date, channel) partition; concurrent partition
+# runs process channels in parallel, each step in its own process.
+telepharm_pipeline = define_asset_job(
+    'telepharm_pipeline',
+    selection=AssetSelection.assets(telegram_messages, raw_telegram_messages, image_detections),
+    partitions_def=partitions,
+    executor_def=multiprocess_executor.configured({'max_concurrent': MAX_CONCURRENT_STEPS})
+)
+
+telepharm_transform = define_asset_job(
+    'telepharm_transform',
+    selection=AssetSelection.assets(dbt_marts)
+)
 
-        test_result = subprocess.run(
-            ["make", "dbt-test"],
-            check=True,
-            capture_output=True,
-            text=True
+
+# Daily at 08:00 UTC: one run per channel for today's partition
+@schedule(job=telepharm_pipeline, cron_schedule="0 8 * * *", execution_timezone="UTC")
+def telepharm_schedule(context):
+    date_str = context.scheduled_execution_time.strftime('%Y-%m-%d')
+    for channel in CHANNELS:
+        yield RunRequest(
+            run_key=f"{date_str}|{channel}",
+            partition_key=MultiPartitionKey({'date': date_str, 'channel': channel})
         )
-        logger.info(f"dbt test completed: {test_result.stdout}")
-        return run_result.stdout + test_result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error(f"dbt failed: {e.stderr}")
-        raise
-
-@job
-def telepharm_pipeline():
-    """Define the TelePharm Insights pipeline."""
-    scrape_output = scrape_telegram_data()
-    load_output = load_raw_to_postgres(scrape_output)
-    enrich_output = run_yolo_enrichment(load_output)
-    run_dbt_transformations(enrich_output)
-
-# Daily schedule at 08:00 UTC
-telepharm_schedule = ScheduleDefinition(
-    job=telepharm_pipeline,
-    cron_schedule="0 8 * * *",
-    execution_timezone="UTC"
+
+
+@run_status_sensor(
+    run_status=DagsterRunStatus.SUCCESS,
+    monitored_jobs=[telepharm_pipeline],
+    request_job=telepharm_transform
+)
+def transform_when_date_complete(context):
+    """Rebuild the marts once every channel of the finished run's date has been enriched.
+
+    A backfill of a single partition of a completed date also triggers a rebuild.
+    """
+    partition_key = context.dagster_run.tags.get('dagster/partition')
+    if not partition_key:
+        return SkipReason("Run has no partition")
+    date_str = partitions.get_partition_key_from_str(partition_key).keys_by_dimension['date']
+    enriched = context.instance.get_materialized_partitions(AssetKey('image_detections'))
+    missing = [
+        channel for channel in CHANNELS
+        if MultiPartitionKey({'date': date_str, 'channel': channel}) not in enriched
+    ]
+    if missing:
+        return SkipReason(f"Waiting for {', '.join(missing)} on {date_str}")
+    return RunRequest(run_key=f"transform-{context.dagster_run.run_id}")
+
+
+defs = Definitions(
+    assets=[telegram_messages, raw_telegram_messages, image_detections, dbt_marts],
+    jobs=[telepharm_pipeline, telepharm_transform],
+    schedules=[telepharm_schedule],
+    sensors=[transform_when_date_complete]
 )
@@ -0,0 +1,22 @@
+{#
+    Create an index on a relation unless an equivalent one already exists.
+
+    Indexes are left unnamed so Postgres picks a free name; on a full rebuild
+    the previous table (and its indexes) may still exist under a backup name,
+    which would make a fixed "CREATE INDEX IF NOT EXISTS <name>" a no-op.
+#}
+{% macro ensure_index(relation, method, expression) %}
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_indexes
+        WHERE schemaname = '{{ relation.schema }}'
+          AND tablename = '{{ relation.identifier }}'
+          AND indexdef LIKE '%USING {{ method }} ({{ expression }})%'
+    ) THEN
+        CREATE INDEX ON {{ relation }} USING {{ method }} ({{ expression }});
+    END IF;
+END
+$$
+{% endmacro %}
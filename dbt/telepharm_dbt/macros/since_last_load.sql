@@ -0,0 +1,15 @@
+{#
+    Incremental filter: rows loaded after the newest row already in {{ this }},
+    minus the late_arrival_lookback_hours window.
+
+    load_timestamp is stamped when the loader's transaction starts, so a long
+    load can commit rows older than the current watermark; the lookback re-reads
+    that window, and the models' delete+insert unique keys make re-reading safe.
+#}
+{% macro since_last_load(column='load_timestamp', watermark='load_timestamp', where=none) %}
+{{ column }} > (
+    SELECT COALESCE(MAX({{ watermark }}), '1900-01-01'::TIMESTAMP)
+    FROM {{ this }}
+    {% if where %}WHERE {{ where }}{% endif %}
+) - INTERVAL '{{ var("late_arrival_lookback_hours") }} hours'
+{% endmacro %}
@@ -0,0 +1,37 @@
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['channel_id', 'date_id'],
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ ensure_index(this, 'btree', 'channel_name, date_id') }}"
+    ]
+) }}
+
+-- Messages and images per channel and day, behind /api/channels/{name}/activity.
+-- Incremental runs recompute only the (channel, day) pairs that received new messages.
+{% if is_incremental() %}
+WITH touched AS (
+    SELECT DISTINCT channel_id, message_date::DATE AS date_id
+    FROM {{ ref('stg_telegram_messages') }}
+    WHERE {{ since_last_load('load_timestamp', 'last_load_timestamp') }}
+)
+{% endif %}
+SELECT
+    m.channel_id,
+    m.channel AS channel_name,
+    m.message_date::DATE AS date_id,
+    COUNT(*) AS message_count,
+    COUNT(*) FILTER (WHERE m.has_image) AS image_count,
+    MIN(m.message_date) AS first_message_at,
+    MAX(m.message_date) AS last_message_at,
+    MAX(m.load_timestamp) AS last_load_timestamp
+FROM {{ ref('stg_telegram_messages') }} m
+{% if is_incremental() %}
+-- Range predicate so the (channel_id, message_date) index on staging is usable
+JOIN touched t
+    ON m.channel_id = t.channel_id
+   AND m.message_date >= t.date_id
+   AND m.message_date < t.date_id + 1
+{% endif %}
+GROUP BY m.channel_id, m.channel, m.message_date::DATE
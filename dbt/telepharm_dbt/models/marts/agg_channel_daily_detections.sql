@@ -0,0 +1,36 @@
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['channel_id', 'date_id'],
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ ensure_index(this, 'btree', 'channel_id, date_id') }}"
+    ]
+) }}
+
+-- Detections per channel, day and object class. Keyed on (channel, day) so a
+-- recomputed day replaces all of its classes, including ones that disappeared.
+{% if is_incremental() %}
+WITH touched AS (
+    SELECT DISTINCT m.channel_id, m.message_date::DATE AS date_id
+    FROM {{ ref('stg_image_classifications') }} ic
+    JOIN {{ ref('stg_telegram_messages') }} m ON ic.message_id = m.message_id
+    WHERE {{ since_last_load('ic.load_timestamp', 'last_load_timestamp') }}
+)
+{% endif %}
+SELECT
+    m.channel_id,
+    m.message_date::DATE AS date_id,
+    ic.object_class,
+    COUNT(*) AS detection_count,
+    AVG(ic.confidence) AS avg_confidence,
+    MAX(ic.load_timestamp) AS last_load_timestamp
+FROM {{ ref('stg_image_classifications') }} ic
+JOIN {{ ref('stg_telegram_messages') }} m ON ic.message_id = m.message_id
+{% if is_incremental() %}
+JOIN touched t
+    ON m.channel_id = t.channel_id
+   AND m.message_date >= t.date_id
+   AND m.message_date < t.date_id + 1
+{% endif %}
+GROUP BY m.channel_id, m.message_date::DATE, ic.object_class
@@ -0,0 +1,14 @@
+{{ config(
+    materialized='table',
+    schema='marts'
+) }}
+
+-- Small pre-aggregated table behind /api/reports/top-products.
+-- A message counts once per product, whether mentioned in text, image or both.
+SELECT
+    product,
+    COUNT(DISTINCT message_id) AS mention_count,
+    COUNT(*) FILTER (WHERE source = 'text') AS text_mentions,
+    COUNT(*) FILTER (WHERE source = 'image') AS image_mentions
+FROM {{ ref('fct_product_mentions') }}
+GROUP BY product
@@ -1,13 +1,24 @@
 {{ config(
-    materialized='table',
-    schema='marts'
+    materialized='incremental',
+    schema='marts',
+    unique_key='channel_id',
+    incremental_strategy='delete+insert'
 ) }}
 
-SELECT DISTINCT
+-- Built from the daily rollup, so a run only re-aggregates a few rows per channel-day
+SELECT
     channel_id,
-    channel AS channel_name,
-    MIN(message_date) AS first_message_date,
-    MAX(message_date) AS last_message_date,
-    COUNT(*) AS total_messages
-FROM {{ ref('stg_telegram_messages') }}
-GROUP BY channel_id, channel
+    channel_name,
+    MIN(first_message_at) AS first_message_date,
+    MAX(last_message_at) AS last_message_date,
+    SUM(message_count) AS total_messages,
+    MAX(last_load_timestamp) AS last_load_timestamp
+FROM {{ ref('agg_channel_daily') }}
+{% if is_incremental() %}
+WHERE channel_id IN (
+    SELECT channel_id
+    FROM {{ ref('agg_channel_daily') }}
+    WHERE {{ since_last_load('last_load_timestamp', 'last_load_timestamp') }}
+)
+{% endif %}
+GROUP BY channel_id, channel_name
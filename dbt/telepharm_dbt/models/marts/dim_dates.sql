@@ -1,12 +1,15 @@
 {{ config(
-    materialized='table',
-    schema='marts'
+    materialized='incremental',
+    schema='marts',
+    unique_key='date_id',
+    incremental_strategy='delete+insert'
 ) }}
 
+-- Bounds come from the daily rollup; incremental runs only add dates not yet present
 WITH date_range AS (
     SELECT generate_series(
-        (SELECT MIN(message_date)::DATE FROM {{ ref('stg_telegram_messages') }}),
-        (SELECT MAX(message_date)::DATE FROM {{ ref('stg_telegram_messages') }}),
+        (SELECT MIN(date_id) FROM {{ ref('agg_channel_daily') }}),
+        (SELECT MAX(date_id) FROM {{ ref('agg_channel_daily') }}),
         INTERVAL '1 day'
     ) AS date
 )
@@ -22,3 +25,6 @@ SELECT
         ELSE FALSE
     END AS is_weekend
 FROM date_range
+{% if is_incremental() %}
+WHERE date NOT IN (SELECT date_id FROM {{ this }})
+{% endif %}
@@ -1,6 +1,13 @@
 {{ config(
-    materialized='table',
-    schema='marts'
+    materialized='incremental',
+    schema='marts',
+    unique_key='message_id',
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ ensure_index(this, 'btree', 'message_id') }}",
+        "{{ ensure_index(this, 'gin', 'text gin_trgm_ops') }}",
+        "{{ ensure_index(this, 'gin', 'search_vector') }}"
+    ]
 ) }}
 
 SELECT
@@ -11,7 +18,12 @@ SELECT
     m.has_image,
     m.image_file,
     m.message_length,
-    m.load_timestamp
+    m.load_timestamp,
+    -- English stemming plus a language-agnostic token pass for Amharic
+    to_tsvector('english', m.text) || to_tsvector('simple', m.text) AS search_vector
 FROM {{ ref('stg_telegram_messages') }} m
 JOIN {{ ref('dim_channels') }} c ON m.channel_id = c.channel_id
 JOIN {{ ref('dim_dates') }} d ON m.message_date::DATE = d.date_id
+{% if is_incremental() %}
+WHERE {{ since_last_load('m.load_timestamp') }}
+{% endif %}
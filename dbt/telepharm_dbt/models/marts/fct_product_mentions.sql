@@ -0,0 +1,54 @@
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['message_id', 'product', 'source'],
+    incremental_strategy='delete+insert'
+) }}
+
+-- One row per message, product and source ('text' or 'image'), extracted once
+-- from the product dictionary seed and appended as new messages/detections land.
+WITH dictionary AS (
+    SELECT LOWER(product) AS product, LOWER(keyword) AS keyword
+    FROM {{ ref('product_dictionary') }}
+),
+new_messages AS (
+    SELECT message_id, channel_id, message_date::DATE AS date_id, text, load_timestamp
+    FROM {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    WHERE {{ since_last_load(where="source = 'text'") }}
+    {% endif %}
+),
+text_mentions AS (
+    SELECT DISTINCT
+        m.message_id,
+        m.channel_id,
+        m.date_id,
+        d.product,
+        'text' AS source,
+        m.load_timestamp
+    FROM new_messages m
+    JOIN dictionary d ON m.text ILIKE '%' || d.keyword || '%'
+),
+new_detections AS (
+    SELECT message_id, LOWER(object_class) AS product, load_timestamp
+    FROM {{ ref('stg_image_classifications') }}
+    WHERE LOWER(object_class) IN (SELECT product FROM dictionary)
+    {% if is_incremental() %}
+      AND {{ since_last_load(where="source = 'image'") }}
+    {% endif %}
+),
+image_mentions AS (
+    SELECT
+        nd.message_id,
+        m.channel_id,
+        m.message_date::DATE AS date_id,
+        nd.product,
+        'image' AS source,
+        MAX(nd.load_timestamp) AS load_timestamp
+    FROM new_detections nd
+    JOIN {{ ref('stg_telegram_messages') }} m ON nd.message_id = m.message_id
+    GROUP BY nd.message_id, m.channel_id, m.message_date::DATE, nd.product
+)
+SELECT * FROM text_mentions
+UNION ALL
+SELECT * FROM image_mentions
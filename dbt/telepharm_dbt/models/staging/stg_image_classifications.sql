@@ -9,6 +9,9 @@ SELECT
     image_file,
     object_class,
     confidence,
+    model_version,
+    image_hash,
     load_timestamp::TIMESTAMP
 FROM raw.image_classifications
 WHERE confidence >= 0.5  -- Filter low-confidence detections
+  AND model_version = '{{ var("yolo_model_version") }}'  -- Only the current model's detections
@@ -1,8 +1,16 @@
 {{ config(
-    materialized='view',
-    schema='staging'
+    materialized='incremental',
+    schema='staging',
+    unique_key='message_id',
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ ensure_index(this, 'btree', 'message_id') }}",
+        "{{ ensure_index(this, 'btree', 'load_timestamp') }}",
+        "{{ ensure_index(this, 'btree', 'channel_id, message_date') }}"
+    ]
 ) }}
 
+-- Materialized so every mart reads cleaned, indexed rows instead of re-deriving them from raw
 SELECT
     message_id,
     channel,
@@ -15,3 +23,6 @@ SELECT
     message_length,
     load_timestamp::TIMESTAMP
 FROM raw.telegram_messages
+{% if is_incremental() %}
+WHERE {{ since_last_load() }}
+{% endif %}
@@ -0,0 +1,7 @@
+-- Custom test: Ensure the incremental daily rollup still matches the message fact table
+SELECT a.channel_id, a.date_id, a.message_count, COUNT(fm.message_id) AS expected
+FROM {{ ref('agg_channel_daily') }} a
+LEFT JOIN {{ ref('fct_messages') }} fm
+    ON fm.channel_id = a.channel_id AND fm.date_id = a.date_id
+GROUP BY a.channel_id, a.date_id, a.message_count
+HAVING a.message_count != COUNT(fm.message_id)
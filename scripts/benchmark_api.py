@@ -0,0 +1,71 @@
+import sys
+import time
+import argparse
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = [
+    '/api/reports/top-products?limit=10',
+    '/api/channels/Chemed123/activity',
+    '/api/search/messages?query=paracetamol'
+]
+
+def timed_get(url):
+    """GET url and return (seconds, status)."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = 0
+    return time.perf_counter() - start, status
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run_load(base_url, path, requests, concurrency):
+    """Fire requests at one endpoint with a fixed number of in-flight clients."""
+    url = base_url.rstrip('/') + path
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed_get, [url] * requests))
+    elapsed = time.perf_counter() - start
+    latencies = [seconds * 1000 for seconds, _ in results]
+    return {
+        'path': path,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': sum(1 for _, status in results if status != 200),
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p99_ms': round(percentile(latencies, 99), 2)
+    }
+
+def main(argv=None):
+    """Load-test the API endpoints and print latency percentiles."""
+    parser = argparse.ArgumentParser(description="Load-test the TelePharm Insights API.")
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--requests', type=int, default=500, help="requests per endpoint and concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16], help="in-flight request levels to test")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    args = parser.parse_args(argv)
+
+    print(f"{'path':<45} {'conc':>5} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path in args.paths:
+        for concurrency in args.concurrency:
+            result = run_load(args.base_url, path, args.requests, concurrency)
+            print(
+                f"{result['path']:<45} {result['concurrency']:>5} {result['throughput_rps']:>8} "
+                f"{result['p50_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}"
+            )
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import sys
+import time
+import argparse
+import subprocess
+import psycopg2
+
+from load_to_postgres import db_params, create_raw_table
+from generate_synthetic_data import SYNTHETIC_ID_END, SYNTHETIC_ID_OFFSET
+
+# Synthetic rows use a dedicated channel and id range so they can be removed afterwards
+BENCH_CHANNEL = 'bench_dbt'
+BENCH_SENDER_ID = -1009999999999
+BENCH_ID_OFFSET = 8_000_000_000
+
+DBT_ARGS = ['--project-dir', 'dbt/telepharm_dbt', '--profiles-dir', 'dbt']
+
+WORDS = ['paracetamol', 'cream', 'pill', 'syringe', 'bottle', 'price', 'birr', 'አዲስ', 'መድሃኒት']
+
+def insert_days(conn, first_day, days, rows_per_day):
+    """Insert rows_per_day synthetic messages for each of `days` days starting at first_day.
+
+    Each day is stamped as loaded at the following midnight, as a daily scrape
+    would be. Stamping the whole history with the insert time would put all of
+    it inside the late-arrival lookback, so "incremental" runs would rebuild it.
+    """
+    words = ', '.join(f"'{w}'" for w in WORDS)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO raw.telegram_messages (
+                message_id, channel, scrape_date, message_date, sender_id,
+                text, has_image, image_file, message_length, load_timestamp
+            )
+            SELECT
+                %(offset)s + g,
+                %(channel)s,
+                DATE '2025-01-01' + %(days)s + %(first_day)s,
+                TIMESTAMP '2025-01-01'
+                    + (%(first_day)s + g / %(per_day)s) * INTERVAL '1 day'
+                    + (g %% %(per_day)s) * (INTERVAL '1 day' / %(per_day)s),
+                %(sender)s,
+                t.text,
+                g %% 3 = 0,
+                NULL,
+                LENGTH(t.text),
+                TIMESTAMP '2025-01-01' + (%(first_day)s + g / %(per_day)s + 1) * INTERVAL '1 day'
+            FROM generate_series(0, %(days)s * %(per_day)s - 1) AS g,
+            LATERAL (
+                SELECT string_agg((ARRAY[{words}])[1 + (g * 7 + w) %% {len(WORDS)}], ' ') AS text
+                FROM generate_series(1, 5 + g %% 30) AS w
+            ) AS t
+        """, {
+            'offset': BENCH_ID_OFFSET + first_day * rows_per_day,
+            'channel': BENCH_CHANNEL,
+            'first_day': first_day,
+            'days': days,
+            'per_day': rows_per_day,
+            'sender': BENCH_SENDER_ID
+        })
+    conn.commit()
+
+def clear_bench_rows(conn):
+    """Remove rows written by a previous benchmark pass."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM raw.telegram_messages WHERE channel = %s", (BENCH_CHANNEL,))
+    conn.commit()
+
+def hold_out_last_day(conn):
+    """Backdate the loaded synthetic lake to daily loads and set its last day aside.
+
+    The last day's messages and classifications move to temporary tables until
+    restore_held_day(). Returns (history rows, held-out rows).
+    """
+    ids = (SYNTHETIC_ID_OFFSET, SYNTHETIC_ID_END)
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE raw.telegram_messages SET load_timestamp = message_date::DATE + 1
+            WHERE message_id >= %s AND message_id < %s
+        """, ids)
+        cur.execute("""
+            UPDATE raw.image_classifications ic SET load_timestamp = m.load_timestamp
+            FROM raw.telegram_messages m
+            WHERE ic.message_id = m.message_id AND m.message_id >= %s AND m.message_id < %s
+        """, ids)
+        cur.execute("""
+            CREATE TEMP TABLE held_messages AS
+            SELECT * FROM raw.telegram_messages
+            WHERE message_id >= %s AND message_id < %s
+              AND message_date >= (
+                  SELECT MAX(message_date)::DATE FROM raw.telegram_messages
+                  WHERE message_id >= %s AND message_id < %s
+              )
+        """, ids + ids)
+        cur.execute("""
+            CREATE TEMP TABLE held_classifications AS
+            SELECT ic.* FROM raw.image_classifications ic JOIN held_messages USING (message_id)
+        """)
+        cur.execute("DELETE FROM raw.image_classifications WHERE message_id IN (SELECT message_id FROM held_messages)")
+        cur.execute("DELETE FROM raw.telegram_messages WHERE message_id IN (SELECT message_id FROM held_messages)")
+        held = cur.rowcount
+        cur.execute("SELECT COUNT(*) FROM raw.telegram_messages WHERE message_id >= %s AND message_id < %s", ids)
+        history = cur.fetchone()[0]
+    conn.commit()
+    if not history:
+        raise RuntimeError("no synthetic messages loaded; run run_benchmarks.py --stages generate load enrich first")
+    return history, held
+
+def restore_held_day(conn):
+    """Put the day set aside by hold_out_last_day() back into raw."""
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO raw.telegram_messages SELECT * FROM held_messages")
+        cur.execute("INSERT INTO raw.image_classifications SELECT * FROM held_classifications")
+        cur.execute("DROP TABLE held_messages, held_classifications")
+    conn.commit()
+
+def timed_dbt(*args):
+    """Run a dbt command and return its wall-clock seconds."""
+    start = time.perf_counter()
+    subprocess.run(['dbt', *args, *DBT_ARGS], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    """Compare full-refresh and incremental dbt runs on a generated history."""
+    parser = argparse.ArgumentParser(
+        description="Time full vs incremental dbt builds. Run against a scratch database: the marts are rebuilt."
+    )
+    parser.add_argument('--days', type=int, default=365, help="days of history to generate")
+    parser.add_argument('--rows-per-day', type=int, default=5_000)
+    parser.add_argument(
+        '--synthetic', action='store_true',
+        help="use the synthetic lake loaded by run_benchmarks.py instead of generating rows; "
+             "its last day is the new one (its load timestamps are rewritten to daily loads)"
+    )
+    parser.add_argument('--keep', action='store_true', help="keep the synthetic rows in raw and the marts")
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**db_params)
+    create_raw_table(conn)
+    results = []
+    held = False
+    try:
+        if args.synthetic:
+            history, new_rows = hold_out_last_day(conn)
+            held = True
+        else:
+            clear_bench_rows(conn)
+            insert_days(conn, 0, args.days, args.rows_per_day)
+            history, new_rows = args.days * args.rows_per_day, args.rows_per_day
+        timed_dbt('seed')
+        results.append(('full refresh', history, timed_dbt('run', '--full-refresh')))
+        results.append(('incremental, no new rows', 0, timed_dbt('run')))
+
+        if args.synthetic:
+            restore_held_day(conn)
+            held = False
+        else:
+            insert_days(conn, args.days, 1, args.rows_per_day)
+        results.append(('incremental, one new day', new_rows, timed_dbt('run')))
+    finally:
+        if held:
+            conn.rollback()
+            restore_held_day(conn)
+        elif not args.synthetic and not args.keep:
+            clear_bench_rows(conn)
+            # Incremental models never see deletes, so purge the rows with a rebuild
+            timed_dbt('run', '--full-refresh')
+        conn.close()
+
+    print(f"{'build':<28} {'new rows':>10} {'seconds':>9}")
+    for label, rows, seconds in results:
+        print(f"{label:<28} {rows:>10} {seconds:>9.1f}")
+
+if __name__ == "__main__":
+    sys.exit(main())
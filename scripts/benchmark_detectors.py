@@ -0,0 +1,144 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+from pathlib import Path
+
+from enrich_with_yolo import decode_image
+from detectors import YOLO_WEIGHTS, load_detector
+
+# name -> (backend, int8); the first one listed is the baseline
+VARIANTS = {
+    'torch': ('torch', False),
+    'onnx': ('onnx', False),
+    'onnx-int8': ('onnx', True)
+}
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png')
+
+def find_images(image_dir, limit):
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in Path(image_dir).rglob(pattern))
+    return paths[:limit]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+def agreement(baseline, candidate):
+    """Compare per-image detections [(label, confidence)] of two backends.
+
+    exact: share of images with the same multiset of labels.
+    f1: label F1 over all images, matching detections by label.
+    confidence_mae: mean |confidence difference| of matched detections,
+    paired by rank within each label.
+    """
+    exact = matched = base_total = cand_total = 0
+    differences = []
+    for base, cand in zip(baseline, candidate):
+        base_labels, cand_labels = Counter(name for name, _ in base), Counter(name for name, _ in cand)
+        exact += base_labels == cand_labels
+        matched += sum((base_labels & cand_labels).values())
+        base_total += len(base)
+        cand_total += len(cand)
+        for label in base_labels & cand_labels:
+            base_conf = sorted((conf for name, conf in base if name == label), reverse=True)
+            cand_conf = sorted((conf for name, conf in cand if name == label), reverse=True)
+            differences += [abs(b - c) for b, c in zip(base_conf, cand_conf)]
+    precision = matched / cand_total if cand_total else 1.0
+    recall = matched / base_total if base_total else 1.0
+    return {
+        'exact': round(exact / len(baseline), 4) if baseline else None,
+        'f1': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        'confidence_mae': round(statistics.fmean(differences), 4) if differences else None
+    }
+
+def run_variant(name, images, batch_size, threads, inter_op_threads, weights, warmup):
+    """Load one backend, warm it up and time each batch; returns (measurements, detections)."""
+    backend, int8 = VARIANTS[name]
+    detector = load_detector(backend, int8, threads=threads, inter_op_threads=inter_op_threads, weights=weights)
+    start = time.perf_counter()
+    detector.load()
+    load_seconds = time.perf_counter() - start
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    for batch in batches[:warmup]:
+        detector.detect(batch)
+
+    latencies = []
+    detections = []
+    start = time.perf_counter()
+    for batch in batches:
+        batch_start = time.perf_counter()
+        detections += detector.detect(batch)
+        latencies.append(time.perf_counter() - batch_start)
+    seconds = time.perf_counter() - start
+    detector.close()
+    return {
+        'model_version': detector.model_version,
+        'load_seconds': round(load_seconds, 3),
+        'images_per_sec': round(len(images) / seconds, 2),
+        'batch_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'batch_p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'ms_per_image': round(seconds / len(images) * 1000, 2),
+        'detections': sum(len(d) for d in detections)
+    }, detections
+
+def main(argv=None):
+    """Compare detector backends on the same images: throughput, latency and agreement with the first."""
+    parser = argparse.ArgumentParser(description="Benchmark enrichment detector backends against each other.")
+    parser.add_argument('--image-dir', type=Path, default=Path('data/raw/telegram_messages'))
+    parser.add_argument('--limit', type=int, default=256, help="images to run through each backend")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--weights', default=YOLO_WEIGHTS)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=None, help="intra-op threads for every backend")
+    parser.add_argument('--inter-op-threads', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=2, help="untimed batches before measuring")
+    parser.add_argument('--output', type=Path, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    images = []
+    for path in find_images(args.image_dir, args.limit):
+        image = decode_image(path)[1]
+        if image is not None:
+            images.append(image)
+    if not images:
+        print(f"No images found under {args.image_dir}")
+        return 1
+
+    results = {}
+    baseline = None
+    print(
+        f"{'variant':<10} {'images/s':>9} {'ms/img':>7} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'exact':>6} {'f1':>6} {'conf MAE':>9}"
+    )
+    for name in args.variants:
+        measured, detections = run_variant(
+            name, images, args.batch_size, args.threads, args.inter_op_threads, args.weights, args.warmup
+        )
+        if baseline is None:
+            baseline = detections
+        measured['agreement'] = agreement(baseline, detections)
+        results[name] = measured
+        agree = measured['agreement']
+        print(
+            f"{name:<10} {measured['images_per_sec']:>9} {measured['ms_per_image']:>7} "
+            f"{measured['batch_p50_ms']:>8} {measured['batch_p95_ms']:>8} "
+            f"{agree['exact']:>6} {agree['f1']:>6} {str(agree['confidence_mae']):>9}"
+        )
+
+    if args.output:
+        report = {
+            'images': len(images),
+            'batch_size': args.batch_size,
+            'threads': args.threads,
+            'inter_op_threads': args.inter_op_threads,
+            'baseline': args.variants[0],
+            'variants': results
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
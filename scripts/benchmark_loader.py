@@ -0,0 +1,90 @@
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+import psycopg2
+
+from load_to_postgres import (
+    db_params,
+    create_raw_table,
+    load_json_to_postgres,
+    load_json_to_postgres_bulk
+)
+
+# Synthetic rows use a dedicated channel and id range so they can be removed afterwards
+BENCH_CHANNEL = 'bench_loader'
+BENCH_ID_OFFSET = 9_000_000_000
+
+MODES = {
+    'row': load_json_to_postgres,
+    'bulk': load_json_to_postgres_bulk
+}
+
+def generate_messages(count, seed=42):
+    """Generate scraper-shaped messages for the benchmark channel."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    words = ['paracetamol', 'cream', 'pill', 'syringe', 'bottle', 'price', 'birr', 'አዲስ', 'መድሃኒት']
+    messages = []
+    for i in range(count):
+        has_image = rng.random() < 0.3
+        messages.append({
+            'message_id': BENCH_ID_OFFSET + i,
+            'channel': BENCH_CHANNEL,
+            'scrape_date': '2025-01-31',
+            'message_date': (start + timedelta(minutes=i)).isoformat(),
+            'sender_id': -1000000000000,
+            'text': ' '.join(rng.choice(words) for _ in range(rng.randint(3, 40))),
+            'has_image': has_image,
+            'image_file': f"data/raw/bench/{BENCH_CHANNEL}_{i}.jpg" if has_image else None
+        })
+    return messages
+
+def clear_bench_rows(conn):
+    """Remove rows written by a previous benchmark pass."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM raw.telegram_messages WHERE channel = %s", (BENCH_CHANNEL,))
+    conn.commit()
+
+def time_load(load_file, json_file, conn):
+    """Time a single load call, returning (seconds, inserted, skipped)."""
+    start = time.perf_counter()
+    result = load_file(json_file, conn)
+    elapsed = time.perf_counter() - start
+    if result is None:
+        raise RuntimeError(f"Load failed for {json_file}; see scripts/logs/loading.log")
+    return elapsed, result[0], result[1]
+
+def main(argv=None):
+    """Compare the row-by-row and bulk COPY loaders on a synthetic file."""
+    parser = argparse.ArgumentParser(description="Benchmark the raw message loaders.")
+    parser.add_argument('--messages', type=int, default=100_000, help="messages in the synthetic file")
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['row', 'bulk'])
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**db_params)
+    try:
+        create_raw_table(conn)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = Path(tmp) / f"{BENCH_CHANNEL}.json"
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(generate_messages(args.messages), f, ensure_ascii=False, indent=2)
+
+            print(f"{'mode':<6} {'pass':<10} {'seconds':>9} {'rows/s':>10} {'inserted':>9} {'skipped':>9}")
+            for mode in args.modes:
+                clear_bench_rows(conn)
+                # First pass inserts everything, second pass exercises the duplicate path
+                for label in ('cold', 'duplicate'):
+                    elapsed, inserted, skipped = time_load(MODES[mode], json_file, conn)
+                    rate = args.messages / elapsed if elapsed else float('inf')
+                    print(f"{mode:<6} {label:<10} {elapsed:>9.2f} {rate:>10.0f} {inserted:>9} {skipped:>9}")
+            clear_bench_rows(conn)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import sys
+import time
+import argparse
+import statistics
+import psycopg2
+
+from load_to_postgres import db_params
+from generate_synthetic_data import SYNTHETIC_ID_END, SYNTHETIC_ID_OFFSET
+
+# Runs in its own schema so the real marts are never touched
+BENCH_SCHEMA = 'bench_search'
+
+WORDS = [
+    'paracetamol', 'amoxicillin', 'cream', 'pill', 'syringe', 'bottle', 'vitamin',
+    'price', 'birr', 'available', 'delivery', 'lotion', 'sunscreen', 'tablet',
+    'መድሃኒት', 'ዋጋ', 'አዲስ', 'ክሬም', 'ቫይታሚን', 'ይደውሉ'
+]
+
+LEGACY_QUERY = f"""
+    SELECT message_id, load_timestamp::TEXT, text
+    FROM {BENCH_SCHEMA}.fct_messages
+    WHERE text ILIKE %(pattern)s
+    ORDER BY load_timestamp DESC
+    LIMIT 50
+"""
+
+RANKED_QUERY = f"""
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', %(query)s)
+            || websearch_to_tsquery('simple', %(query)s) AS tsq
+    )
+    SELECT
+        message_id,
+        load_timestamp::TEXT,
+        text,
+        (ts_rank(search_vector, q.tsq) + similarity(text, %(query)s))::FLOAT8 AS rank
+    FROM {BENCH_SCHEMA}.fct_messages, q
+    WHERE search_vector @@ q.tsq OR text ILIKE %(pattern)s
+    ORDER BY rank DESC, message_id DESC
+    LIMIT 50
+"""
+
+def build_table(conn, rows, synthetic=False):
+    """Create a fct_messages-shaped table with up to `rows` messages; returns the row count.
+
+    With synthetic=True the rows are copied from the generated lake already
+    loaded into raw.telegram_messages (run_benchmarks.py --stages generate load).
+    """
+    words = ', '.join(f"'{w}'" for w in WORDS)
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+        if synthetic:
+            cur.execute(f"""
+                CREATE TABLE {BENCH_SCHEMA}.fct_messages AS
+                SELECT message_id, load_timestamp, COALESCE(text, '') AS text
+                FROM raw.telegram_messages
+                WHERE message_id >= %s AND message_id < %s
+                ORDER BY message_id
+                LIMIT %s
+            """, (SYNTHETIC_ID_OFFSET, SYNTHETIC_ID_END, rows))
+        else:
+            cur.execute(f"""
+                CREATE TABLE {BENCH_SCHEMA}.fct_messages AS
+                SELECT
+                    g AS message_id,
+                    TIMESTAMP '2024-01-01' + g * INTERVAL '1 second' AS load_timestamp,
+                    (
+                        SELECT string_agg((ARRAY[{words}])[1 + floor(random() * {len(WORDS)})::INT], ' ')
+                        FROM generate_series(1, 5 + (g % 30)) AS w
+                    ) AS text
+                FROM generate_series(1, %s) AS g
+            """, (rows,))
+        count = cur.rowcount
+        cur.execute(f"""
+            ALTER TABLE {BENCH_SCHEMA}.fct_messages ADD COLUMN search_vector TSVECTOR;
+            UPDATE {BENCH_SCHEMA}.fct_messages
+            SET search_vector = to_tsvector('english', text) || to_tsvector('simple', text);
+        """)
+    conn.commit()
+    return count
+
+def build_indexes(conn):
+    """Create the same indexes the fct_messages post-hooks create."""
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE INDEX ON {BENCH_SCHEMA}.fct_messages USING gin (text gin_trgm_ops)")
+        cur.execute(f"CREATE INDEX ON {BENCH_SCHEMA}.fct_messages USING gin (search_vector)")
+        cur.execute(f"ANALYZE {BENCH_SCHEMA}.fct_messages")
+    conn.commit()
+
+def time_query(conn, sql, term, repeats):
+    """Median and max latency in ms of sql for one search term."""
+    samples = []
+    with conn.cursor() as cur:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            cur.execute(sql, {'query': term, 'pattern': f'%{term}%'})
+            cur.fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+    conn.rollback()
+    return statistics.median(samples), max(samples)
+
+def main(argv=None):
+    """Benchmark legacy ILIKE search against the indexed ranked search."""
+    parser = argparse.ArgumentParser(description="Benchmark message search on a synthetic table.")
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--terms', nargs='+', default=['paracetamol', 'sunscreen lotion', 'ቫይታሚን', 'amox'])
+    parser.add_argument(
+        '--synthetic', action='store_true',
+        help="search the loaded synthetic lake (up to --rows messages) instead of random text"
+    )
+    parser.add_argument('--keep', action='store_true', help=f"keep the {BENCH_SCHEMA} schema afterwards")
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**db_params)
+    try:
+        start = time.perf_counter()
+        rows = build_table(conn, args.rows, args.synthetic)
+        print(f"Built {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'variant':<28} {'term':<20} {'median ms':>10} {'max ms':>10}")
+        for term in args.terms:
+            median, worst = time_query(conn, LEGACY_QUERY, term, args.repeats)
+            print(f"{'ILIKE, no index':<28} {term:<20} {median:>10.1f} {worst:>10.1f}")
+
+        start = time.perf_counter()
+        build_indexes(conn)
+        print(f"Built indexes in {time.perf_counter() - start:.1f}s")
+
+        for term in args.terms:
+            for label, sql in (('ILIKE, trigram index', LEGACY_QUERY), ('ranked tsvector + trigram', RANKED_QUERY)):
+                median, worst = time_query(conn, sql, term, args.repeats)
+                print(f"{label:<28} {term:<20} {median:>10.1f} {worst:>10.1f}")
+    finally:
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            conn.commit()
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+# The API package lives next to scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from api.schemas import TopProduct, ChannelActivity, MessageSearch
+from api.encoding import dump_rows
+
+CLASSES = ['pill', 'cream', 'syringe', 'bottle', 'unknown']
+
+def top_products_rows(count, rng):
+    return ['product', 'mention_count'], [(f"product_{i}", rng.randint(1, 10_000)) for i in range(count)], ()
+
+def channel_activity_rows(count, rng):
+    rows = []
+    for i in range(count):
+        detections = [
+            {'object_class': c, 'detection_count': rng.randint(1, 50), 'avg_confidence': rng.random()}
+            for c in rng.sample(CLASSES, 3)
+        ]
+        rows.append((f"2025-01-{1 + i % 28:02d}", rng.randint(1, 500), rng.randint(0, 200), json.dumps(detections)))
+    return ['date_id', 'message_count', 'image_count', 'object_detections'], rows, ('object_detections',)
+
+def search_rows(count, rng):
+    words = ['paracetamol', 'cream', 'price', 'birr', 'አዲስ', 'መድሃኒት']
+    rows = [
+        (str(9_000_000 + i), 'Chemed123', '2025-01-01 10:00:00', ' '.join(rng.choice(words) for _ in range(40)), rng.random())
+        for i in range(count)
+    ]
+    return ['message_id', 'channel_name', 'message_date', 'text', 'rank'], rows, ()
+
+ENDPOINTS = {
+    'top-products': (top_products_rows, TopProduct),
+    'channel-activity': (channel_activity_rows, ChannelActivity),
+    'search': (search_rows, MessageSearch)
+}
+
+def legacy_path(model, columns, rows, json_columns):
+    """What the API did before: parse JSON columns, build models, re-validate and re-encode them."""
+    objects = []
+    for row in rows:
+        record = dict(zip(columns, row))
+        for name in json_columns:
+            record[name] = json.loads(record[name])
+        objects.append(model(**record))
+    # FastAPI validates the returned models against response_model, then encodes them
+    validated = [model(**dict(obj)) for obj in objects]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def fast_path(model, columns, rows, json_columns):
+    return dump_rows(columns, rows, json_columns)
+
+def time_path(path, model, columns, rows, json_columns, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        path(model, columns, rows, json_columns)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def main(argv=None):
+    """Measure per-endpoint serialization cost of the legacy and fast JSON paths."""
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization without a database.")
+    parser.add_argument('--rows', type=int, default=1000, help="rows per response")
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'endpoint':<18} {'rows':>6} {'legacy ms':>10} {'fast ms':>9} {'us/row legacy':>14} {'us/row fast':>12} {'speedup':>8}")
+    for name, (make_rows, model) in ENDPOINTS.items():
+        columns, rows, json_columns = make_rows(args.rows, random.Random(42))
+        assert json.loads(legacy_path(model, columns, rows, json_columns)) == json.loads(fast_path(model, columns, rows, json_columns))
+        legacy = time_path(legacy_path, model, columns, rows, json_columns, args.repeats)
+        fast = time_path(fast_path, model, columns, rows, json_columns, args.repeats)
+        print(
+            f"{name:<18} {args.rows:>6} {legacy * 1000:>10.2f} {fast * 1000:>9.2f} "
+            f"{legacy / args.rows * 1e6:>14.2f} {fast / args.rows * 1e6:>12.2f} {legacy / fast:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# Telegram channels the pipeline scrapes; kept free of imports and side
+# effects so the Dagster definitions can read it without loading the scraper
+CHANNELS = [
+    'Chemed123',
+    'lobelia4cosmetics',
+    'tikvahpharma'
+]
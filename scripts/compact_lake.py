@@ -0,0 +1,118 @@
+import os
+import argparse
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from load_to_postgres import LAKE_DIR, PARQUET_DIR, iter_messages
+from log_files import file_logger
+
+logger = file_logger(__name__, 'compact_lake.log')
+
+# ------------------------------
+# Stable schema for every Parquet partition
+# ------------------------------
+MESSAGE_SCHEMA = pa.schema([
+    ('message_id', pa.int64()),
+    ('channel', pa.string()),
+    ('scrape_date', pa.date32()),
+    ('message_date', pa.timestamp('us', tz='UTC')),
+    ('sender_id', pa.int64()),
+    ('text', pa.string()),
+    ('has_image', pa.bool_()),
+    ('image_file', pa.string())
+])
+
+# Dates are ISO strings in the JSON lake and are parsed by Arrow
+ISO_STRING_COLUMNS = ('scrape_date', 'message_date')
+ROW_GROUP_SIZE = 64_000
+
+def source_files(channel_dir):
+    """JSON and JSON Lines files of one <date>/<channel> partition."""
+    return sorted(path for suffix in ('*.json', '*.jsonl') for path in channel_dir.glob(suffix))
+
+def is_stale(sources, target):
+    """True when the Parquet file is missing or older than any of its sources."""
+    if not target.exists():
+        return True
+    built = target.stat().st_mtime
+    return any(path.stat().st_mtime > built for path in sources)
+
+def read_partition(sources):
+    """Read a partition's messages into a table, keeping the first copy of each message_id."""
+    seen = set()
+    columns = {field.name: [] for field in MESSAGE_SCHEMA}
+    for path in sources:
+        for msg in iter_messages(path):
+            if msg['message_id'] in seen:
+                continue
+            seen.add(msg['message_id'])
+            for name in columns:
+                columns[name].append(msg.get(name))
+    arrays = []
+    for field in MESSAGE_SCHEMA:
+        if field.name in ISO_STRING_COLUMNS:
+            arrays.append(pa.array(columns[field.name], type=pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=MESSAGE_SCHEMA).sort_by('message_id')
+
+def write_parquet(table, target, compression='zstd'):
+    """Atomically write a table as Parquet (tmp file + rename)."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = target.with_suffix('.tmp')
+    pq.write_table(
+        table,
+        tmp_file,
+        compression=compression,
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=['channel', 'image_file'],
+        write_statistics=True
+    )
+    os.replace(tmp_file, target)
+
+def compact_partition(date_dir, output_dir=PARQUET_DIR, force=False, compression='zstd'):
+    """Compact every channel of one date partition; returns the number of files written."""
+    written = 0
+    for channel_dir in sorted(p for p in date_dir.iterdir() if p.is_dir()):
+        sources = source_files(channel_dir)
+        if not sources:
+            continue
+        target = output_dir / date_dir.name / f"{channel_dir.name}.parquet"
+        if not force and not is_stale(sources, target):
+            continue
+        table = read_partition(sources)
+        write_parquet(table, target, compression)
+        logger.info(f"Compacted {len(sources)} file(s), {table.num_rows} messages into {target}")
+        written += 1
+    return written
+
+def compact_lake(lake_dir=LAKE_DIR, output_dir=PARQUET_DIR, dates=None, force=False, compression='zstd'):
+    """Compact all (or the given) date partitions of the JSON lake into Parquet."""
+    written = 0
+    for date_dir in sorted(p for p in Path(lake_dir).iterdir() if p.is_dir()):
+        if dates and date_dir.name not in dates:
+            continue
+        try:
+            written += compact_partition(date_dir, Path(output_dir), force, compression)
+        except Exception as e:
+            logger.error(f"Error compacting {date_dir}: {str(e)}")
+    return written
+
+def parse_args(argv=None):
+    """Parse compaction command-line options."""
+    parser = argparse.ArgumentParser(description="Compact the JSON data lake into typed Parquet partitions.")
+    parser.add_argument('--dates', nargs='+', help="only these YYYY-MM-DD partitions (default: all)")
+    parser.add_argument('--force', action='store_true', help="rewrite partitions even if up to date")
+    parser.add_argument('--compression', default='zstd', choices=('zstd', 'snappy', 'gzip', 'none'))
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Compact new or changed lake partitions."""
+    args = parse_args(argv)
+    written = compact_lake(dates=args.dates, force=args.force, compression=args.compression)
+    logger.info(f"Compaction wrote {written} Parquet file(s) to {PARQUET_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import psycopg2
+
+# Shares the loader's connection settings; logs to its own data_version.log
+from load_to_postgres import db_params
+from log_files import file_logger
+
+logger = file_logger(__name__, 'data_version.log')
+
+def create_data_version_table(conn):
+    """Create the single-row raw.data_version table the API keys its cache on."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE SCHEMA IF NOT EXISTS raw;
+            CREATE TABLE IF NOT EXISTS raw.data_version (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version BIGINT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+    conn.commit()
+
+def bump_data_version(conn):
+    """Increment the data version after the marts change; returns the new version."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO raw.data_version (id, version) VALUES (TRUE, 1)
+            ON CONFLICT (id) DO UPDATE SET
+                version = raw.data_version.version + 1,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING version
+        """)
+        version = cur.fetchone()[0]
+    conn.commit()
+    return version
+
+def main():
+    """Bump the data version, invalidating cached API responses."""
+    conn = psycopg2.connect(**db_params)
+    try:
+        create_data_version_table(conn)
+        version = bump_data_version(conn)
+        logger.info(f"Data version bumped to {version}")
+        print(version)
+    except Exception as e:
+        logger.error(f"Error bumping data version: {str(e)}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import os
+import ast
+import sys
+import time
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from log_files import file_logger
+
+logger = file_logger(__name__, 'yolo_enrichment.log')
+
+# ------------------------------
+# Detector settings
+# ------------------------------
+YOLO_WEIGHTS = os.getenv('YOLO_WEIGHTS', 'yolov8n.pt')  # Pre-trained YOLOv8 nano model
+# Classifications are tracked per model version; bump it to re-enrich everything
+MODEL_VERSION = os.getenv('YOLO_MODEL_VERSION', Path(YOLO_WEIGHTS).stem)
+# 'torch' runs the ultralytics model, 'onnx' an exported ONNX Runtime session
+YOLO_BACKEND = os.getenv('YOLO_BACKEND', 'torch')
+# Dynamic int8 weight quantisation for the ONNX backend (tagged as its own model version)
+YOLO_INT8 = os.getenv('YOLO_INT8', 'false').lower() in ('1', 'true', 'yes')
+# Where exported ONNX models are cached
+MODEL_DIR = Path(os.getenv('YOLO_MODEL_DIR', 'models'))
+BACKENDS = ('torch', 'onnx')
+
+# Same thresholds as ultralytics' predict defaults, so both backends agree
+CONFIDENCE_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+IMAGE_SIZE = 640
+
+# COCO class -> medical category; every other class is 'unknown'
+CLASS_MAP = {
+    'bottle': 'cream',  # Assume bottles are creams
+    'pill': 'pill',     # Hypothetical; adjust based on model
+    'syringe': 'syringe',
+    'cup': 'bottle',    # Could be a container
+}
+
+def map_coco_to_medical(coco_class):
+    """Map COCO classes to medical categories."""
+    return CLASS_MAP.get(coco_class, 'unknown')
+
+def label_table(names):
+    """Medical category per class index, from a model's {index: name} (or list of names).
+
+    Built once per model, so a detection's label is a list lookup by class id.
+    """
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+    table = ['unknown'] * (max(names) + 1 if names else 0)
+    for index, name in names.items():
+        table[int(index)] = map_coco_to_medical(name)
+    return table
+
+def model_version_for(backend=YOLO_BACKEND, int8=YOLO_INT8):
+    """Version tag of a backend's detections: quantised weights give slightly different results."""
+    return f"{MODEL_VERSION}-int8" if backend == 'onnx' and int8 else MODEL_VERSION
+
+# ------------------------------
+# Backends
+# ------------------------------
+class Detector(ABC):
+    """Interface of the enrichment backends.
+
+    ``detect`` takes a batch of BGR images and returns, per image, a list of
+    (medical class, confidence) tuples. Rows are stored under
+    ``model_version``. Models load on first use, or eagerly with ``load``.
+    """
+
+    model_version = MODEL_VERSION
+
+    def load(self):
+        pass
+
+    @abstractmethod
+    def detect(self, images):
+        """Per-image lists of (medical class, confidence) for a batch of BGR images."""
+
+    def close(self):
+        pass
+
+_models = {}
+_model_lock = threading.Lock()
+
+def get_model(weights=YOLO_WEIGHTS):
+    """Import ultralytics and load the weights on first use, once per process."""
+    with _model_lock:
+        if weights not in _models:
+            start = time.perf_counter()
+            from ultralytics import YOLO
+            _models[weights] = YOLO(weights)
+            logger.info(f"Loaded {weights} in {time.perf_counter() - start:.2f}s")
+    return _models[weights]
+
+def set_torch_threads(threads=None, inter_op_threads=None):
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Only allowed before torch starts any inter-op work in this process
+            logger.warning(f"Could not set torch inter-op threads: {str(e)}")
+
+class TorchDetector(Detector):
+    """Runs the ultralytics YOLO model on PyTorch in this process."""
+
+    def __init__(self, weights=YOLO_WEIGHTS, threads=None, inter_op_threads=None):
+        self.weights = weights
+        self.threads = threads
+        self.inter_op_threads = inter_op_threads
+        self.model_version = model_version_for('torch')
+        self.model = None
+        self.labels = None
+
+    def load(self):
+        if self.model is None:
+            set_torch_threads(self.threads, self.inter_op_threads)
+            self.model = get_model(self.weights)
+            self.labels = label_table(self.model.names)
+
+    def detect(self, images):
+        self.load()
+        results = self.model(list(images), verbose=False)
+        return [
+            [
+                (self.labels[int(cls_id)], float(conf))
+                for cls_id, conf in zip(result.boxes.cls.tolist(), result.boxes.conf.tolist())
+            ]
+            for result in results
+        ]
+
+def export_onnx(weights=YOLO_WEIGHTS, int8=False, model_dir=MODEL_DIR):
+    """Export the weights to ONNX (and an int8 copy) under model_dir once; returns the model path.
+
+    Int8 uses dynamic quantisation: weights are stored as int8 and
+    activations are quantised at run time, so no calibration set is needed.
+    """
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(weights).stem
+    fp32_path = model_dir / f"{stem}.onnx"
+    if not fp32_path.exists():
+        start = time.perf_counter()
+        exported = get_model(weights).export(format='onnx', dynamic=True, imgsz=IMAGE_SIZE)
+        os.replace(exported, fp32_path)
+        logger.info(f"Exported {weights} to {fp32_path} in {time.perf_counter() - start:.2f}s")
+    if not int8:
+        return fp32_path
+
+    int8_path = model_dir / f"{stem}.int8.onnx"
+    if not int8_path.exists():
+        import onnx
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        staged = int8_path.with_suffix(f".{os.getpid()}.tmp")
+        quantize_dynamic(fp32_path, staged, weight_type=QuantType.QUInt8)
+        # Keep the exported metadata (class names, stride) on the quantised model
+        source, quantized = onnx.load(fp32_path), onnx.load(staged)
+        del quantized.metadata_props[:]
+        quantized.metadata_props.extend(source.metadata_props)
+        onnx.save(quantized, staged)
+        os.replace(staged, int8_path)
+        logger.info(f"Quantised {fp32_path} to {int8_path}")
+    return int8_path
+
+def letterbox(image, size=IMAGE_SIZE):
+    """Resize keeping the aspect ratio and pad to size x size, as ultralytics does."""
+    import cv2
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    resized_w, resized_h = round(width * scale), round(height * scale)
+    if (resized_w, resized_h) != (width, height):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    pad_w, pad_h = (size - resized_w) / 2, (size - resized_h) / 2
+    top, bottom = round(pad_h - 0.1), round(pad_h + 0.1)
+    left, right = round(pad_w - 0.1), round(pad_w + 0.1)
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+def non_max_suppression(boxes, scores, iou_threshold):
+    """Indices of the boxes (x1, y1, x2, y2) kept by greedy NMS, best score first."""
+    import numpy as np
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        overlap = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = overlap / (areas[best] + areas[rest] - overlap + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+class OnnxDetector(Detector):
+    """Runs an exported YOLOv8 model with ONNX Runtime on the CPU.
+
+    ``threads`` sets intra-op threads (parallelism inside one operator) and
+    ``inter_op_threads`` enables parallel execution of independent graph
+    branches. On small CPU hosts one process with all cores intra-op is
+    usually best.
+    """
+
+    def __init__(self, model_path=None, weights=YOLO_WEIGHTS, int8=False, threads=None, inter_op_threads=None,
+                 conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD, max_det=MAX_DETECTIONS):
+        self.model_path = model_path
+        self.weights = weights
+        self.int8 = int8
+        self.threads = threads
+        self.inter_op_threads = inter_op_threads
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self.model_version = model_version_for('onnx', int8)
+        self.session = None
+        self.labels = None
+
+    def load(self):
+        if self.session is not None:
+            return
+        import onnxruntime as ort
+        start = time.perf_counter()
+        path = self.model_path or export_onnx(self.weights, self.int8)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        if self.inter_op_threads:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+            options.inter_op_num_threads = self.inter_op_threads
+        self.session = ort.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        # ultralytics stores the class names as a dict literal in the model metadata
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map['names'])
+        self.labels = label_table(names)
+        logger.info(f"Loaded {path} in {time.perf_counter() - start:.2f}s")
+
+    def detect(self, images):
+        import numpy as np
+        self.load()
+        batch = np.stack([letterbox(image) for image in images])
+        # BGR HWC uint8 -> RGB CHW float in [0, 1]
+        batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return [self._postprocess(prediction) for prediction in output]
+
+    def _postprocess(self, prediction):
+        """(4 + classes, anchors) -> [(label, confidence)] after per-class NMS."""
+        import numpy as np
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        mask = confidences > self.conf
+        if not mask.any():
+            return []
+        xywh, class_ids, confidences = prediction[mask, :4], class_ids[mask], confidences[mask]
+        boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+        # Offset boxes by class so NMS never suppresses across classes
+        offset = boxes + class_ids[:, None] * (IMAGE_SIZE * 2)
+        keep = non_max_suppression(offset, confidences, self.iou)[:self.max_det]
+        return [(self.labels[int(class_ids[i])], float(confidences[i])) for i in keep]
+
+def load_detector(backend=YOLO_BACKEND, int8=YOLO_INT8, threads=None, inter_op_threads=None, weights=YOLO_WEIGHTS):
+    """Build the detector for a backend name; the model loads on first use."""
+    if backend == 'torch':
+        return TorchDetector(weights, threads=threads, inter_op_threads=inter_op_threads)
+    if backend == 'onnx':
+        return OnnxDetector(weights=weights, int8=int8, threads=threads, inter_op_threads=inter_op_threads)
+    raise ValueError(f"Unknown detector backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+def main(argv=None):
+    """Export the ONNX model (and its int8 copy) ahead of the first enrichment run."""
+    parser = argparse.ArgumentParser(description="Export YOLO weights for the ONNX Runtime backend.")
+    parser.add_argument('--weights', default=YOLO_WEIGHTS)
+    parser.add_argument('--int8', action='store_true', help="also write the int8-quantised model")
+    parser.add_argument('--model-dir', type=Path, default=MODEL_DIR)
+    args = parser.parse_args(argv)
+    print(export_onnx(args.weights, int8=False, model_dir=args.model_dir))
+    if args.int8:
+        print(export_onnx(args.weights, int8=True, model_dir=args.model_dir))
+
+if __name__ == "__main__":
+    sys.exit(main())
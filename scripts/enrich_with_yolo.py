@@ -1,19 +1,27 @@
 import os
-import logging
+import time
+import hashlib
+import queue
+import secrets
+import tempfile
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
 from pathlib import Path
 import psycopg2
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
-from ultralytics import YOLO
-import torch
+
+from pipeline_metrics import record_stage, push_metrics
+from log_files import file_logger
+from partitioning import RAW_PARTITIONED, ensure_partitions, is_partitioned, table_exists
+from detectors import BACKENDS, MODEL_VERSION, YOLO_BACKEND, YOLO_INT8, Detector, load_detector, model_version_for
 
 # Set up logging
-Path('scripts/logs').mkdir(parents=True, exist_ok=True)
-logging.basicConfig(
-    filename='scripts/logs/yolo_enrichment.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+logger = file_logger(__name__, 'yolo_enrichment.log')
 # Load environment variables
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
 db_params = {
@@ -24,95 +32,537 @@ db_params = {
     'port': os.getenv('POSTGRES_PORT')
 }
 
-# Initialize YOLOv8 model
-model = YOLO('yolov8n.pt')  # Pre-trained YOLOv8 nano model
+# YOLOv8 model and backend settings live in detectors.py
+# Optional long-lived inference worker (see serve). The worker unpickles what
+# clients send, so its socket and key live in a directory only this user can open.
+WORKER_DIR = Path(
+    os.getenv('YOLO_WORKER_DIR')
+    or (Path(os.environ['XDG_RUNTIME_DIR']) / 'telepharm' if os.getenv('XDG_RUNTIME_DIR')
+        else Path(tempfile.gettempdir()) / f"telepharm-{os.getuid()}")
+)
+WORKER_SOCKET = os.getenv('YOLO_WORKER_SOCKET')
+DEFAULT_WORKER_SOCKET = str(WORKER_DIR / 'yolo.sock')
+# Shared secret for the worker; without it, serve() writes a random key to WORKER_KEY_FILE
+WORKER_AUTHKEY = os.getenv('YOLO_WORKER_AUTHKEY')
+WORKER_KEY_FILE = WORKER_DIR / 'yolo.key'
+
+def classifications_table_ddl(table='raw.image_classifications', partitioned=False, foreign_key=True):
+    """DDL for the detections table, plain or range-partitioned by month on load_timestamp.
 
-def create_classifications_table(conn):
-    """Create the raw.image_classifications table if it doesn't exist."""
-    create_table_query = """
+    The foreign key to raw.telegram_messages needs its plain layout: a
+    partitioned messages table is keyed on (message_id, message_date).
+    """
+    name = table.split('.')[1]
+    if partitioned:
+        return f"""
+    CREATE SCHEMA IF NOT EXISTS raw;
+    CREATE TABLE IF NOT EXISTS {table} (
+        classification_id SERIAL,
+        message_id BIGINT,
+        image_file VARCHAR,
+        object_class VARCHAR,
+        confidence FLOAT,
+        load_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        model_version VARCHAR,
+        image_hash CHAR(64),
+        PRIMARY KEY (classification_id, load_timestamp)
+    ) PARTITION BY RANGE (load_timestamp);
+    CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;
+    CREATE INDEX IF NOT EXISTS {name}_message_version_idx
+        ON {table} (message_id, model_version);
+    -- Rows are appended in load_timestamp order, which BRIN summarises per block range
+    CREATE INDEX IF NOT EXISTS {name}_load_timestamp_brin
+        ON {table} USING BRIN (load_timestamp);
+    """
+    references = ",\n        FOREIGN KEY (message_id) REFERENCES raw.telegram_messages(message_id)" if foreign_key else ""
+    return f"""
     CREATE SCHEMA IF NOT EXISTS raw;
-    CREATE TABLE IF NOT EXISTS raw.image_classifications (
+    CREATE TABLE IF NOT EXISTS {table} (
         classification_id SERIAL PRIMARY KEY,
         message_id BIGINT,
         image_file VARCHAR,
         object_class VARCHAR,
         confidence FLOAT,
-        load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (message_id) REFERENCES raw.telegram_messages(message_id)
+        load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP{references}
     );
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS model_version VARCHAR;
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS image_hash CHAR(64);
+    CREATE INDEX IF NOT EXISTS {name}_message_version_idx
+        ON {table} (message_id, model_version);
+    CREATE INDEX IF NOT EXISTS {name}_load_timestamp_idx
+        ON {table} (load_timestamp);
+    """
+
+def create_classifications_table(conn, partitioned=RAW_PARTITIONED):
+    """Create the raw.image_classifications table if it doesn't exist.
+
+    ``partitioned`` (env RAW_PARTITIONED) creates it range-partitioned by month
+    on load_timestamp, so incremental dbt models read only recent partitions.
+    An existing table keeps its layout; see partitioning.py to migrate.
+    """
+    create_log_query = """
+    -- One row per (message, model version), including images with no detections
+    CREATE TABLE IF NOT EXISTS raw.image_enrichment_log (
+        message_id BIGINT,
+        model_version VARCHAR,
+        image_hash CHAR(64),
+        detection_count INTEGER,
+        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (message_id, model_version)
+    );
+    CREATE INDEX IF NOT EXISTS image_enrichment_log_hash_idx
+        ON raw.image_enrichment_log (image_hash, model_version);
     """
     try:
+        if table_exists(conn, 'raw.image_classifications'):
+            partitioned = is_partitioned(conn, 'raw.image_classifications')
+        foreign_key = not is_partitioned(conn, 'raw.telegram_messages')
         with conn.cursor() as cur:
-            cur.execute(create_table_query)
+            cur.execute(classifications_table_ddl(partitioned=partitioned, foreign_key=foreign_key))
+            cur.execute(create_log_query)
             conn.commit()
+        if partitioned:
+            ensure_partitions(conn, 'raw.image_classifications', 'load_timestamp')
         logger.info("Ensured raw.image_classifications table exists")
     except Exception as e:
         logger.error(f"Error creating table: {str(e)}")
         conn.rollback()
 
-def process_image(image_path, message_id, conn):
-    """Process an image with YOLOv8 and store classifications."""
-    try:
-        # Run YOLOv8 inference
-        results = model(image_path)
-        detections = results[0].boxes  # Get bounding boxes
+# ------------------------------
+# Detectors: lazy local backend or warm worker
+# ------------------------------
+def private_worker_dir(path=WORKER_DIR):
+    """Create the worker directory as 0700, refusing one another user owns or can open."""
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = path.stat()
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Worker directory {path} must be owned by this user with mode 0700")
+    return path
 
-        with conn.cursor() as cur:
-            for box in detections:
-                cls_id = int(box.cls)  # Class ID
-                object_class = model.names[cls_id]  # Class name (e.g., 'bottle', 'pill')
-                confidence = float(box.conf)  # Confidence score
+def worker_authkey(create=False, key_file=WORKER_KEY_FILE):
+    """YOLO_WORKER_AUTHKEY, else the key in key_file (created with a random key if ``create``)."""
+    if WORKER_AUTHKEY:
+        return WORKER_AUTHKEY.encode()
+    key_file = Path(key_file)
+    private_worker_dir(key_file.parent)
+    if create:
+        # A new file, so it can't keep the mode of an old one
+        key_file.unlink(missing_ok=True)
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_bytes(32))
+    info = key_file.stat()
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Worker key {key_file} must be owned by this user with mode 0600")
+    return key_file.read_bytes()
+
+class RemoteDetector(Detector):
+    """Sends image batches to a warm inference worker over a Unix socket."""
+
+    def __init__(self, address, authkey=None):
+        self.conn = Client(address, family='AF_UNIX', authkey=authkey or worker_authkey())
+        self.model_version = self.conn.recv()['model_version']
+
+    def detect(self, images):
+        self.conn.send(list(images))
+        status, payload = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Inference worker error: {payload}")
+        return payload
+
+    def close(self):
+        self.conn.close()
+
+def get_detector(socket_path=WORKER_SOCKET, threads=None, backend=YOLO_BACKEND, int8=YOLO_INT8, inter_op_threads=None):
+    """Use a warm worker serving the same model version if one is listening, else load ``backend`` locally."""
+    expected = model_version_for(backend, int8)
+    if socket_path and os.path.exists(socket_path):
+        try:
+            detector = RemoteDetector(socket_path)
+            if detector.model_version == expected:
+                logger.info(f"Using inference worker at {socket_path}")
+                return detector
+            logger.warning(
+                f"Inference worker at {socket_path} serves {detector.model_version}, "
+                f"expected {expected}; loading the model locally"
+            )
+            detector.close()
+        except (OSError, EOFError, AuthenticationError) as e:
+            # OSError includes a missing or unsafe key file
+            logger.warning(f"Inference worker at {socket_path} unavailable: {str(e)}")
+    return load_detector(backend, int8, threads=threads, inter_op_threads=inter_op_threads)
+
+def _serve_connection(conn, detector, lock):
+    """Answer detect requests on one client connection until it closes."""
+    with conn:
+        conn.send({'model_version': detector.model_version})
+        while True:
+            try:
+                images = conn.recv()
+            except EOFError:
+                return
+            try:
+                with lock:
+                    conn.send(('ok', detector.detect(images)))
+            except Exception as e:
+                logger.error(f"Inference worker error: {str(e)}")
+                conn.send(('error', str(e)))
+
+def serve(address=DEFAULT_WORKER_SOCKET, threads=None, authkey=None,
+          backend=YOLO_BACKEND, int8=YOLO_INT8, inter_op_threads=None):
+    """Keep the model warm and serve enrichment runs over a Unix socket until killed.
+
+    The socket's directory must be private to this user. Unless
+    YOLO_WORKER_AUTHKEY is set, a fresh random key is written to
+    WORKER_KEY_FILE (0600) for clients of the same user to read.
+    """
+    private_worker_dir(Path(address).parent)
+    authkey = authkey or worker_authkey(create=True)
+    detector = load_detector(backend, int8, threads=threads, inter_op_threads=inter_op_threads)
+    detector.load()
+    if os.path.exists(address):
+        os.unlink(address)
+    lock = threading.Lock()
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        os.chmod(address, 0o600)
+        logger.info(f"Inference worker for {detector.model_version} listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except AuthenticationError as e:
+                logger.warning(f"Rejected inference worker client: {str(e)}")
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, detector, lock), daemon=True).start()
+
+# ------------------------------
+# Pipelined batch enrichment
+# ------------------------------
+_DONE = object()
+
+def decode_image(image_path):
+    """Read an image once, returning (sha256 of its bytes, BGR array or None)."""
+    import cv2
+    import numpy as np
+    data = Path(image_path).read_bytes()
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return hashlib.sha256(data).hexdigest(), image
+
+def fetch_pending_images(conn, model_version=MODEL_VERSION, channel=None, scrape_date=None):
+    """Return (message_id, image_file) for images not yet enriched by model_version.
 
-                # Map COCO classes to medical categories (simplified)
-                medical_class = map_coco_to_medical(object_class)
+    ``channel`` and ``scrape_date`` restrict the result to one lake partition.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT m.message_id, m.image_file
+            FROM raw.telegram_messages m
+            WHERE m.has_image = TRUE
+              AND m.image_file IS NOT NULL
+              AND (%(channel)s::TEXT IS NULL OR m.channel = %(channel)s)
+              AND (%(scrape_date)s::DATE IS NULL OR m.scrape_date = %(scrape_date)s::DATE)
+              AND NOT EXISTS (
+                  SELECT 1 FROM raw.image_enrichment_log l
+                  WHERE l.message_id = m.message_id AND l.model_version = %(model_version)s
+              )
+            ORDER BY m.message_id
+        """, {'model_version': model_version, 'channel': channel, 'scrape_date': scrape_date})
+        return cur.fetchall()
+
+def fetch_known_detections(conn, model_version=MODEL_VERSION):
+    """Return {image_hash: [(object_class, confidence)]} for images already inferred."""
+    known = {}
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH first_seen AS (
+                SELECT DISTINCT ON (image_hash) image_hash, message_id
+                FROM raw.image_enrichment_log
+                WHERE model_version = %s AND image_hash IS NOT NULL
+                ORDER BY image_hash, processed_at
+            )
+            SELECT f.image_hash, c.object_class, c.confidence
+            FROM first_seen f
+            LEFT JOIN raw.image_classifications c
+                ON c.message_id = f.message_id AND c.model_version = %s
+        """, (model_version, model_version))
+        for image_hash, object_class, confidence in cur.fetchall():
+            detections = known.setdefault(image_hash, [])
+            if object_class is not None:
+                detections.append((object_class, confidence))
+    return known
+
+class EnrichmentPipeline:
+    """Decode, batched inference and batched inserts running as concurrent stages.
+
+    Images are decoded on a thread pool, grouped into batches of ``batch_size``
+    for inference on the calling thread, and detections are written by a
+    writer thread in ``insert_batch``-row INSERTs. Bounded queues between the
+    stages keep memory flat while all three overlap.
+
+    Images whose content hash is in ``known`` (or already in the current
+    batch) reuse those detections instead of running inference again.
+    """
+
+    def __init__(self, conn, detector, batch_size=16, decode_workers=4,
+                 insert_batch=500, queue_size=64, known=None):
+        self.conn = conn
+        self.detector = detector
+        self.model_version = detector.model_version
+        self.known = known if known is not None else {}
+        self.batch_size = batch_size
+        self.decode_workers = decode_workers
+        self.insert_batch = insert_batch
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.detected = queue.Queue(maxsize=queue_size)
+        self.errors = []
+        self.stats = {'images': 0, 'detections': 0, 'reused': 0, 'failed': 0}
+        self._failed_lock = threading.Lock()
+
+    def _count_failed(self, count=1):
+        with self._failed_lock:
+            self.stats['failed'] += count
 
-                cur.execute("""
+    def _decode_stage(self, images):
+        """Submit decodes with at most queue_size in flight, forwarding results in order."""
+        try:
+            with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+                in_flight = deque()
+                for message_id, image_path in images:
+                    in_flight.append((message_id, image_path, pool.submit(decode_image, image_path)))
+                    if len(in_flight) >= self.decoded.maxsize:
+                        self._forward_decoded(*in_flight.popleft())
+                while in_flight:
+                    self._forward_decoded(*in_flight.popleft())
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.decoded.put(_DONE)
+
+    def _forward_decoded(self, message_id, image_path, future):
+        try:
+            image_hash, image = future.result()
+        except OSError as e:
+            logger.warning(f"Could not read image {image_path}: {str(e)}")
+            self._count_failed()
+            return
+        if image is None:
+            logger.warning(f"Could not decode image: {image_path}")
+            self._count_failed()
+            return
+        self.decoded.put((message_id, image_path, image_hash, image))
+
+    def _infer(self, batch, followers):
+        """Run one batched forward pass and queue detections for the batch and its duplicates."""
+        results = self.detector.detect([image for _, _, _, image in batch])
+        for (message_id, image_path, image_hash, _), detections in zip(batch, results):
+            self.known[image_hash] = detections
+            self.detected.put((message_id, image_path, image_hash, detections))
+            logger.info(f"Processed {image_path}: {len(detections)} objects detected")
+            for follower_id, follower_path in followers.pop(image_hash, []):
+                self._reuse(follower_id, follower_path, image_hash)
+
+    def _reuse(self, message_id, image_path, image_hash):
+        self.stats['reused'] += 1
+        self.detected.put((message_id, image_path, image_hash, self.known[image_hash]))
+        logger.info(f"Reused detections for {image_path} (hash {image_hash[:12]})")
+
+    def _write_stage(self):
+        """Drain detections into raw.image_classifications with multi-row INSERTs."""
+        images = []
+        rows = 0
+        try:
+            while True:
+                item = self.detected.get()
+                if item is not _DONE:
+                    images.append(item)
+                    rows += len(item[3])
+                    self.stats['images'] += 1
+                    self.stats['detections'] += len(item[3])
+                if images and (item is _DONE or len(images) >= self.insert_batch or rows >= self.insert_batch):
+                    self._write(images)
+                    images = []
+                    rows = 0
+                if item is _DONE:
+                    return
+        except Exception as e:
+            self.conn.rollback()
+            self.errors.append(e)
+            # Keep draining so the inference stage never blocks on a full queue
+            while self.detected.get() is not _DONE:
+                pass
+
+    def _write(self, images):
+        """Log the images and insert their detections in one transaction.
+
+        Only images whose log row is new get detections written, so a
+        concurrent run for the same model version cannot duplicate them.
+        """
+        with self.conn.cursor() as cur:
+            logged = execute_values(cur, """
+                INSERT INTO raw.image_enrichment_log (
+                    message_id, model_version, image_hash, detection_count
+                ) VALUES %s
+                ON CONFLICT (message_id, model_version) DO NOTHING
+                RETURNING message_id
+            """, [
+                (message_id, self.model_version, image_hash, len(detections))
+                for message_id, _, image_hash, detections in images
+            ], page_size=len(images), fetch=True)
+            new_ids = {row[0] for row in logged}
+            rows = [
+                (message_id, str(image_path), object_class, confidence, self.model_version, image_hash)
+                for message_id, image_path, image_hash, detections in images
+                if message_id in new_ids
+                for object_class, confidence in detections
+            ]
+            if rows:
+                execute_values(cur, """
                     INSERT INTO raw.image_classifications (
-                        message_id, image_file, object_class, confidence
-                    ) VALUES (%s, %s, %s, %s)
-                """, (
-                    message_id,
-                    str(image_path),
-                    medical_class,
-                    confidence
-                ))
-            conn.commit()
-        logger.info(f"Processed {image_path}: {len(detections)} objects detected")
-    except Exception as e:
-        logger.error(f"Error processing {image_path}: {str(e)}")
-        conn.rollback()
+                        message_id, image_file, object_class, confidence, model_version, image_hash
+                    ) VALUES %s
+                """, rows, page_size=self.insert_batch)
+        self.conn.commit()
+
+    def run(self, images):
+        """Enrich an iterable of (message_id, image_path) and return throughput stats."""
+        start = time.perf_counter()
+        decoder = threading.Thread(target=self._decode_stage, args=(images,), daemon=True)
+        writer = threading.Thread(target=self._write_stage, daemon=True)
+        decoder.start()
+        writer.start()
+
+        decoding = True
+        try:
+            batch = []
+            followers = {}  # image_hash -> duplicates waiting on an image in the batch
+            while decoding:
+                item = self.decoded.get()
+                decoding = item is not _DONE
+                if item is not _DONE:
+                    message_id, image_path, image_hash, _ = item
+                    if image_hash in self.known:
+                        self._reuse(message_id, image_path, image_hash)
+                    elif any(image_hash == queued[2] for queued in batch):
+                        followers.setdefault(image_hash, []).append((message_id, image_path))
+                    else:
+                        batch.append(item)
+                if batch and (item is _DONE or len(batch) >= self.batch_size):
+                    try:
+                        self._infer(batch, followers)
+                    except Exception as e:
+                        failed = len(batch) + sum(len(f) for f in followers.values())
+                        logger.error(f"Error running inference on batch of {len(batch)}: {str(e)}")
+                        self._count_failed(failed)
+                        followers = {}
+                    batch = []
+        finally:
+            # Unblock the decoder if inference stopped early
+            while decoding:
+                decoding = self.decoded.get() is not _DONE
+            self.detected.put(_DONE)
+            decoder.join()
+            writer.join()
+
+        elapsed = time.perf_counter() - start
+        self.stats['seconds'] = round(elapsed, 3)
+        self.stats['images_per_sec'] = round(self.stats['images'] / elapsed, 2) if elapsed else 0.0
+        if self.errors:
+            raise self.errors[0]
+        logger.info(
+            f"Enriched {self.stats['images']} images with {self.model_version} "
+            f"({self.stats['detections']} detections, {self.stats['reused']} reused by hash, "
+            f"{self.stats['failed']} failed) in {self.stats['seconds']}s: "
+            f"{self.stats['images_per_sec']} images/sec "
+            f"[batch_size={self.batch_size}, decode_workers={self.decode_workers}, "
+            f"detector={type(self.detector).__name__}]"
+        )
+        return self.stats
+
+def enrich_images(conn, detector, channel=None, scrape_date=None, batch_size=16, decode_workers=4, insert_batch=500):
+    """Classify pending images (optionally of one channel/date partition) and return pipeline stats."""
+    model_version = detector.model_version
+    images = fetch_pending_images(conn, model_version, channel=channel, scrape_date=scrape_date)
+    logger.info(f"{len(images)} images pending enrichment with {model_version}")
+
+    def existing_images():
+        for message_id, image_file in images:
+            if image_file and Path(image_file).exists():
+                yield message_id, Path(image_file)
+            else:
+                logger.warning(f"Image not found: {image_file}")
 
-def map_coco_to_medical(coco_class):
-    """Map COCO classes to medical categories."""
-    class_map = {
-        'bottle': 'cream',  # Assume bottles are creams
-        'pill': 'pill',     # Hypothetical; adjust based on model
-        'syringe': 'syringe',
-        'cup': 'bottle',    # Could be a container
-    }
-    return class_map.get(coco_class, 'unknown')
-
-def main():
+    pipeline = EnrichmentPipeline(
+        conn,
+        detector,
+        batch_size=batch_size,
+        decode_workers=decode_workers,
+        insert_batch=insert_batch,
+        known=fetch_known_detections(conn, model_version)
+    )
+    stats = pipeline.run(existing_images())
+    record_stage(
+        'enrich', stats['seconds'], channel or 'all',
+        images=stats['images'], detections=stats['detections'], reused=stats['reused'], failed=stats['failed']
+    )
+    return stats
+
+def parse_args(argv=None):
+    """Parse enrichment command-line options."""
+    parser = argparse.ArgumentParser(description="Classify scraped images with YOLOv8.")
+    parser.add_argument('--batch-size', type=int, default=16, help="images per inference batch")
+    parser.add_argument('--backend', choices=BACKENDS, default=YOLO_BACKEND, help="inference engine")
+    parser.add_argument(
+        '--int8', action='store_true', default=YOLO_INT8,
+        help=f"int8-quantised ONNX model, stored as model version {model_version_for('onnx', True)}"
+    )
+    parser.add_argument('--threads', type=int, default=None, help="intra-op threads (default: the engine's choice)")
+    parser.add_argument('--inter-op-threads', type=int, default=None, help="inter-op threads (default: the engine's choice)")
+    parser.add_argument('--decode-workers', type=int, default=4, help="threads decoding images from disk")
+    parser.add_argument('--insert-batch', type=int, default=500, help="detections per INSERT")
+    parser.add_argument(
+        '--worker-socket', default=WORKER_SOCKET,
+        help="Unix socket of a warm inference worker; falls back to a local model if unreachable"
+    )
+    parser.add_argument(
+        '--serve', action='store_true',
+        help=f"run as a long-lived inference worker on --worker-socket (default {DEFAULT_WORKER_SOCKET})"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Process images with YOLOv8 and store classifications."""
+    args = parse_args(argv)
+    if args.serve:
+        serve(
+            args.worker_socket or DEFAULT_WORKER_SOCKET, threads=args.threads,
+            backend=args.backend, int8=args.int8, inter_op_threads=args.inter_op_threads
+        )
+        return
+
     conn = psycopg2.connect(**db_params)
+    detector = None
     try:
         create_classifications_table(conn)
 
-        # Query images from raw.telegram_messages
-        with conn.cursor() as cur:
-            cur.execute("SELECT message_id, image_file FROM raw.telegram_messages WHERE has_image = TRUE")
-            images = cur.fetchall()
-
-        for message_id, image_file in images:
-            image_path = Path(image_file)
-            if image_path.exists():
-                process_image(image_path, message_id, conn)
-            else:
-                logger.warning(f"Image not found: {image_path}")
+        detector = get_detector(
+            args.worker_socket, threads=args.threads,
+            backend=args.backend, int8=args.int8, inter_op_threads=args.inter_op_threads
+        )
+        # Throughput is logged by the engine
+        enrich_images(
+            conn,
+            detector,
+            batch_size=args.batch_size,
+            decode_workers=args.decode_workers,
+            insert_batch=args.insert_batch
+        )
+        push_metrics('enrich')
 
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
     finally:
+        if detector is not None:
+            detector.close()
         conn.close()
 
 if __name__ == "__main__":
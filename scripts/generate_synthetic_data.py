@@ -0,0 +1,217 @@
+import csv
+import json
+import zlib
+import hashlib
+import random
+import struct
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from enrich_with_yolo import MODEL_VERSION
+from log_files import file_logger
+
+logger = file_logger(__name__, 'synthetic_data.log')
+
+# ------------------------------
+# Generation settings
+# ------------------------------
+SYNTHETIC_DIR = Path('data/synthetic/telegram_messages')
+# Synthetic messages use their own id range so they can be removed afterwards
+SYNTHETIC_ID_OFFSET = 7_000_000_000
+# Synthetic message ids are SYNTHETIC_ID_OFFSET + n, far from real and other benchmark ids
+SYNTHETIC_ID_END = SYNTHETIC_ID_OFFSET + 1_000_000_000
+SYNTHETIC_SENDER_ID = -1007777777777
+SCALES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000
+}
+OUTPUT_FORMATS = ('json', 'jsonl')
+
+WORDS = [
+    'paracetamol', 'amoxicillin', 'cream', 'pill', 'syringe', 'bottle', 'price', 'birr',
+    'available', 'delivery', 'call', 'now', 'አዲስ', 'መድሃኒት', 'ዋጋ', 'ይደውሉ'
+]
+CLASSES = ('pill', 'cream', 'syringe', 'bottle', 'unknown')
+CLASSIFICATION_COLUMNS = ('message_id', 'image_file', 'object_class', 'confidence', 'model_version', 'image_hash')
+
+def detection_sets(count=256, seed=0):
+    """Fixed detection lists; an image's red channel selects which one it "contains"."""
+    rng = random.Random(seed)
+    return [
+        [(rng.choice(CLASSES), round(rng.uniform(0.3, 0.99), 4)) for _ in range(rng.choice((0, 1, 1, 2, 3)))]
+        for _ in range(count)
+    ]
+
+DETECTION_SETS = detection_sets()
+
+# ------------------------------
+# Placeholder images
+# ------------------------------
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def placeholder_png(rgb, size=64, tag=b''):
+    """Uniform-colour RGB PNG; ``tag`` goes into a tEXt chunk so each image has its own hash."""
+    row = b'\x00' + bytes(rgb) * size
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)),
+        _png_chunk(b'tEXt', b'Comment\x00' + tag),
+        _png_chunk(b'IDAT', zlib.compress(row * size)),
+        _png_chunk(b'IEND', b'')
+    ])
+
+# ------------------------------
+# Partitions
+# ------------------------------
+def channel_names(channels):
+    return [f"synthetic_{i}" for i in range(channels)]
+
+def channel_sender_id(channel):
+    """The marts identify a channel by its sender_id, so each synthetic channel gets its own."""
+    return SYNTHETIC_SENDER_ID - int(channel.rsplit('_', 1)[1])
+
+def partition_plan(messages, days, channels, start_date):
+    """[(date_str, channel, first_message_id, count)] spreading messages evenly over days x channels."""
+    names = channel_names(channels)
+    partitions = days * channels
+    base, extra = divmod(messages, partitions)
+    plan = []
+    for p in range(partitions):
+        day = (start_date + timedelta(days=p // channels)).isoformat()
+        first = SYNTHETIC_ID_OFFSET + p * base + min(p, extra)
+        plan.append((day, names[p % channels], first, base + (p < extra)))
+    return plan
+
+def generate_partition(out_dir, day, channel, first_id, count, seed=42, image_rate=0.3,
+                       duplicate_rate=0.05, image_size=64, output_format='jsonl'):
+    """Write one <date>/<channel> partition: messages, placeholder images and expected classifications.
+
+    Output depends only on the arguments, so partitions can be generated in any order or in parallel.
+    """
+    rng = random.Random(f"{seed}:{day}:{channel}")
+    channel_dir = Path(out_dir) / day / channel
+    channel_dir.mkdir(parents=True, exist_ok=True)
+    day_start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+    offsets = sorted(rng.randrange(86_400) for _ in range(count))
+
+    sender_id = channel_sender_id(channel)
+    messages = []
+    classifications = []
+    images = []  # (image bytes, detection set) of this partition, for reposts
+    for i, offset in enumerate(offsets):
+        message_id = first_id + i
+        image_file = None
+        if rng.random() < image_rate:
+            if images and rng.random() < duplicate_rate:
+                data, set_index = rng.choice(images)
+            else:
+                set_index = rng.randrange(len(DETECTION_SETS))
+                rgb = (set_index, rng.randrange(256), rng.randrange(256))
+                data = placeholder_png(rgb, image_size, str(message_id).encode())
+                images.append((data, set_index))
+            image_path = channel_dir / f"{channel}_{message_id}.png"
+            image_path.write_bytes(data)
+            image_file = str(image_path)
+            image_hash = hashlib.sha256(data).hexdigest()
+            for object_class, confidence in DETECTION_SETS[set_index]:
+                classifications.append((message_id, image_file, object_class, confidence, MODEL_VERSION, image_hash))
+
+        text = '' if rng.random() < 0.1 else ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))
+        messages.append({
+            'message_id': message_id,
+            'channel': channel,
+            'scrape_date': day,
+            'message_date': (day_start + timedelta(seconds=offset)).isoformat(),
+            'sender_id': sender_id,
+            'text': text,
+            'has_image': image_file is not None,
+            'image_file': image_file
+        })
+
+    output_file = channel_dir / f"{channel}.{output_format}"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if output_format == 'jsonl':
+            for msg in messages:
+                f.write(json.dumps(msg, ensure_ascii=False))
+                f.write('\n')
+        else:
+            json.dump(messages, f, ensure_ascii=False)
+    with open(channel_dir / 'classifications.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CLASSIFICATION_COLUMNS)
+        writer.writerows(classifications)
+    return {'messages': len(messages), 'images': sum(m['has_image'] for m in messages), 'classifications': len(classifications)}
+
+def generate(out_dir=SYNTHETIC_DIR, messages=SCALES['10k'], days=30, channels=3, start_date=date(2025, 1, 1),
+             seed=42, image_rate=0.3, duplicate_rate=0.05, image_size=64, output_format='jsonl', workers=1):
+    """Generate a synthetic lake and return its parameters and totals (also saved as synthetic.json)."""
+    out_dir = Path(out_dir)
+    options = dict(seed=seed, image_rate=image_rate, duplicate_rate=duplicate_rate,
+                   image_size=image_size, output_format=output_format)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    plan = partition_plan(messages, days, channels, start_date)
+    totals = {'messages': 0, 'images': 0, 'classifications': 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate_partition, out_dir, *partition, **options) for partition in plan]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+
+    summary = {
+        'messages': messages,
+        'days': days,
+        'channels': channel_names(channels),
+        'start_date': start_date.isoformat(),
+        'first_message_id': SYNTHETIC_ID_OFFSET,
+        'model_version': MODEL_VERSION,
+        **options,
+        'totals': totals
+    }
+    with open(out_dir / 'synthetic.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    logger.info(f"Generated {totals['messages']} messages in {len(plan)} partitions under {out_dir}")
+    return summary
+
+def parse_args(argv=None):
+    """Parse generator command-line options."""
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic data lake for benchmarks.")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', choices=SCALES, default='10k')
+    size.add_argument('--messages', type=int, help="exact message count (overrides --scale)")
+    parser.add_argument('--output-dir', type=Path, default=SYNTHETIC_DIR)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--start-date', type=date.fromisoformat, default=date(2025, 1, 1))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--image-rate', type=float, default=0.3, help="fraction of messages with an image")
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help="fraction of images reposted within a partition")
+    parser.add_argument('--image-size', type=int, default=64, help="placeholder image width and height in pixels")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='jsonl')
+    parser.add_argument('--workers', type=int, default=1, help="processes generating partitions")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Generate synthetic partitions and print their totals."""
+    args = parse_args(argv)
+    summary = generate(
+        args.output_dir,
+        messages=args.messages or SCALES[args.scale],
+        days=args.days,
+        channels=args.channels,
+        start_date=args.start_date,
+        seed=args.seed,
+        image_rate=args.image_rate,
+        duplicate_rate=args.duplicate_rate,
+        image_size=args.image_size,
+        output_format=args.output_format,
+        workers=args.workers
+    )
+    print(json.dumps(summary['totals']))
+
+if __name__ == "__main__":
+    main()
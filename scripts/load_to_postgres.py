@@ -1,20 +1,23 @@
 import os
+import io
 import json
-import logging
+import hashlib
+import argparse
+from functools import partial
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import psycopg2
 from dotenv import load_dotenv
 
+from pipeline_metrics import timed_stage, push_metrics
+from log_files import file_logger
+from partitioning import RAW_PARTITIONED, ensure_partitions, is_partitioned, message_conflict_target, table_exists
+
 # ------------------------------
 # Set up logging
 # ------------------------------
-Path('scripts/logs').mkdir(parents=True, exist_ok=True)
-logging.basicConfig(
-    filename='scripts/logs/loading.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+logger = file_logger(__name__, 'loading.log')
 
 # ------------------------------
 # Load environment variables
@@ -31,11 +34,37 @@ db_params = {
 # ------------------------------
 # Create table with PRIMARY KEY
 # ------------------------------
-def create_raw_table(conn):
-    """Create the raw messages table if it doesn't exist, with a PRIMARY KEY on message_id."""
-    create_table_query = """
+def raw_table_ddl(table='raw.telegram_messages', partitioned=False):
+    """DDL for the raw messages table, plain or range-partitioned by month on message_date."""
+    name = table.split('.')[1]
+    if partitioned:
+        return f"""
+    CREATE SCHEMA IF NOT EXISTS raw;
+    CREATE TABLE IF NOT EXISTS {table} (
+        message_id BIGINT,
+        channel VARCHAR,
+        scrape_date DATE,
+        message_date TIMESTAMP NOT NULL,
+        sender_id BIGINT,
+        text TEXT,
+        has_image BOOLEAN,
+        image_file VARCHAR,
+        message_length INTEGER,
+        load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        -- Unique constraints on a partitioned table must include the partition key
+        PRIMARY KEY (message_id, message_date)
+    ) PARTITION BY RANGE (message_date);
+    -- Catches rows outside the monthly partitions until ensure_partitions moves them
+    CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;
+    CREATE INDEX IF NOT EXISTS {name}_message_date_brin
+        ON {table} USING BRIN (message_date);
+    -- dbt's incremental staging model selects rows by load_timestamp
+    CREATE INDEX IF NOT EXISTS {name}_load_timestamp_brin
+        ON {table} USING BRIN (load_timestamp);
+    """
+    return f"""
     CREATE SCHEMA IF NOT EXISTS raw;
-    CREATE TABLE IF NOT EXISTS raw.telegram_messages (
+    CREATE TABLE IF NOT EXISTS {table} (
         message_id BIGINT PRIMARY KEY,
         channel VARCHAR,
         scrape_date DATE,
@@ -47,71 +76,493 @@ def create_raw_table(conn):
         message_length INTEGER,
         load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
+    -- Messages arrive roughly in message_date order, so a tiny BRIN index serves date ranges
+    CREATE INDEX IF NOT EXISTS {name}_message_date_brin
+        ON {table} USING BRIN (message_date);
+    -- dbt's incremental staging model selects rows by load_timestamp
+    CREATE INDEX IF NOT EXISTS {name}_load_timestamp_idx
+        ON {table} (load_timestamp);
+    """
+
+def create_raw_table(conn, partitioned=RAW_PARTITIONED):
+    """Create the raw messages table if it doesn't exist, with a PRIMARY KEY on message_id.
+
+    ``partitioned`` (env RAW_PARTITIONED) creates it range-partitioned by month
+    on message_date, keyed on (message_id, message_date), and creates upcoming
+    partitions. An existing table keeps its layout; see partitioning.py to migrate.
     """
     try:
+        if table_exists(conn, 'raw.telegram_messages'):
+            partitioned = is_partitioned(conn, 'raw.telegram_messages')
         with conn.cursor() as cur:
-            cur.execute(create_table_query)
+            cur.execute(raw_table_ddl(partitioned=partitioned))
             conn.commit()
-        logger.info("Ensured raw.telegram_messages table exists with PRIMARY KEY")
+        if partitioned:
+            ensure_partitions(conn, 'raw.telegram_messages', 'message_date')
+        layout = 'partitioned by month on message_date' if partitioned else 'unpartitioned'
+        logger.info(f"Ensured raw.telegram_messages table exists with PRIMARY KEY ({layout})")
     except Exception as e:
         logger.error(f"Error creating table: {str(e)}")
         conn.rollback()
 
+# ------------------------------
+# Load manifest
+# ------------------------------
+def create_manifest_table(conn):
+    """Create the raw.load_manifest table recording which lake files were loaded."""
+    create_table_query = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+    CREATE TABLE IF NOT EXISTS raw.load_manifest (
+        file_path VARCHAR PRIMARY KEY,
+        file_size BIGINT,
+        file_mtime DOUBLE PRECISION,
+        content_hash CHAR(64),
+        inserted INTEGER,
+        skipped INTEGER,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(create_table_query)
+            conn.commit()
+        logger.info("Ensured raw.load_manifest table exists")
+    except Exception as e:
+        logger.error(f"Error creating manifest table: {str(e)}")
+        conn.rollback()
+
+def fetch_manifest(conn):
+    """Return {file_path: (file_size, file_mtime, content_hash)} for loaded files."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT file_path, file_size, file_mtime, content_hash FROM raw.load_manifest")
+        return {row[0]: (row[1], row[2], row[3]) for row in cur.fetchall()}
+
+def file_hash(path):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def record_manifest(conn, path, size, mtime, content_hash, inserted=None, skipped=None):
+    """Upsert a file's manifest entry; load counts are kept when not supplied."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO raw.load_manifest (
+                file_path, file_size, file_mtime, content_hash, inserted, skipped
+            ) VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (file_path) DO UPDATE SET
+                file_size = EXCLUDED.file_size,
+                file_mtime = EXCLUDED.file_mtime,
+                content_hash = EXCLUDED.content_hash,
+                inserted = COALESCE(EXCLUDED.inserted, raw.load_manifest.inserted),
+                skipped = COALESCE(EXCLUDED.skipped, raw.load_manifest.skipped),
+                loaded_at = CURRENT_TIMESTAMP
+        """, (str(path), size, mtime, content_hash, inserted, skipped))
+    conn.commit()
+
+def plan_files(files, manifest, conn, full_refresh=False):
+    """Return [(path, size, mtime, content_hash)] for files that need loading.
+
+    Files whose size and mtime match the manifest are skipped without being
+    opened. A changed mtime with an unchanged hash only refreshes the entry.
+    """
+    pending = []
+    unchanged = 0
+    for path in files:
+        stat = path.stat()
+        entry = manifest.get(str(path))
+        if not full_refresh and entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            unchanged += 1
+            continue
+
+        content_hash = file_hash(path)
+        if not full_refresh and entry and entry[2] == content_hash:
+            record_manifest(conn, path, stat.st_size, stat.st_mtime, content_hash)
+            unchanged += 1
+            continue
+
+        pending.append((path, stat.st_size, stat.st_mtime, content_hash))
+    logger.info(f"Manifest: {len(pending)} files to load, {unchanged} unchanged")
+    return pending
+
+# ------------------------------
+# Shared row mapping
+# ------------------------------
+MESSAGE_COLUMNS = (
+    'message_id', 'channel', 'scrape_date', 'message_date', 'sender_id',
+    'text', 'has_image', 'image_file', 'message_length'
+)
+
+def message_row(msg):
+    """Map a scraped message dict to a raw.telegram_messages row tuple."""
+    text = msg['text'] or ''
+    return (
+        msg['message_id'],
+        msg['channel'],
+        msg['scrape_date'],
+        msg['message_date'],
+        msg['sender_id'],
+        text,
+        msg['has_image'],
+        msg['image_file'],
+        len(text)
+    )
+
+# A message_id seen in several partition files resolves to the copy from the
+# earliest (scrape_date, channel), whatever order the files are loaded in.
+# A partitioned table is keyed on (message_id, message_date); see upsert_clause.
+ON_CONFLICT_KEEP_EARLIEST = """
+    ON CONFLICT ({conflict_target}) DO UPDATE SET
+        channel = EXCLUDED.channel,
+        scrape_date = EXCLUDED.scrape_date,
+        message_date = EXCLUDED.message_date,
+        sender_id = EXCLUDED.sender_id,
+        text = EXCLUDED.text,
+        has_image = EXCLUDED.has_image,
+        image_file = EXCLUDED.image_file,
+        message_length = EXCLUDED.message_length,
+        load_timestamp = CURRENT_TIMESTAMP
+    WHERE (EXCLUDED.scrape_date, EXCLUDED.channel)
+        < (raw.telegram_messages.scrape_date, raw.telegram_messages.channel)
+"""
+# rowcount also counts rows replaced by an earlier copy; xmax is 0 only on a fresh insert
+RETURNING_INSERTED = " RETURNING (xmax = 0) AS inserted"
+
+def upsert_clause(conn):
+    """ON_CONFLICT_KEEP_EARLIEST with the conflict target of the table's current layout."""
+    return ON_CONFLICT_KEEP_EARLIEST.format(conflict_target=message_conflict_target(conn))
+
+def copy_value(value):
+    """Encode a single value for COPY ... FROM STDIN in text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+def copy_buffer(messages):
+    """Text-format COPY input with one raw.telegram_messages row per message."""
+    buffer = io.StringIO()
+    for msg in messages:
+        buffer.write('\t'.join(copy_value(v) for v in message_row(msg)))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+# ------------------------------
+# Streaming message readers
+# ------------------------------
+BATCH_SIZE = 10_000
+LAKE_DIR = Path('data/raw/telegram_messages')
+LAKE_PATTERNS = ('*/*/*.json', '*/*/*.jsonl')
+# Written by compact_lake.py as <date>/<channel>.parquet
+PARQUET_DIR = Path('data/raw/telegram_messages_parquet')
+PARQUET_PATTERNS = ('*/*.parquet',)
+SOURCES = {
+    'json': (LAKE_DIR, LAKE_PATTERNS),
+    'parquet': (PARQUET_DIR, PARQUET_PATTERNS)
+}
+
+def lake_files(source='json', date_str=None, channel=None, data_dir=None):
+    """Sorted lake files of a source, optionally limited to one date and/or channel partition.
+
+    ``data_dir`` reads another lake with the same layout, e.g. generated benchmark data.
+    """
+    default_dir, patterns = SOURCES[source]
+    data_dir = Path(data_dir) if data_dir else default_dir
+    files = []
+    for pattern in patterns:
+        parts = pattern.split('/')
+        if date_str:
+            parts[0] = date_str
+        if channel:
+            # <date>/<channel>/<file> for JSON, <date>/<channel>.parquet for Parquet
+            parts[1] = channel if len(parts) == 3 else f"{channel}{Path(parts[1]).suffix}"
+        files.extend(data_dir.glob('/'.join(parts)))
+    return sorted(files)
+
+VALUE_DELIMITERS = ',] \t\r\n'
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array, holding at most one chunk in memory."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    state = 'open'  # open -> first -> (item -> sep)* -> close
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError(f"Unexpected end of JSON array in {getattr(f, 'name', f)}")
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+
+        char = buffer[pos]
+        if state == 'open':
+            if char != '[':
+                raise ValueError(f"Expected a JSON array in {getattr(f, 'name', f)}")
+            pos += 1
+            state = 'first'
+        elif state == 'sep' or (state == 'first' and char == ']'):
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Malformed JSON array in {getattr(f, 'name', f)}")
+            pos += 1
+            state = 'item'
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # A number cut at the chunk edge still decodes ("2." as 2), so a
+                # value only counts once a delimiter follows it
+                complete = eof or (end < len(buffer) and buffer[end] in VALUE_DELIMITERS)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                more = f.read(chunk_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+            state = 'sep'
+
+def iter_parquet(path, batch_size=BATCH_SIZE):
+    """Stream message dicts from a compacted Parquet file, one batch at a time.
+
+    Dates are turned back into strings by Arrow, as in the JSON lake, which is
+    much cheaper than building a datetime object per row. message_date is
+    stored as UTC and raw.telegram_messages.message_date is a naive UTC TIMESTAMP.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    as_text = {'scrape_date': pa.string(), 'message_date': pa.timestamp('us')}
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        for name, cast_type in as_text.items():
+            index = batch.schema.get_field_index(name)
+            column = batch.column(index).cast(cast_type).cast(pa.string())
+            batch = batch.set_column(index, name, column)
+        yield from batch.to_pylist()
+
+def iter_messages(path):
+    """Stream message dicts from a .json array file, a .jsonl file or a .parquet file."""
+    if Path(path).suffix == '.parquet':
+        yield from iter_parquet(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        if Path(path).suffix == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 # ------------------------------
 # Load JSON -> PostgreSQL safely
 # ------------------------------
 def load_json_to_postgres(json_file, conn):
     """Load a JSON file into the raw.telegram_messages table, skip duplicates."""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            messages = json.load(f)
-
         inserted = 0
         skipped = 0
 
+        upsert = upsert_clause(conn)
+        # Row locks are taken in message_id order, as in the bulk merge, so workers
+        # loading overlapping files in parallel cannot deadlock on the same keys
+        messages = sorted(iter_messages(json_file), key=lambda msg: msg['message_id'])
         with conn.cursor() as cur:
             for msg in messages:
-                message_length = len(msg['text'] or '')
                 cur.execute("""
                     INSERT INTO raw.telegram_messages (
                         message_id, channel, scrape_date, message_date, sender_id,
                         text, has_image, image_file, message_length
                     ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (message_id) DO NOTHING
-                """, (
-                    msg['message_id'],
-                    msg['channel'],
-                    msg['scrape_date'],
-                    msg['message_date'],
-                    msg['sender_id'],
-                    msg['text'] or '',
-                    msg['has_image'],
-                    msg['image_file'],
-                    message_length
-                ))
-                if cur.rowcount == 1:
+                """ + upsert + RETURNING_INSERTED, message_row(msg))
+                row = cur.fetchone()
+                if row and row[0]:
                     inserted += 1
                 else:
                     skipped += 1
 
             conn.commit()
         logger.info(f"Loaded {inserted} new, skipped {skipped} duplicates from {json_file}")
+        return inserted, skipped
     except Exception as e:
         logger.error(f"Error loading {json_file}: {str(e)}")
         conn.rollback()
+        return None
+
+# ------------------------------
+# Bulk COPY -> staging -> merge
+# ------------------------------
+def load_json_to_postgres_bulk(json_file, conn, batch_size=BATCH_SIZE):
+    """Stream a file via COPY into a temp staging table in batches, then merge with one upsert."""
+    try:
+        total = 0
+        columns = ', '.join(MESSAGE_COLUMNS)
+        upsert = upsert_clause(conn)
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS stage_telegram_messages
+                (LIKE raw.telegram_messages INCLUDING DEFAULTS)
+                ON COMMIT DELETE ROWS
+            """)
+            for batch in batched(iter_messages(json_file), batch_size):
+                cur.copy_expert(
+                    f"COPY stage_telegram_messages ({columns}) FROM STDIN",
+                    copy_buffer(batch)
+                )
+                total += len(batch)
+            # DISTINCT ON guards against a message_id repeated within one file
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO raw.telegram_messages ({columns})
+                    SELECT DISTINCT ON (message_id) {columns}
+                    FROM stage_telegram_messages
+                    ORDER BY message_id
+                    {upsert}{RETURNING_INSERTED}
+                )
+                SELECT count(*) FILTER (WHERE inserted) FROM merged
+            """)
+            inserted = cur.fetchone()[0]
+            conn.commit()
+
+        skipped = total - inserted
+        logger.info(f"Bulk loaded {inserted} new, skipped {skipped} duplicates from {json_file}")
+        return inserted, skipped
+    except Exception as e:
+        logger.error(f"Error bulk loading {json_file}: {str(e)}")
+        conn.rollback()
+        return None
+
+# ------------------------------
+# Parallel workers
+# ------------------------------
+_worker_conn = None
+
+def _init_worker():
+    """Open one connection per worker process, closed when the process exits.
+
+    Pool workers leave through os._exit, which skips atexit; multiprocessing
+    finalizers still run.
+    """
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**db_params)
+    Finalize(None, _worker_conn.close, exitpriority=10)
+
+def get_loader(bulk=False, batch_size=BATCH_SIZE):
+    """Return the load function for the chosen mode as f(json_file, conn)."""
+    if bulk:
+        return partial(load_json_to_postgres_bulk, batch_size=batch_size)
+    return load_json_to_postgres
+
+def _load_in_worker(json_file, bulk, batch_size):
+    """Load one file on the worker's own connection; each file is its own transaction."""
+    return get_loader(bulk, batch_size)(json_file, _worker_conn)
+
+def load_files(pending, conn, bulk=False, workers=1, batch_size=BATCH_SIZE):
+    """Load pending manifest entries and return aggregated {files, inserted, skipped, failed}."""
+    summary = {'files': 0, 'inserted': 0, 'skipped': 0, 'failed': 0}
+
+    def collect(entry, result):
+        json_file, size, mtime, content_hash = entry
+        if result is None:
+            summary['failed'] += 1
+            return
+        summary['files'] += 1
+        summary['inserted'] += result[0]
+        summary['skipped'] += result[1]
+        record_manifest(conn, json_file, size, mtime, content_hash, *result)
+
+    if workers <= 1:
+        load_file = get_loader(bulk, batch_size)
+        for entry in pending:
+            collect(entry, load_file(entry[0], conn))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_load_in_worker, entry[0], bulk, batch_size): entry for entry in pending}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Worker failed on {entry[0]}: {str(e)}")
+                result = None
+            collect(entry, result)
+    return summary
 
 # ------------------------------
 # Run Loader
 # ------------------------------
-def main():
-    """Load all JSON files from the data lake into PostgreSQL."""
-    data_dir = Path('data/raw/telegram_messages')
+def parse_args(argv=None):
+    """Parse loader command-line options."""
+    parser = argparse.ArgumentParser(description="Load the Telegram data lake into PostgreSQL.")
+    parser.add_argument(
+        '--bulk', action='store_true',
+        help="COPY each file into a temp staging table and merge with one upsert"
+    )
+    parser.add_argument(
+        '--full-refresh', action='store_true',
+        help="ignore the load manifest and reload every file in the data lake"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="number of worker processes, each loading files over its own connection"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=BATCH_SIZE,
+        help="messages per COPY batch in --bulk mode"
+    )
+    parser.add_argument(
+        '--source', choices=SOURCES, default='json',
+        help="read the JSON lake or the Parquet partitions written by compact_lake.py"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Load new or changed JSON/JSONL/Parquet files from the data lake into PostgreSQL."""
+    args = parse_args(argv)
     conn = psycopg2.connect(**db_params)
 
     try:
         create_raw_table(conn)
-        for json_file in data_dir.glob('*/*/*.json'):
-            load_json_to_postgres(json_file, conn)
+        create_manifest_table(conn)
+        with timed_stage('load') as items:
+            files = lake_files(args.source)
+            pending = plan_files(files, fetch_manifest(conn), conn, full_refresh=args.full_refresh)
+            summary = load_files(
+                pending, conn, bulk=args.bulk, workers=args.workers, batch_size=args.batch_size
+            )
+            items.update(summary)
+        push_metrics('load')
+        logger.info(
+            f"Loaded {summary['files']} files with {args.workers} worker(s): "
+            f"{summary['inserted']} new, {summary['skipped']} skipped, {summary['failed']} failed"
+        )
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
     finally:
@@ -0,0 +1,23 @@
+import logging
+from pathlib import Path
+
+# Beside the scripts, whatever directory they are run from
+LOG_DIR = Path(__file__).resolve().parent / 'logs'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def file_logger(name, filename, level=logging.INFO):
+    """Logger ``name`` writing to scripts/logs/<filename>.
+
+    Each module gets its own handler instead of configuring the root logger,
+    so importing several scripts into one process (Dagster, the benchmark
+    runner) keeps every module's records in its own file.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    path = (LOG_DIR / filename).resolve()
+    if not any(getattr(h, 'baseFilename', None) == str(path) for h in logger.handlers):
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    return logger
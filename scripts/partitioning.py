@@ -0,0 +1,314 @@
+import os
+import sys
+import argparse
+from datetime import date
+
+from log_files import file_logger
+
+logger = file_logger(__name__, 'partitioning.log')
+
+# ------------------------------
+# Monthly range partitions for the raw tables
+# ------------------------------
+# Layout for newly created raw tables; an existing table keeps its layout
+RAW_PARTITIONED = os.getenv('RAW_PARTITIONED', 'false').lower() in ('1', 'true', 'yes')
+# Empty partitions kept ready beyond the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv('RAW_PARTITION_MONTHS_AHEAD', '3'))
+# Rows changed this long before a catch-up watermark are copied again, so a load
+# transaction that started before the watermark but committed after it is not missed
+MIGRATION_LOOKBACK = os.getenv('RAW_MIGRATION_LOOKBACK', '1 hour')
+
+# Partitioned table -> (partition column, primary key columns)
+PARTITIONED_TABLES = {
+    'raw.telegram_messages': ('message_date', ('message_id', 'message_date')),
+    'raw.image_classifications': ('load_timestamp', ('classification_id', 'load_timestamp'))
+}
+
+def table_exists(conn, table):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        return cur.fetchone()[0]
+
+def is_partitioned(conn, table):
+    """True when the table exists and is a declaratively partitioned table."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+def message_conflict_target(conn):
+    """ON CONFLICT columns for raw.telegram_messages: a partitioned table's key includes message_date.
+
+    On the partitioned layout, a re-scraped message whose message_date differs
+    from the stored copy does not conflict. It is inserted as a second row, and
+    the loader's keep-earliest rule does not apply to it.
+    """
+    if is_partitioned(conn, 'raw.telegram_messages'):
+        return 'message_id, message_date'
+    return 'message_id'
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    """raw.telegram_messages, 2025-01 -> raw.telegram_messages_p202501"""
+    return f"{table}_p{month:%Y%m}"
+
+def existing_partitions(conn, table):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.oid::regclass::TEXT
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+        """, (table,))
+        return {row[0] for row in cur.fetchall()}
+
+def create_partition(conn, table, column, month):
+    """Create one monthly partition, moving any of its rows out of the default partition first."""
+    partition = partition_name(table, month)
+    bounds = (month, add_months(month, 1))
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {column} >= %s AND {column} < %s)", bounds
+        )
+        if not cur.fetchone()[0]:
+            cur.execute(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+            return partition
+        # Rows in the default partition would make a plain CREATE ... PARTITION OF fail
+        cur.execute(f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {table}_default WHERE {column} >= %s AND {column} < %s RETURNING *
+            )
+            INSERT INTO {partition} SELECT * FROM moved
+        """, bounds)
+        logger.info(f"Moved {cur.rowcount} rows from {table}_default into {partition}")
+        cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM (%s) TO (%s)", bounds)
+    return partition
+
+def ensure_partitions(conn, table, column, months_ahead=PARTITION_MONTHS_AHEAD, since=None):
+    """Create missing monthly partitions up to ``months_ahead`` past the current month; returns their names.
+
+    Months of rows that landed in the default partition (old history or far
+    future dates) get their own partitions too, starting at ``since`` if given.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}_default")
+        oldest, newest = cur.fetchone()
+    current = month_start(date.today())
+    first = min(month_start(d) for d in (since, oldest, current) if d)
+    last = max(month_start(d) for d in (newest, add_months(current, months_ahead)) if d)
+
+    existing = existing_partitions(conn, table)
+    created = []
+    month = first
+    while month <= last:
+        if partition_name(table, month) not in existing:
+            created.append(create_partition(conn, table, column, month))
+        month = add_months(month, 1)
+    conn.commit()
+    if created:
+        logger.info(f"Created {len(created)} partition(s) of {table}: {', '.join(created)}")
+    return created
+
+def ensure_all_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD):
+    """ensure_partitions for every raw table that is partitioned."""
+    created = []
+    for table, (column, _) in PARTITIONED_TABLES.items():
+        if is_partitioned(conn, table):
+            created += ensure_partitions(conn, table, column, months_ahead)
+    return created
+
+# ------------------------------
+# Online migration from a plain table
+# ------------------------------
+def table_columns(conn, table):
+    schema, name = table.split('.')
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+            ORDER BY ordinal_position
+        """, (schema, name))
+        return [row[0] for row in cur.fetchall()]
+
+def copy_rows(cur, source, target, columns, key, where, params):
+    """Upsert the source rows matching ``where`` into the partitioned target; returns rows written."""
+    column_list = ', '.join(columns)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns if c not in key)
+    cur.execute(f"""
+        INSERT INTO {target} ({column_list})
+        SELECT {column_list} FROM {source} WHERE {where}
+        ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}
+    """, params)
+    return cur.rowcount
+
+def rename_owned(cur, table, old_prefix, new_prefix):
+    """Rename the indexes and sequences of ``table`` from old_prefix* to new_prefix*."""
+    cur.execute("""
+        SELECT c.relname, 'INDEX' FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %(table)s::regclass
+        UNION
+        SELECT c.relname, 'SEQUENCE' FROM pg_depend d JOIN pg_class c ON c.oid = d.objid
+        WHERE d.refobjid = %(table)s::regclass AND c.relkind = 'S'
+    """, {'table': table})
+    schema = table.split('.')[0]
+    for relname, kind in cur.fetchall():
+        if relname.startswith(old_prefix):
+            cur.execute(f"ALTER {kind} {schema}.{relname} RENAME TO {new_prefix}{relname[len(old_prefix):]}")
+
+def migrate_table(conn, table, create_ddl, months_ahead=PARTITION_MONTHS_AHEAD, max_catchup_rounds=5):
+    """Move a plain raw table to the partitioned layout while loads keep running.
+
+    1. Build ``<table>_partitioned`` from ``create_ddl(name, partitioned=True)``.
+    2. Copy history one month per transaction.
+    3. Copy rows loaded since the copy started (by load_timestamp), repeating
+       while the backlog shrinks.
+    4. Under a brief ACCESS EXCLUSIVE lock, copy the last changes, drop foreign
+       keys into the old table (a partitioned key cannot back them) and swap
+       names. The old table stays as ``<table>_unpartitioned`` until dropped.
+    """
+    column, key = PARTITIONED_TABLES[table]
+    _, name = table.split('.')
+    staged = f"{table}_partitioned"
+    if is_partitioned(conn, table):
+        logger.info(f"{table} is already partitioned")
+        return 0
+
+    with conn.cursor() as cur:
+        cur.execute(create_ddl(staged, partitioned=True))
+        cur.execute(f"SELECT MIN({column}), MAX({column}), COUNT(*) FILTER (WHERE {column} IS NULL) FROM {table}")
+        oldest, newest, unkeyed = cur.fetchone()
+        cur.execute("SELECT clock_timestamp()")
+        watermark = cur.fetchone()[0]
+    conn.commit()
+    if unkeyed:
+        logger.warning(f"{unkeyed} rows of {table} have no {column} and will not be migrated")
+    ensure_partitions(conn, staged, column, months_ahead, since=oldest)
+
+    columns = [c for c in table_columns(conn, table) if c in set(table_columns(conn, staged))]
+    copied = 0
+    if oldest:
+        month, last = month_start(oldest), month_start(newest)
+        while month <= last:
+            with conn.cursor() as cur:
+                copied += copy_rows(
+                    cur, table, staged, columns, key,
+                    f"{column} >= %s AND {column} < %s", (month, add_months(month, 1))
+                )
+            conn.commit()
+            logger.info(f"Copied {table} rows for {month:%Y-%m} ({copied} so far)")
+            month = add_months(month, 1)
+
+    changed_since = "load_timestamp >= %s::TIMESTAMP - %s::INTERVAL"
+    for _ in range(max_catchup_rounds):
+        with conn.cursor() as cur:
+            cur.execute("SELECT clock_timestamp()")
+            next_watermark = cur.fetchone()[0]
+            caught_up = copy_rows(cur, table, staged, columns, key, changed_since, (watermark, MIGRATION_LOOKBACK))
+        conn.commit()
+        watermark = next_watermark
+        logger.info(f"Caught up {caught_up} rows of {table} changed during the copy")
+        if caught_up < 10_000:
+            break
+
+    with conn.cursor() as cur:
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        copy_rows(cur, table, staged, columns, key, changed_since, (watermark, MIGRATION_LOOKBACK))
+        cur.execute("""
+            SELECT conrelid::regclass::TEXT, conname FROM pg_constraint
+            WHERE confrelid = %s::regclass AND contype = 'f'
+        """, (table,))
+        for referencing, constraint in cur.fetchall():
+            cur.execute(f"ALTER TABLE {referencing} DROP CONSTRAINT {constraint}")
+            logger.warning(f"Dropped foreign key {constraint} on {referencing}: {table} is now partitioned")
+        cur.execute("""
+            SELECT DISTINCT v.oid::regclass::TEXT
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.refobjid = %s::regclass AND v.oid <> d.refobjid
+        """, (table,))
+        views = [row[0] for row in cur.fetchall()]
+
+        cur.execute(f"ALTER TABLE {table} RENAME TO {name}_unpartitioned")
+        rename_owned(cur, f"{table}_unpartitioned", f"{name}_", f"{name}_unpartitioned_")
+        cur.execute(f"ALTER TABLE {staged} RENAME TO {name}")
+        rename_owned(cur, table, f"{name}_partitioned_", f"{name}_")
+        for partition in existing_partitions(conn, table):
+            suffix = partition.split('.')[1][len(f"{name}_partitioned_"):]
+            cur.execute(f"ALTER TABLE {partition} RENAME TO {name}_{suffix}")
+        # Serial columns continue after the copied ids
+        for serial_column in columns:
+            cur.execute("SELECT pg_get_serial_sequence(%s, %s)", (table, serial_column))
+            sequence = cur.fetchone()[0]
+            if sequence:
+                cur.execute(
+                    f"SELECT setval(%s, COALESCE(MAX({serial_column}), 0) + 1, false) FROM {table}", (sequence,)
+                )
+    conn.commit()
+    if views:
+        logger.warning(f"Views still reading {table}_unpartitioned, re-run dbt to rebind: {', '.join(views)}")
+    logger.info(f"Migrated {table} to monthly partitions on {column}; old rows kept in {table}_unpartitioned")
+    return copied
+
+# ------------------------------
+# CLI
+# ------------------------------
+def partition_report(conn, table):
+    """[(partition, estimated rows)] of a partitioned table."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.oid::regclass::TEXT, c.reltuples::BIGINT
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            ORDER BY 1
+        """, (table,))
+        return cur.fetchall()
+
+def parse_args(argv=None):
+    """Parse partition maintenance options."""
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the raw tables.")
+    parser.add_argument('command', choices=('ensure', 'migrate', 'status'))
+    parser.add_argument('--tables', nargs='+', choices=PARTITIONED_TABLES, default=list(PARTITIONED_TABLES))
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Create upcoming partitions, migrate plain tables online, or list partitions."""
+    import psycopg2
+    from load_to_postgres import db_params, raw_table_ddl
+    from enrich_with_yolo import classifications_table_ddl
+
+    args = parse_args(argv)
+    ddl = {
+        'raw.telegram_messages': raw_table_ddl,
+        'raw.image_classifications': classifications_table_ddl
+    }
+    conn = psycopg2.connect(**db_params)
+    try:
+        for table in args.tables:
+            if args.command == 'migrate':
+                migrate_table(conn, table, ddl[table], args.months_ahead)
+            elif not is_partitioned(conn, table):
+                print(f"{table}: not partitioned")
+            elif args.command == 'ensure':
+                created = ensure_partitions(conn, table, PARTITIONED_TABLES[table][0], args.months_ahead)
+                print(f"{table}: {len(created)} partition(s) created")
+            else:
+                for partition, rows in partition_report(conn, table):
+                    print(f"{partition:<48} {rows:>12}")
+    except Exception as e:
+        logger.error(f"Partition {args.command} failed: {str(e)}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
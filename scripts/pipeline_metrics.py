@@ -0,0 +1,75 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from prometheus_client import CollectorRegistry, Gauge, push_to_gateway, write_to_textfile
+
+from log_files import file_logger
+
+logger = file_logger(__name__, 'pipeline_metrics.log')
+
+# ------------------------------
+# Batch-job metrics: gauges describing the last run of each stage
+# ------------------------------
+# Directory scraped by node_exporter's textfile collector (one .prom file per job)
+METRICS_DIR = Path(os.getenv('PIPELINE_METRICS_DIR', 'scripts/metrics'))
+# Optional Prometheus Pushgateway, e.g. http://pushgateway:9091
+PUSHGATEWAY_URL = os.getenv('PIPELINE_PUSHGATEWAY_URL')
+
+registry = CollectorRegistry()
+STAGE_DURATION = Gauge(
+    'telepharm_pipeline_stage_duration_seconds',
+    'Wall-clock seconds of the last run of a pipeline stage',
+    ['stage', 'channel'],
+    registry=registry
+)
+STAGE_ITEMS = Gauge(
+    'telepharm_pipeline_stage_items',
+    'Items processed by the last run of a pipeline stage',
+    ['stage', 'channel', 'item'],
+    registry=registry
+)
+STAGE_THROUGHPUT = Gauge(
+    'telepharm_pipeline_stage_items_per_second',
+    'Items per second during the last run of a pipeline stage',
+    ['stage', 'channel', 'item'],
+    registry=registry
+)
+STAGE_LAST_SUCCESS = Gauge(
+    'telepharm_pipeline_stage_last_success_timestamp_seconds',
+    'Unix time the stage last completed',
+    ['stage', 'channel'],
+    registry=registry
+)
+
+def record_stage(stage, seconds, channel='all', **items):
+    """Record a completed stage's duration, item counts and throughput."""
+    STAGE_DURATION.labels(stage, channel).set(seconds)
+    STAGE_LAST_SUCCESS.labels(stage, channel).set_to_current_time()
+    for item, count in items.items():
+        STAGE_ITEMS.labels(stage, channel, item).set(count)
+        STAGE_THROUGHPUT.labels(stage, channel, item).set(count / seconds if seconds else 0.0)
+
+@contextmanager
+def timed_stage(stage, channel='all'):
+    """Time a block and record it with the item counts put in the yielded dict; failures are not recorded."""
+    items = {}
+    start = time.perf_counter()
+    yield items
+    record_stage(stage, time.perf_counter() - start, channel, **items)
+
+def push_metrics(job, **grouping):
+    """Write the recorded metrics to <METRICS_DIR>/<job>[_<grouping>].prom and, if configured, the Pushgateway.
+
+    Metrics are best-effort: errors are logged and never fail the job.
+    """
+    name = '_'.join([job, *(str(value) for value in grouping.values())])
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        # write_to_textfile writes a temp file and renames it, so scrapes never see a partial file
+        write_to_textfile(str(METRICS_DIR / f"{name}.prom"), registry)
+        if PUSHGATEWAY_URL:
+            push_to_gateway(PUSHGATEWAY_URL, job=f"telepharm_{job}", grouping_key=grouping, registry=registry)
+    except Exception as e:
+        logger.error(f"Error publishing {job} metrics: {str(e)}")
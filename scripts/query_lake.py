@@ -0,0 +1,97 @@
+import sys
+import argparse
+from datetime import date
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from load_to_postgres import PARQUET_DIR
+from compact_lake import MESSAGE_SCHEMA
+
+def lake_files(lake_dir=PARQUET_DIR, channels=None, date_from=None, date_to=None):
+    """Parquet files whose <date>/<channel>.parquet path can match the filters, pruned without opening them."""
+    files = []
+    for path in sorted(Path(lake_dir).glob('*/*.parquet')):
+        try:
+            day = date.fromisoformat(path.parent.name)
+        except ValueError:
+            continue
+        if date_from and day < date_from or date_to and day > date_to:
+            continue
+        if channels and path.stem not in channels:
+            continue
+        files.append(str(path))
+    return files
+
+def lake_filter(channels=None, date_from=None, date_to=None, text=None):
+    """Arrow predicate evaluated against row-group statistics and then rows."""
+    conditions = []
+    if channels:
+        conditions.append(ds.field('channel').isin(channels))
+    if date_from:
+        conditions.append(ds.field('scrape_date') >= pa.scalar(date_from, pa.date32()))
+    if date_to:
+        conditions.append(ds.field('scrape_date') <= pa.scalar(date_to, pa.date32()))
+    if text:
+        conditions.append(pc.match_substring(ds.field('text'), text, ignore_case=True))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def read_lake(columns=None, channels=None, date_from=None, date_to=None, text=None, lake_dir=PARQUET_DIR):
+    """Read only the requested columns of matching rows from the Parquet lake."""
+    files = lake_files(lake_dir, channels, date_from, date_to)
+    if not files:
+        return MESSAGE_SCHEMA.empty_table().select(columns or MESSAGE_SCHEMA.names)
+    dataset = ds.dataset(files, format='parquet', schema=MESSAGE_SCHEMA)
+    return dataset.to_table(columns=columns, filter=lake_filter(channels, date_from, date_to, text))
+
+def daily_summary(table):
+    """Messages and images per channel and scrape date."""
+    table = table.append_column('images', pc.cast(table['has_image'], pa.int64()))
+    return (
+        table.group_by(['channel', 'scrape_date'])
+        .aggregate([('message_id', 'count'), ('images', 'sum')])
+        .select(['channel', 'scrape_date', 'message_id_count', 'images_sum'])
+        .rename_columns(['channel', 'scrape_date', 'messages', 'images'])
+        .sort_by([('scrape_date', 'ascending'), ('channel', 'ascending')])
+    )
+
+def parse_args(argv=None):
+    """Parse lake query options."""
+    parser = argparse.ArgumentParser(description="Ad-hoc queries over the Parquet lake, without Postgres.")
+    parser.add_argument('--channels', nargs='+')
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat)
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat)
+    parser.add_argument('--text', help="case-insensitive substring of the message text")
+    parser.add_argument('--columns', nargs='+', help="columns to export with --output (default: all)")
+    parser.add_argument('--output', type=Path, help="write matching rows to a .parquet or .csv file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Print per-channel daily counts, or export the matching rows."""
+    args = parse_args(argv)
+    filters = dict(channels=args.channels, date_from=args.date_from, date_to=args.date_to, text=args.text)
+
+    if args.output:
+        table = read_lake(columns=args.columns, **filters)
+        if args.output.suffix == '.csv':
+            import pyarrow.csv as pcsv
+            pcsv.write_csv(table, args.output)
+        else:
+            pq.write_table(table, args.output, compression='zstd')
+        print(f"Wrote {table.num_rows} rows to {args.output}")
+        return
+
+    # Only the columns the summary needs are read from disk
+    summary = daily_summary(read_lake(columns=['channel', 'scrape_date', 'message_id', 'has_image'], **filters))
+    print(f"{'scrape_date':<12} {'channel':<24} {'messages':>9} {'images':>7}")
+    for row in summary.to_pylist():
+        print(f"{row['scrape_date'].isoformat():<12} {row['channel']:<24} {row['messages']:>9} {row['images']:>7}")
+
+if __name__ == "__main__":
+    sys.exit(main())
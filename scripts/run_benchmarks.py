@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+import psycopg2
+
+from load_to_postgres import (
+    db_params, create_raw_table, create_manifest_table, fetch_manifest, lake_files, plan_files, load_files
+)
+from enrich_with_yolo import MODEL_VERSION, create_classifications_table, enrich_images
+from detectors import Detector
+from generate_synthetic_data import (
+    CLASSIFICATION_COLUMNS, DETECTION_SETS, SCALES, SYNTHETIC_DIR, SYNTHETIC_ID_END, SYNTHETIC_ID_OFFSET, generate
+)
+from benchmark_dbt import timed_dbt
+from benchmark_api import run_load, timed_get
+
+RESULTS_DIR = Path('data/benchmarks')
+STAGES = ('generate', 'load', 'enrich', 'dbt', 'api')
+
+
+class StubDetector(Detector):
+    """Detector stand-in: returns the detections encoded in a synthetic image's red channel.
+
+    Exercises the decode, batching and insert stages of the enrichment pipeline
+    without loading a model, and reproduces the generator's classifications.csv.
+    """
+
+    def __init__(self):
+        self.model_version = MODEL_VERSION
+
+    def detect(self, images):
+        # Images are decoded as BGR arrays
+        return [list(DETECTION_SETS[int(image[0, 0, 2])]) for image in images]
+
+# ------------------------------
+# Setup
+# ------------------------------
+def prepare_dataset(data_dir, messages, seed, workers, regenerate=False):
+    """Reuse a generated lake with matching parameters, else (re)generate it; returns (summary, seconds)."""
+    manifest = data_dir / 'synthetic.json'
+    if manifest.exists() and not regenerate:
+        with open(manifest, encoding='utf-8') as f:
+            summary = json.load(f)
+        if summary['messages'] == messages and summary['seed'] == seed:
+            return summary, None
+    if manifest.exists():
+        # Only ever delete a directory this generator wrote
+        shutil.rmtree(data_dir)
+    start = time.perf_counter()
+    summary = generate(data_dir, messages=messages, seed=seed, workers=workers)
+    return summary, time.perf_counter() - start
+
+def clear_synthetic_rows(conn, data_dir):
+    """Remove synthetic messages, classifications and manifest entries from earlier runs."""
+    ids = (SYNTHETIC_ID_OFFSET, SYNTHETIC_ID_END)
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM raw.image_classifications WHERE message_id >= %s AND message_id < %s", ids)
+        cur.execute("DELETE FROM raw.image_enrichment_log WHERE message_id >= %s AND message_id < %s", ids)
+        cur.execute("DELETE FROM raw.telegram_messages WHERE message_id >= %s AND message_id < %s", ids)
+        cur.execute("DELETE FROM raw.load_manifest WHERE file_path LIKE %s", (f"{data_dir}/%",))
+    conn.commit()
+
+def load_classifications(conn, data_dir):
+    """COPY the generator's expected classifications into raw.image_classifications; returns rows copied."""
+    rows = 0
+    with conn.cursor() as cur:
+        for csv_file in sorted(Path(data_dir).glob('*/*/classifications.csv')):
+            with open(csv_file, encoding='utf-8') as f:
+                cur.copy_expert(
+                    f"COPY raw.image_classifications ({', '.join(CLASSIFICATION_COLUMNS)}) "
+                    "FROM STDIN WITH (FORMAT csv, HEADER true)",
+                    f
+                )
+            rows += cur.rowcount
+    conn.commit()
+    return rows
+
+# ------------------------------
+# Stages: each returns a dict of measurements
+# ------------------------------
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+def bench_load(conn, data_dir, workers):
+    start = time.perf_counter()
+    pending = plan_files(lake_files('json', data_dir=data_dir), fetch_manifest(conn), conn, full_refresh=True)
+    summary = load_files(pending, conn, bulk=True, workers=workers)
+    seconds = time.perf_counter() - start
+    if summary['failed']:
+        raise RuntimeError(f"{summary['failed']} file(s) failed to load; see scripts/logs/loading.log")
+    return {'seconds': round(seconds, 3), **summary, 'rows_per_sec': rate(summary['inserted'], seconds)}
+
+def bench_enrich(conn, data_dir, channels, classifications, batch_size):
+    start = time.perf_counter()
+    if classifications == 'csv':
+        rows = load_classifications(conn, data_dir)
+        seconds = time.perf_counter() - start
+        return {'mode': 'csv', 'seconds': round(seconds, 3), 'detections': rows, 'rows_per_sec': rate(rows, seconds)}
+    totals = {'images': 0, 'detections': 0, 'reused': 0, 'failed': 0}
+    detector = StubDetector()
+    # One channel at a time keeps the stub away from any real, unenriched images
+    for channel in channels:
+        stats = enrich_images(conn, detector, channel=channel, batch_size=batch_size)
+        for key in totals:
+            totals[key] += stats[key]
+    seconds = time.perf_counter() - start
+    return {'mode': 'stub', 'seconds': round(seconds, 3), **totals, 'images_per_sec': rate(totals['images'], seconds)}
+
+def bench_dbt():
+    return {
+        'seed_seconds': round(timed_dbt('seed'), 3),
+        'full_refresh_seconds': round(timed_dbt('run', '--full-refresh'), 3),
+        'incremental_noop_seconds': round(timed_dbt('run'), 3),
+        'test_seconds': round(timed_dbt('test'), 3)
+    }
+
+def api_paths(dataset):
+    channel = dataset['channels'][0]
+    first_day = date.fromisoformat(dataset['start_date'])
+    last_day = first_day + timedelta(days=min(dataset['days'], 7) - 1)
+    return [
+        '/api/reports/top-products?limit=10',
+        f"/api/channels/{channel}/activity?from={first_day}&to={last_day}",
+        '/api/channels/compare?granularity=week&' + '&'.join(f"channels={c}" for c in dataset['channels']),
+        '/api/search/messages?query=paracetamol',
+        f"/api/export/messages?format=ndjson&channel={channel}&from={first_day}&to={first_day}"
+    ]
+
+def bench_api(base_url, paths, requests, concurrency):
+    if timed_get(base_url.rstrip('/') + '/openapi.json')[1] != 200:
+        return {'skipped': f"API not reachable at {base_url}"}
+    return {
+        'base_url': base_url,
+        'results': [run_load(base_url, path, requests, level) for path in paths for level in concurrency]
+    }
+
+# ------------------------------
+# Runner
+# ------------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+def run_stage(results, name, func, *args):
+    """Run one stage, recording its measurements or its error without stopping the run."""
+    print(f"== {name}", flush=True)
+    try:
+        results[name] = func(*args)
+    except Exception as e:
+        results[name] = {'error': f"{type(e).__name__}: {e}"}
+    print(json.dumps(results[name]), flush=True)
+
+def parse_args(argv=None):
+    """Parse benchmark runner options."""
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark on synthetic data. Run against a scratch database: the marts are rebuilt."
+    )
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', choices=SCALES, default='10k')
+    size.add_argument('--messages', type=int, help="exact message count (overrides --scale)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', type=Path, default=SYNTHETIC_DIR)
+    parser.add_argument('--regenerate', action='store_true', help="regenerate the synthetic lake even if it matches")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--workers', type=int, default=4, help="generator and loader processes")
+    parser.add_argument(
+        '--classifications', choices=('stub', 'csv'), default='stub',
+        help="run enrichment with the stub detector, or COPY the generated classifications"
+    )
+    parser.add_argument('--batch-size', type=int, default=16, help="images per stub inference batch")
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--output', type=Path, help=f"results file (default: {RESULTS_DIR}/<scale>-<timestamp>.json)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Generate (or reuse) synthetic data, time each stage and write the results as JSON."""
+    args = parse_args(argv)
+    messages = args.messages or SCALES[args.scale]
+    started_at = datetime.now(timezone.utc)
+    stages = {}
+
+    dataset, generate_seconds = prepare_dataset(args.data_dir, messages, args.seed, args.workers, args.regenerate)
+    if 'generate' in args.stages:
+        stages['generate'] = {'reused': generate_seconds is None, 'seconds': generate_seconds and round(generate_seconds, 3)}
+
+    conn = psycopg2.connect(**db_params)
+    try:
+        create_raw_table(conn)
+        create_manifest_table(conn)
+        create_classifications_table(conn)
+        if 'load' in args.stages:
+            clear_synthetic_rows(conn, args.data_dir)
+            run_stage(stages, 'load', bench_load, conn, args.data_dir, args.workers)
+        if 'enrich' in args.stages:
+            run_stage(
+                stages, 'enrich', bench_enrich,
+                conn, args.data_dir, dataset['channels'], args.classifications, args.batch_size
+            )
+    finally:
+        conn.close()
+    if 'dbt' in args.stages:
+        run_stage(stages, 'dbt', bench_dbt)
+    if 'api' in args.stages:
+        run_stage(stages, 'api', bench_api, args.base_url, api_paths(dataset), args.requests, args.concurrency)
+
+    report = {
+        'started_at': started_at.isoformat(),
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'environment': environment(),
+        'dataset': dataset,
+        'stages': stages
+    }
+    output = args.output or RESULTS_DIR / f"{args.messages or args.scale}-{started_at:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+    return 1 if any('error' in result for result in stages.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,95 +1,334 @@
 import os
 import json
-import logging
-from datetime import datetime
+import asyncio
+import argparse
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError, FloodWaitError
 from dotenv import load_dotenv
 
+from pipeline_metrics import record_stage, push_metrics
+from log_files import file_logger
+from channels import CHANNELS
+
 # === Load .env ===
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
-API_ID = int(os.getenv("TELEGRAM_API_ID"))
+API_ID = int(os.getenv("TELEGRAM_API_ID", "0"))
 API_HASH = os.getenv("TELEGRAM_API_HASH")
 PHONE = os.getenv("TELEGRAM_PHONE")
 
 # === Setup Directories ===
 DATA_DIR = Path('data/raw/telegram_messages')
-LOG_DIR = Path('scripts/logs')
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+STATE_DIR = Path('data/raw/scrape_state')
 
 # === Setup Logging ===
-logging.basicConfig(
-    filename=LOG_DIR / 'scraping.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-# === Channels ===
-CHANNELS = [
-    'Chemed123',
-    'lobelia4cosmetics',
-    'tikvahpharma'
-]
-
-async def scrape_channel(client, channel):
-    """Scrape messages + images from a Telegram channel."""
-    try:
-        entity = await client.get_entity(channel)
-        channel_name = entity.username or entity.title
-        logger.info(f"Scraping channel: {channel_name}")
-
-        # Create output dir: YYYY-MM-DD
-        date_str = datetime.now().strftime('%Y-%m-%d')
-        output_dir = DATA_DIR / date_str / channel_name
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        messages_data = []
-        async for message in client.iter_messages(entity, limit=50):
-            msg_data = {
-                'message_id': message.id,
-                'channel': channel_name,
-                'scrape_date': date_str,
-                'message_date': message.date.isoformat(),
-                'sender_id': message.sender_id,
-                'text': message.text,
-                'has_image': bool(message.photo),
-                'image_file': None
-            }
-
-            if message.photo:
-                image_path = output_dir / f"{channel_name}_{message.id}.jpg"
-                await client.download_media(message.photo, image_path)
+logger = file_logger(__name__, 'scraping.log')
+
+# === Concurrency ===
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("SCRAPER_MAX_DOWNLOADS", "4"))
+MAX_FLOOD_RETRIES = int(os.getenv("SCRAPER_MAX_FLOOD_RETRIES", "3"))
+
+async def with_flood_retry(func, *args, label='', retries=MAX_FLOOD_RETRIES):
+    """Await func(*args), sleeping for the requested time and retrying on FloodWaitError."""
+    for attempt in range(retries + 1):
+        try:
+            return await func(*args)
+        except FloodWaitError as e:
+            if attempt == retries:
+                raise
+            logger.warning(
+                f"Rate limit hit for {label}: waiting {e.seconds} seconds "
+                f"(retry {attempt + 1}/{retries})"
+            )
+            await asyncio.sleep(e.seconds)
+
+
+class MediaDownloader:
+    """Bounded download queue served by a fixed number of workers.
+
+    ``submit`` blocks while the queue is full, so a channel with thousands of
+    photos cannot run ahead of the downloads, and at most ``max_concurrent``
+    downloads are in flight across all channels.
+    """
+
+    def __init__(self, client, max_concurrent=MAX_CONCURRENT_DOWNLOADS):
+        self.client = client
+        self.queue = asyncio.Queue(maxsize=max_concurrent * 4)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(max_concurrent)]
+
+    async def submit(self, media, path):
+        """Queue a download and return a future resolving to the saved path."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((media, path, future))
+        return future
+
+    async def _worker(self):
+        while True:
+            media, path, future = await self.queue.get()
+            try:
+                await with_flood_retry(self.client.download_media, media, path, label=str(path))
+                future.set_result(path)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def close(self):
+        """Wait for queued downloads to finish, then stop the workers."""
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+# === Per-channel high-water marks ===
+CHECKPOINT_EVERY = int(os.getenv("SCRAPER_CHECKPOINT_EVERY", "200"))
+# Runs that retry a message whose image failed to download before saving it without
+MAX_MEDIA_RETRIES = int(os.getenv("SCRAPER_MAX_MEDIA_RETRIES", "3"))
+
+def load_state(channel_name):
+    """Return the saved scrape state for a channel, or {} on the first run."""
+    state_file = STATE_DIR / f"{channel_name}.json"
+    if not state_file.exists():
+        return {}
+    with open(state_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(channel_name, last_message_id, media_retries=None):
+    """Atomically persist the highest message_id whose data is on disk.
+
+    ``media_retries`` counts, per message_id, the runs whose image download failed.
+    """
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = STATE_DIR / f"{channel_name}.json"
+    tmp_file = state_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'last_message_id': last_message_id,
+            'media_retries': media_retries or {},
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }, f)
+    os.replace(tmp_file, state_file)
+
+# === Output formats ===
+OUTPUT_FORMATS = ('json', 'jsonl')
+
+def append_messages(messages_data, output_file, output_format='jsonl'):
+    """Append messages to a channel file: JSON Lines are appended, JSON arrays rewritten atomically."""
+    if output_format == 'jsonl':
+        with open(output_file, 'a', encoding='utf-8') as f:
+            for msg_data in messages_data:
+                f.write(json.dumps(msg_data, ensure_ascii=False))
+                f.write('\n')
+        return
+
+    existing = []
+    if output_file.exists():
+        with open(output_file, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+    tmp_file = output_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(existing + messages_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+
+async def checkpoint(channel_name, pending, output_file, output_format='jsonl', last_message_id=0, media_retries=None):
+    """Wait for a chunk's downloads, flush it to disk, then advance the high-water mark.
+
+    The chunk is cut before the first message whose image failed to download,
+    so the next run fetches it again. After MAX_MEDIA_RETRIES failed runs the
+    message is saved without its image. Returns (high-water mark, saved messages).
+    """
+    media_retries = {} if media_retries is None else media_retries
+    futures = [future for _, future in pending if future is not None]
+    results = iter(await asyncio.gather(*futures, return_exceptions=True))
+    saved = len(pending)
+    for index, (msg_data, future) in enumerate(pending):
+        if future is None:
+            continue
+        # Only reference images that actually reached the disk
+        result = next(results)
+        if isinstance(result, Exception):
+            logger.error(f"Error downloading image for message {msg_data['message_id']}: {str(result)}")
+            key = str(msg_data['message_id'])
+            attempts = media_retries.get(key, 0) + 1
+            if index < saved and attempts < MAX_MEDIA_RETRIES:
+                media_retries[key] = attempts
+                saved = index
+            elif index < saved:
+                logger.warning(f"Saving message {key} without its image after {attempts} failed runs")
+        else:
+            msg_data['image_file'] = str(result)
+            logger.info(f"Downloaded image: {result}")
+
+    messages_data = [msg_data for msg_data, _ in pending[:saved]]
+    if messages_data:
+        append_messages(messages_data, output_file, output_format)
+        last_message_id = max(msg_data['message_id'] for msg_data in messages_data)
+    for msg_data in messages_data:
+        media_retries.pop(str(msg_data['message_id']), None)
+    save_state(channel_name, last_message_id, media_retries)
+    return last_message_id, messages_data
+
+async def scrape_channel_once(client, channel, downloader, output_format='jsonl', date_str=None):
+    """Scrape messages newer than the channel's high-water mark, oldest first.
+
+    Files go to the ``date_str`` lake partition (default: today).
+    """
+    start = time.perf_counter()
+    entity = await client.get_entity(channel)
+    channel_name = entity.username or entity.title
+    state = load_state(channel_name)
+    last_message_id = state.get('last_message_id', 0)
+    media_retries = state.get('media_retries', {})
+    logger.info(f"Scraping channel: {channel_name} from message_id > {last_message_id}")
+
+    # Create output dir: YYYY-MM-DD, in UTC like scrape_partition
+    date_str = date_str or current_partition()
+    output_dir = DATA_DIR / date_str / channel_name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{channel_name}.{output_format}"
+
+    pending = []
+    saved = 0
+    images = 0
+    async for message in client.iter_messages(entity, min_id=last_message_id, reverse=True):
+        msg_data = {
+            'message_id': message.id,
+            'channel': channel_name,
+            'scrape_date': date_str,
+            'message_date': message.date.isoformat(),
+            'sender_id': message.sender_id,
+            'text': message.text,
+            'has_image': bool(message.photo),
+            'image_file': None
+        }
+
+        future = None
+        if message.photo:
+            image_path = output_dir / f"{channel_name}_{message.id}.jpg"
+            if image_path.exists() and image_path.stat().st_size > 0:
                 msg_data['image_file'] = str(image_path)
-                logger.info(f"Downloaded image: {image_path}")
+            else:
+                future = await downloader.submit(message.photo, image_path)
+
+        pending.append((msg_data, future))
+        if len(pending) >= CHECKPOINT_EVERY:
+            last_message_id, messages_data = await checkpoint(
+                channel_name, pending, output_file, output_format, last_message_id, media_retries
+            )
+            saved += len(messages_data)
+            images += sum(1 for msg_data in messages_data if msg_data['image_file'])
+            complete = len(messages_data) == len(pending)
+            pending = []
+            if not complete:
+                # Later messages would move the mark past the failed image
+                break
 
-            messages_data.append(msg_data)
+    if pending:
+        last_message_id, messages_data = await checkpoint(
+            channel_name, pending, output_file, output_format, last_message_id, media_retries
+        )
+        saved += len(messages_data)
+        images += sum(1 for msg_data in messages_data if msg_data['image_file'])
+    if media_retries:
+        logger.warning(f"{channel_name}: resuming at message_id > {last_message_id} to retry failed image downloads")
 
-        # Save messages to JSON
-        output_file = output_dir / f"{channel_name}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(messages_data, f, ensure_ascii=False, indent=2)
+    logger.info(f"Saved {saved} new messages to {output_file} (high-water mark {last_message_id})")
+    record_stage('scrape', time.perf_counter() - start, channel_name, messages=saved, images=images)
+    return output_file
 
-        logger.info(f"Saved {len(messages_data)} messages to {output_file}")
 
+async def scrape_channel(client, channel, downloader, output_format='jsonl', date_str=None):
+    """Scrape a channel, backing off and retrying it when Telegram asks us to wait."""
+    try:
+        return await with_flood_retry(
+            scrape_channel_once, client, channel, downloader, output_format, date_str, label=channel
+        )
     except FloodWaitError as e:
-        logger.error(f"Rate limit hit for {channel}: wait {e.seconds} seconds.")
+        logger.error(f"Rate limit hit for {channel}: wait {e.seconds} seconds, giving up.")
     except Exception as e:
         logger.error(f"Error scraping {channel}: {str(e)}")
 
 
-async def main():
+async def scrape_channels(client, channels, output_format='jsonl', max_concurrent=MAX_CONCURRENT_DOWNLOADS, date_str=None):
+    """Scrape all channels concurrently, sharing one bounded media downloader."""
+    downloader = MediaDownloader(client, max_concurrent)
+    try:
+        return await asyncio.gather(
+            *(scrape_channel(client, channel, downloader, output_format, date_str) for channel in channels)
+        )
+    finally:
+        await downloader.close()
+
+
+SESSION_NAME = 'telepharm_session'
+
+def load_session(name=SESSION_NAME):
+    """In-memory copy of a saved login, so parallel processes never share one SQLite session file."""
+    from telethon.sessions import SQLiteSession, StringSession
+    return StringSession(StringSession.save(SQLiteSession(name)))
+
+
+def current_partition():
+    """Today's date partition, in UTC like the Dagster daily partitions."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+async def scrape_partition(channel, date_str, output_format='jsonl', max_concurrent=MAX_CONCURRENT_DOWNLOADS):
+    """Scrape one channel into one date partition without prompting; returns the output file or None.
+
+    Used by the Dagster assets. The session must have been authorised once by
+    running this script interactively.
+
+    Only the current date can be scraped. A scrape starts at the channel's
+    high-water mark, not at ``date_str``, so scraping a past partition would
+    file today's messages under that date and break the loader's
+    earliest-scrape_date-wins dedup.
+    """
+    if date_str != current_partition():
+        raise ValueError(
+            f"Can only scrape the current partition ({current_partition()}), not {date_str}: "
+            "past partitions hold what was scraped that day"
+        )
+    client = TelegramClient(load_session(), API_ID, API_HASH)
+    await client.connect()
+    try:
+        if not await client.is_user_authorized():
+            raise RuntimeError(f"{SESSION_NAME} is not authorised; run scripts/telegram_scraper.py once to log in")
+        results = await scrape_channels(client, [channel], output_format, max_concurrent, date_str)
+        push_metrics('scrape', channel=channel)
+        return results[0]
+    finally:
+        await client.disconnect()
+
+
+def parse_args(argv=None):
+    """Parse scraper command-line options."""
+    parser = argparse.ArgumentParser(description="Scrape Telegram channels into the data lake.")
+    parser.add_argument(
+        '--format', dest='output_format', choices=OUTPUT_FORMATS, default='jsonl',
+        help="jsonl (default) appends one message per line; json keeps one indented array per "
+             "channel, rewritten at every checkpoint"
+    )
+    parser.add_argument(
+        '--max-downloads', type=int, default=MAX_CONCURRENT_DOWNLOADS,
+        help="maximum concurrent media downloads across all channels"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
     """Main orchestration."""
+    args = parse_args(argv)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    async with TelegramClient('telepharm_session', API_ID, API_HASH) as client:
+    async with TelegramClient(SESSION_NAME, API_ID, API_HASH) as client:
         try:
             await client.start(phone=PHONE)
             logger.info("Telegram client started.")
 
-            for channel in CHANNELS:
-                await scrape_channel(client, channel)
+            await scrape_channels(client, CHANNELS, args.output_format, args.max_downloads)
+            push_metrics('scrape')
 
         except SessionPasswordNeededError:
             logger.error("2FA is enabled: please handle password.")
@@ -98,5 +337,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import detectors  # noqa: E402
+from benchmark_detectors import agreement  # noqa: E402
+
+
+def test_label_table_maps_every_class_index():
+    names = {0: 'person', 1: 'bottle', 2: 'cup', 4: 'syringe'}
+    assert detectors.label_table(names) == ['unknown', 'cream', 'bottle', 'unknown', 'syringe']
+    assert detectors.label_table(['bottle', 'dog']) == ['cream', 'unknown']
+
+
+def test_only_quantised_models_get_their_own_version():
+    assert detectors.model_version_for('torch', True) == detectors.MODEL_VERSION
+    assert detectors.model_version_for('onnx', False) == detectors.MODEL_VERSION
+    assert detectors.model_version_for('onnx', True) == f"{detectors.MODEL_VERSION}-int8"
+    assert detectors.load_detector('onnx', True).model_version == f"{detectors.MODEL_VERSION}-int8"
+    with pytest.raises(ValueError):
+        detectors.load_detector('tensorrt')
+
+
+def test_backends_must_implement_detect():
+    class NoDetect(detectors.Detector):
+        def load(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoDetect()
+
+    class Constant(detectors.Detector):
+        def detect(self, images):
+            return [[('pill', 0.9)] for _ in images]
+
+    detector = Constant()
+    assert detector.detect([None, None]) == [[('pill', 0.9)], [('pill', 0.9)]]
+    assert detector.model_version == detectors.MODEL_VERSION
+
+
+def test_agreement_matches_detections_by_label():
+    baseline = [[('cream', 0.9), ('unknown', 0.5)], [], [('pill', 0.8)]]
+    assert agreement(baseline, baseline) == {'exact': 1.0, 'f1': 1.0, 'confidence_mae': 0.0}
+    candidate = [[('unknown', 0.4), ('cream', 0.8)], [('cream', 0.3)], []]
+    result = agreement(baseline, candidate)
+    assert result['exact'] == round(1 / 3, 4)
+    # 2 of 3 candidate detections match 2 of 3 baseline detections
+    assert result['f1'] == round(2 / 3, 4)
+    assert result['confidence_mae'] == pytest.approx(0.1)
@@ -0,0 +1,39 @@
+import os
+import sys
+import stat
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import enrich_with_yolo  # noqa: E402
+
+
+def test_worker_dir_is_private(tmp_path):
+    path = enrich_with_yolo.private_worker_dir(tmp_path / 'run' / 'telepharm')
+    assert stat.S_IMODE(path.stat().st_mode) == 0o700
+    shared = tmp_path / 'shared'
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    with pytest.raises(PermissionError):
+        enrich_with_yolo.private_worker_dir(shared)
+
+
+def test_worker_key_is_random_and_owner_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(enrich_with_yolo, 'WORKER_AUTHKEY', None)
+    key_file = tmp_path / 'worker' / 'yolo.key'
+    with pytest.raises(FileNotFoundError):
+        enrich_with_yolo.worker_authkey(key_file=key_file)
+    key = enrich_with_yolo.worker_authkey(create=True, key_file=key_file)
+    assert len(key) == 32
+    assert stat.S_IMODE(key_file.stat().st_mode) == 0o600
+    assert enrich_with_yolo.worker_authkey(key_file=key_file) == key
+    assert enrich_with_yolo.worker_authkey(create=True, key_file=key_file) != key
+    os.chmod(key_file, 0o644)
+    with pytest.raises(PermissionError):
+        enrich_with_yolo.worker_authkey(key_file=key_file)
+
+
+def test_explicit_authkey_wins(tmp_path, monkeypatch):
+    monkeypatch.setattr(enrich_with_yolo, 'WORKER_AUTHKEY', 's3cret')
+    assert enrich_with_yolo.worker_authkey(key_file=tmp_path / 'missing' / 'yolo.key') == b's3cret'
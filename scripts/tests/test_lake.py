@@ -0,0 +1,87 @@
+import sys
+import json
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import compact_lake  # noqa: E402
+import query_lake  # noqa: E402
+from load_to_postgres import iter_messages, message_row  # noqa: E402
+
+
+def message(message_id, channel, day, text, has_image=False):
+    return {
+        'message_id': message_id,
+        'channel': channel,
+        'scrape_date': day,
+        'message_date': f"{day}T10:{message_id % 60:02d}:00+00:00",
+        'sender_id': -100123,
+        'text': text,
+        'has_image': has_image,
+        'image_file': f"data/raw/{channel}_{message_id}.jpg" if has_image else None
+    }
+
+
+@pytest.fixture
+def lake(tmp_path):
+    raw = tmp_path / 'raw'
+    for day, channel, messages in [
+        ('2025-01-01', 'Chemed123', [message(1, 'Chemed123', '2025-01-01', 'paracetamol 50 birr', True),
+                                     message(2, 'Chemed123', '2025-01-01', 'vitamin C')]),
+        ('2025-01-02', 'Chemed123', [message(3, 'Chemed123', '2025-01-02', 'Paracetamol again')]),
+        ('2025-01-02', 'lobelia4cosmetics', [message(4, 'lobelia4cosmetics', '2025-01-02', 'sunscreen', True)])
+    ]:
+        channel_dir = raw / day / channel
+        channel_dir.mkdir(parents=True)
+        (channel_dir / f"{channel}.json").write_text(json.dumps(messages), encoding='utf-8')
+    # A JSON Lines file repeating message 2 in the same partition is deduplicated
+    (raw / '2025-01-01' / 'Chemed123' / 'Chemed123.jsonl').write_text(
+        json.dumps(message(2, 'Chemed123', '2025-01-01', 'vitamin C')) + '\n', encoding='utf-8'
+    )
+    parquet = tmp_path / 'parquet'
+    assert compact_lake.compact_lake(raw, parquet) == 3
+    return raw, parquet
+
+
+def test_compaction_writes_stable_schema(lake):
+    _, parquet = lake
+    for path in parquet.glob('*/*.parquet'):
+        assert pq.read_schema(path).equals(compact_lake.MESSAGE_SCHEMA)
+    table = pq.read_table(parquet / '2025-01-01' / 'Chemed123.parquet')
+    assert table.column('message_id').to_pylist() == [1, 2]
+
+
+def test_compaction_skips_up_to_date_partitions(lake):
+    raw, parquet = lake
+    assert compact_lake.compact_lake(raw, parquet) == 0
+    assert compact_lake.compact_lake(raw, parquet, force=True) == 3
+
+
+def test_parquet_loads_like_json(lake):
+    raw, parquet = lake
+    from_json = [message_row(m) for m in iter_messages(raw / '2025-01-02' / 'Chemed123' / 'Chemed123.json')]
+    from_parquet = [message_row(m) for m in iter_messages(parquet / '2025-01-02' / 'Chemed123.parquet')]
+    assert len(from_json) == len(from_parquet) == 1
+    json_row, parquet_row = from_json[0], from_parquet[0]
+    assert parquet_row[2] == '2025-01-02'
+    assert datetime.fromisoformat(parquet_row[3]) == datetime(2025, 1, 2, 10, 3)
+    assert parquet_row[:2] + parquet_row[4:] == json_row[:2] + json_row[4:]
+
+
+def test_read_lake_prunes_and_filters(lake):
+    _, parquet = lake
+    assert len(query_lake.lake_files(parquet, channels=['Chemed123'])) == 2
+    assert len(query_lake.lake_files(parquet, date_from=date(2025, 1, 2))) == 2
+
+    table = query_lake.read_lake(columns=['message_id'], text='paracetamol', lake_dir=parquet)
+    assert table.column_names == ['message_id']
+    assert sorted(table.column('message_id').to_pylist()) == [1, 3]
+
+    summary = query_lake.daily_summary(
+        query_lake.read_lake(columns=['channel', 'scrape_date', 'message_id', 'has_image'], lake_dir=parquet)
+    ).to_pylist()
+    assert summary[0] == {'channel': 'Chemed123', 'scrape_date': date(2025, 1, 1), 'messages': 2, 'images': 1}
@@ -0,0 +1,211 @@
+import io
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import load_to_postgres  # noqa: E402
+from load_to_postgres import batched, copy_buffer, iter_json_array, iter_messages, message_row  # noqa: E402
+
+
+def message(message_id, text='paracetamol 50 birr', has_image=False):
+    return {
+        'message_id': message_id,
+        'channel': 'Chemed123',
+        'scrape_date': '2025-01-01',
+        'message_date': '2025-01-01T10:00:00+00:00',
+        'sender_id': -100123,
+        'text': text,
+        'has_image': has_image,
+        'image_file': f"data/raw/Chemed123_{message_id}.jpg" if has_image else None
+    }
+
+
+def read_array(text, chunk_size):
+    return list(iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 1 << 16])
+@pytest.mark.parametrize('text, expected', [
+    ('[1,2.5]', [1, 2.5]),
+    ('[1.5e3]', [1500.0]),
+    ('[ -12 , 3.25E-2 ,true,null ]', [-12, 0.0325, True, None]),
+    ('["a,]", {"b": [1, 2]}, "\\u00e9"]', ['a,]', {'b': [1, 2]}, 'é']),
+])
+def test_json_array_survives_chunk_boundaries(text, expected, chunk_size):
+    assert read_array(text, chunk_size) == expected
+
+
+def test_number_split_at_default_chunk_edge():
+    text = '[' + ' ' * 65533 + '2.5]'
+    assert read_array(text, 1 << 16) == [2.5]
+
+
+@pytest.mark.parametrize('text', ['[]', '  [ \n ]  ', '[\n]'])
+def test_empty_json_array(text):
+    assert read_array(text, 2) == []
+
+
+@pytest.mark.parametrize('text', ['', '{"a": 1}', '[1 2]', '[1,', '[1', '["open', '[1,]', '[1x]'])
+def test_malformed_json_array_raises(text):
+    with pytest.raises(ValueError):
+        read_array(text, 2)
+
+
+def test_batched():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched(range(6), 3)) == [[0, 1, 2], [3, 4, 5]]
+    assert list(batched([], 3)) == []
+
+
+def test_jsonl_reads_like_json(tmp_path):
+    messages = [message(1), message(2, text=None, has_image=True), message(3, text='line\nbreak')]
+    (tmp_path / 'a.json').write_text(json.dumps(messages, indent=2), encoding='utf-8')
+    (tmp_path / 'a.jsonl').write_text(
+        '\n'.join(json.dumps(m) for m in messages) + '\n\n', encoding='utf-8'
+    )
+    assert list(iter_messages(tmp_path / 'a.jsonl')) == list(iter_messages(tmp_path / 'a.json')) == messages
+
+
+def parse_copy_text(text):
+    """Decode COPY text format the way Postgres does, for checking copy_buffer."""
+    escapes = {'\\\\': '\\', '\\t': '\t', '\\n': '\n', '\\r': '\r'}
+    rows = []
+    for line in text.split('\n')[:-1]:
+        row = []
+        for field in line.split('\t'):
+            if field == '\\N':
+                row.append(None)
+                continue
+            value, i = '', 0
+            while i < len(field):
+                if field[i] == '\\':
+                    value += escapes[field[i:i + 2]]
+                    i += 2
+                else:
+                    value += field[i]
+                    i += 1
+            row.append(value)
+        rows.append(row)
+    return rows
+
+
+def test_copy_buffer_round_trips_special_characters():
+    messages = [message(1, text='tab\there\nnew\\line\r'), message(2, text=None, has_image=True)]
+    rows = parse_copy_text(copy_buffer(messages).read())
+    assert len(rows) == 2
+    for row, msg in zip(rows, messages):
+        expected = [None if v is None else str(v) for v in message_row(msg)]
+        assert row == expected
+    assert rows[0][5] == 'tab\there\nnew\\line\r'
+    assert rows[1][7] == 'data/raw/Chemed123_2.jpg'
+
+
+class FakeCursor:
+    """Records COPY input and answers inserts the way RETURNING (xmax = 0) would.
+
+    The table is {message_id: scrape_date}; an earlier scrape_date replaces
+    the stored row, which must not count as an insert.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def merge(self, message_id, scrape_date):
+        table = self.conn.table
+        if message_id not in table:
+            table[message_id] = scrape_date
+            return True
+        if scrape_date < table[message_id]:
+            table[message_id] = scrape_date
+            return False
+        return None
+
+    def execute(self, sql, params=None):
+        if 'INSERT INTO raw.telegram_messages' not in sql:
+            return
+        assert 'RETURNING (xmax = 0)' in sql
+        if sql.lstrip().startswith('WITH merged'):
+            merged = [self.merge(int(row[0]), row[2]) for row in self.conn.staged]
+            self.result = (sum(1 for inserted in merged if inserted),)
+        else:
+            self.conn.order.append(params[0])
+            inserted = self.merge(params[0], params[2])
+            self.result = None if inserted is None else (inserted,)
+
+    def fetchone(self):
+        return self.result
+
+    def copy_expert(self, sql, buffer):
+        self.conn.copies += 1
+        self.conn.staged += parse_copy_text(buffer.read())
+
+
+class FakeConnection:
+    def __init__(self, table=None):
+        self.table = dict(table or {})
+        self.order = []
+        self.staged = []
+        self.copies = 0
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+        self.staged = []
+
+    def rollback(self):
+        self.staged = []
+
+
+@pytest.fixture
+def lake_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_to_postgres, 'upsert_clause', lambda conn: '')
+    path = tmp_path / 'Chemed123.jsonl'
+    path.write_text('\n'.join(json.dumps(message(i)) for i in range(1, 6)) + '\n', encoding='utf-8')
+    return path
+
+
+# Message 2 is already loaded from the same day, message 3 from a later one
+LOADED = {2: '2025-01-01', 3: '2025-01-02'}
+
+
+def test_bulk_loader_counts_only_new_rows(lake_file):
+    conn = FakeConnection(LOADED)
+    assert load_to_postgres.load_json_to_postgres_bulk(lake_file, conn, batch_size=2) == (3, 2)
+    assert conn.copies == 3
+    assert conn.committed
+    assert conn.table[3] == '2025-01-01'
+
+
+def test_row_loader_counts_only_new_rows(lake_file):
+    conn = FakeConnection(LOADED)
+    assert load_to_postgres.load_json_to_postgres(lake_file, conn) == (3, 2)
+    assert conn.table[3] == '2025-01-01'
+
+
+def test_row_loader_locks_rows_in_message_id_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_to_postgres, 'upsert_clause', lambda conn: '')
+    path = tmp_path / 'Chemed123.jsonl'
+    path.write_text('\n'.join(json.dumps(message(i)) for i in (4, 1, 5, 3, 2)) + '\n', encoding='utf-8')
+    conn = FakeConnection()
+    assert load_to_postgres.load_json_to_postgres(path, conn) == (5, 0)
+    assert conn.order == [1, 2, 3, 4, 5]
+
+
+def test_bulk_loader_reports_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_to_postgres, 'upsert_clause', lambda conn: '')
+    path = tmp_path / 'Chemed123.json'
+    path.write_text('[{"message_id": 1}', encoding='utf-8')
+    assert load_to_postgres.load_json_to_postgres_bulk(path, FakeConnection()) is None
@@ -0,0 +1,38 @@
+import sys
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import log_files  # noqa: E402
+
+
+def test_each_module_logs_to_its_own_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_files, 'LOG_DIR', tmp_path)
+    scraper = log_files.file_logger('test_scraper', 'scraping.log')
+    loader = log_files.file_logger('test_loader', 'loading.log')
+    # Attaching twice must not duplicate records
+    assert log_files.file_logger('test_loader', 'loading.log').handlers == loader.handlers
+    scraper.info("scraped")
+    loader.info("loaded")
+    for logger in (scraper, loader):
+        for handler in logger.handlers:
+            handler.flush()
+    assert 'scraped' in (tmp_path / 'scraping.log').read_text()
+    assert 'loaded' not in (tmp_path / 'scraping.log').read_text()
+    assert (tmp_path / 'loading.log').read_text().count('loaded') == 1
+    for logger in (scraper, loader):
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+
+
+def test_importing_scripts_leaves_root_logger_alone():
+    import telegram_scraper  # noqa: F401
+    import load_to_postgres  # noqa: F401
+    import enrich_with_yolo  # noqa: F401
+    # pytest installs its own root handlers; none may point at the scripts' logs
+    assert not any(
+        'scripts/logs' in getattr(h, 'baseFilename', '') for h in logging.getLogger().handlers
+    )
+    assert Path(load_to_postgres.logger.handlers[0].baseFilename).name == 'loading.log'
+    assert Path(enrich_with_yolo.logger.handlers[0].baseFilename).name == 'yolo_enrichment.log'
@@ -0,0 +1,39 @@
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import partitioning  # noqa: E402
+from load_to_postgres import raw_table_ddl  # noqa: E402
+from enrich_with_yolo import classifications_table_ddl  # noqa: E402
+
+
+def test_month_arithmetic_crosses_years():
+    assert partitioning.month_start(datetime(2025, 3, 31, 23, 59)) == date(2025, 3, 1)
+    assert partitioning.add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert partitioning.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert partitioning.partition_name('raw.telegram_messages', date(2025, 2, 1)) == 'raw.telegram_messages_p202502'
+
+
+def test_partitioned_ddl_keys_on_the_partition_column():
+    for ddl, table in (
+        (raw_table_ddl(partitioned=True), 'raw.telegram_messages'),
+        (classifications_table_ddl(partitioned=True), 'raw.image_classifications')
+    ):
+        column, key = partitioning.PARTITIONED_TABLES[table]
+        assert f"PARTITION BY RANGE ({column})" in ddl
+        assert f"PRIMARY KEY ({', '.join(key)})" in ddl
+        assert f"PARTITION OF {table} DEFAULT" in ddl
+        assert f"USING BRIN ({column})" in ddl
+        assert 'REFERENCES' not in ddl
+
+
+def test_plain_ddl_keeps_the_existing_layout():
+    ddl = raw_table_ddl()
+    assert 'message_id BIGINT PRIMARY KEY' in ddl
+    assert 'PARTITION BY' not in ddl
+    assert 'USING BRIN (message_date)' in ddl
+    assert 'REFERENCES raw.telegram_messages(message_id)' in classifications_table_ddl()
+    assert 'REFERENCES' not in classifications_table_ddl(foreign_key=False)
+    # Staging tables for the migration get their own index names
+    assert 'telegram_messages_partitioned_message_date_brin' in raw_table_ddl('raw.telegram_messages_partitioned', True)
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pipeline_metrics  # noqa: E402
+
+
+def sample(name, **labels):
+    return pipeline_metrics.registry.get_sample_value(name, labels)
+
+
+def test_record_stage_sets_duration_counts_and_throughput():
+    pipeline_metrics.record_stage('load', 2.0, 'Chemed123', inserted=500, failed=0)
+    assert sample('telepharm_pipeline_stage_duration_seconds', stage='load', channel='Chemed123') == 2.0
+    assert sample('telepharm_pipeline_stage_items', stage='load', channel='Chemed123', item='inserted') == 500
+    assert sample('telepharm_pipeline_stage_items_per_second', stage='load', channel='Chemed123', item='inserted') == 250
+    assert sample('telepharm_pipeline_stage_last_success_timestamp_seconds', stage='load', channel='Chemed123') > 0
+
+
+def test_timed_stage_skips_failed_stages():
+    with pytest.raises(RuntimeError):
+        with pipeline_metrics.timed_stage('scrape', 'never_recorded') as items:
+            items['messages'] = 10
+            raise RuntimeError("boom")
+    assert sample('telepharm_pipeline_stage_duration_seconds', stage='scrape', channel='never_recorded') is None
+
+
+def test_push_metrics_writes_textfile(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_metrics, 'METRICS_DIR', tmp_path)
+    with pipeline_metrics.timed_stage('enrich', 'lobelia4cosmetics') as items:
+        items['images'] = 3
+    pipeline_metrics.push_metrics('enrich', channel='lobelia4cosmetics')
+    text = (tmp_path / 'enrich_lobelia4cosmetics.prom').read_text()
+    assert 'telepharm_pipeline_stage_items{channel="lobelia4cosmetics",item="images",stage="enrich"} 3.0' in text
@@ -0,0 +1,98 @@
+import sys
+import csv
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import run_benchmarks  # noqa: E402
+import generate_synthetic_data as synthetic  # noqa: E402
+from load_to_postgres import iter_messages  # noqa: E402
+from test_synthetic_data import png_pixel  # noqa: E402
+
+
+class DecodedPixel:
+    """The one pixel StubDetector reads from a decoded BGR image."""
+
+    def __init__(self, rgb):
+        self.bgr = rgb[::-1]
+
+    def __getitem__(self, index):
+        assert index[:2] == (0, 0)
+        return self.bgr[index[2]]
+
+
+def partition_files(root):
+    return {p.relative_to(root): p.read_bytes() for p in sorted(root.rglob('*')) if p.is_file()}
+
+
+@pytest.fixture
+def partition(tmp_path):
+    synthetic.generate_partition(tmp_path, '2025-01-01', 'synthetic_0', synthetic.SYNTHETIC_ID_OFFSET, 200, seed=3)
+    return tmp_path / '2025-01-01' / 'synthetic_0'
+
+
+def expected_detections(channel_dir):
+    with open(channel_dir / 'classifications.csv', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    expected = {}
+    for row in rows:
+        expected.setdefault(row['image_file'], []).append((row['object_class'], float(row['confidence'])))
+    return expected
+
+
+def test_partition_regenerates_byte_identical(tmp_path, partition):
+    first = partition_files(tmp_path)
+    assert any(path.suffix == '.png' for path in first)
+    synthetic.generate_partition(tmp_path, '2025-01-01', 'synthetic_0', synthetic.SYNTHETIC_ID_OFFSET, 200, seed=3)
+    assert partition_files(tmp_path) == first
+
+
+def test_stub_detector_reproduces_classifications(partition):
+    expected = expected_detections(partition)
+    images = [m['image_file'] for m in iter_messages(partition / 'synthetic_0.jsonl') if m['has_image']]
+    detected = run_benchmarks.StubDetector().detect(
+        [DecodedPixel(png_pixel(Path(image).read_bytes())) for image in images]
+    )
+    assert [expected.get(image, []) for image in images] == [list(d) for d in detected]
+
+
+def test_stub_detector_reads_decoded_images(partition):
+    pytest.importorskip('cv2')
+    from enrich_with_yolo import decode_image
+
+    expected = expected_detections(partition)
+    images = [m['image_file'] for m in iter_messages(partition / 'synthetic_0.jsonl') if m['has_image']]
+    detected = run_benchmarks.StubDetector().detect([decode_image(image)[1] for image in images])
+    assert [expected.get(image, []) for image in images] == [list(d) for d in detected]
+
+
+def test_prepare_dataset_reuses_matching_lake(tmp_path):
+    data_dir = tmp_path / 'synthetic'
+    summary, seconds = run_benchmarks.prepare_dataset(data_dir, 60, seed=1, workers=1)
+    assert seconds is not None and summary['totals']['messages'] == 60
+
+    assert run_benchmarks.prepare_dataset(data_dir, 60, seed=1, workers=1) == (summary, None)
+    _, seconds = run_benchmarks.prepare_dataset(data_dir, 60, seed=2, workers=1)
+    assert seconds is not None
+
+
+def test_api_paths_stay_within_generated_dates():
+    dataset = {'channels': ['synthetic_0', 'synthetic_1'], 'start_date': '2025-01-01', 'days': 30}
+    paths = run_benchmarks.api_paths(dataset)
+    assert '/api/channels/synthetic_0/activity?from=2025-01-01&to=2025-01-07' in paths
+    assert any('channels=synthetic_0&channels=synthetic_1' in path for path in paths)
+    short = run_benchmarks.api_paths({**dataset, 'days': 2})
+    assert f"to={date(2025, 1, 2)}" in short[1]
+
+
+def test_failed_stage_is_recorded(capsys):
+    results = {}
+
+    def broken():
+        raise RuntimeError("no database")
+
+    run_benchmarks.run_stage(results, 'load', broken)
+    run_benchmarks.run_stage(results, 'generate', lambda: {'seconds': 1.0})
+    assert results == {'load': {'error': 'RuntimeError: no database'}, 'generate': {'seconds': 1.0}}
@@ -0,0 +1,87 @@
+import sys
+import csv
+import json
+import zlib
+import struct
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import generate_synthetic_data as synthetic  # noqa: E402
+from load_to_postgres import iter_messages  # noqa: E402
+
+
+def png_pixel(data):
+    """First pixel of an uncompressed-filter RGB PNG written by placeholder_png."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    pos, idat = 8, b''
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        if kind == b'IDAT':
+            idat += data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+    raw = zlib.decompress(idat)
+    return tuple(raw[1:4])
+
+
+def test_partition_plan_covers_every_message_once():
+    plan = synthetic.partition_plan(1_001, days=4, channels=3, start_date=date(2025, 1, 1))
+    assert len(plan) == 12
+    assert sum(count for *_, count in plan) == 1_001
+    ids = [first + i for _, _, first, count in plan for i in range(count)]
+    assert ids == list(range(synthetic.SYNTHETIC_ID_OFFSET, synthetic.SYNTHETIC_ID_OFFSET + 1_001))
+    assert plan[-1][:2] == ('2025-01-04', 'synthetic_2')
+
+
+def test_generation_is_deterministic(tmp_path):
+    for run in ('a', 'b'):
+        synthetic.generate(tmp_path / run, messages=500, days=2, channels=2, seed=7)
+    files = sorted(p.relative_to(tmp_path / 'a') for p in (tmp_path / 'a').rglob('*') if p.is_file())
+    assert files
+    for path in files:
+        a, b = (tmp_path / 'a' / path).read_bytes(), (tmp_path / 'b' / path).read_bytes()
+        if path.name == 'synthetic.json' or path.suffix in ('.jsonl', '.csv'):
+            # Absolute image paths differ between the two output directories
+            a, b = a.replace(b'/a/', b'/x/'), b.replace(b'/b/', b'/x/')
+        assert a == b, path
+
+
+def test_partition_matches_scraper_layout_and_classifications(tmp_path):
+    stats = synthetic.generate_partition(tmp_path, '2025-01-01', 'synthetic_0', synthetic.SYNTHETIC_ID_OFFSET, 300)
+    channel_dir = tmp_path / '2025-01-01' / 'synthetic_0'
+    messages = list(iter_messages(channel_dir / 'synthetic_0.jsonl'))
+    assert len(messages) == stats['messages'] == 300
+    assert set(messages[0]) == {
+        'message_id', 'channel', 'scrape_date', 'message_date', 'sender_id', 'text', 'has_image', 'image_file'
+    }
+    assert [m['message_date'] for m in messages] == sorted(m['message_date'] for m in messages)
+
+    with open(channel_dir / 'classifications.csv', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == stats['classifications']
+    by_message = {}
+    for row in rows:
+        by_message.setdefault(row['image_file'], []).append((row['object_class'], float(row['confidence'])))
+    for msg in messages:
+        if not msg['has_image']:
+            continue
+        # The red channel selects the detection set the stub detector will return
+        red = png_pixel(Path(msg['image_file']).read_bytes())[0]
+        assert by_message.get(msg['image_file'], []) == synthetic.DETECTION_SETS[red]
+
+
+def test_generate_writes_summary(tmp_path):
+    summary = synthetic.generate(tmp_path, messages=90, days=3, channels=3, image_rate=0)
+    assert summary['totals'] == {'messages': 90, 'images': 0, 'classifications': 0}
+    assert json.loads((tmp_path / 'synthetic.json').read_text())['channels'] == ['synthetic_0', 'synthetic_1', 'synthetic_2']
+
+
+def test_each_channel_has_its_own_sender_id(tmp_path):
+    synthetic.generate(tmp_path, messages=60, days=2, channels=3, image_rate=0)
+    senders = {}
+    for path in tmp_path.glob('*/*/*.jsonl'):
+        for msg in iter_messages(path):
+            senders.setdefault(msg['channel'], set()).add(msg['sender_id'])
+    # sender_id is the channel key in the marts
+    assert all(len(ids) == 1 for ids in senders.values())
+    assert len(set().union(*senders.values())) == 3
@@ -0,0 +1,222 @@
+import sys
+import json
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import ANY
+
+import pytest
+from telethon.errors import FloodWaitError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import telegram_scraper  # noqa: E402
+
+
+class FakeClient:
+    """Telethon stand-in with per-call latency and scripted flood waits."""
+
+    def __init__(self, channels, latency=0.01, download_flood_waits=0, iter_flood_waits=0, crash_after=None):
+        self.channels = channels
+        self.crash_after = crash_after
+        self.latency = latency
+        self.download_flood_waits = download_flood_waits
+        self.iter_flood_waits = iter_flood_waits
+        self.download_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.active_channels = set()
+        self.max_active_channels = 0
+
+    async def get_entity(self, channel):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(username=channel, title=channel)
+
+    async def iter_messages(self, entity, limit=None, min_id=0, reverse=False):
+        if self.iter_flood_waits:
+            self.iter_flood_waits -= 1
+            raise FloodWaitError(request=None, capture=0)
+        self.active_channels.add(entity.username)
+        self.max_active_channels = max(self.max_active_channels, len(self.active_channels))
+        message_ids = range(min_id + 1, self.channels[entity.username] + 1)
+        try:
+            for yielded, message_id in enumerate(message_ids if reverse else reversed(message_ids)):
+                if self.crash_after is not None and yielded == self.crash_after:
+                    raise ConnectionError("connection dropped")
+                await asyncio.sleep(self.latency)
+                yield SimpleNamespace(
+                    id=message_id,
+                    date=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                    sender_id=-100,
+                    text=f"message {message_id}",
+                    photo=object() if message_id % 2 else None
+                )
+        finally:
+            self.active_channels.discard(entity.username)
+
+    async def download_media(self, media, path):
+        self.download_calls += 1
+        if self.download_flood_waits:
+            self.download_flood_waits -= 1
+            raise FloodWaitError(request=None, capture=0)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency * 5)
+            Path(path).write_bytes(b'\xff\xd8\xff\xd9')
+        finally:
+            self.in_flight -= 1
+        return path
+
+
+@pytest.fixture(autouse=True)
+def lake(tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_scraper, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(telegram_scraper, 'STATE_DIR', tmp_path / '_state')
+    return tmp_path
+
+
+def read_channel(tmp_path, channel, output_format='jsonl'):
+    files = list(tmp_path.glob(f"*/{channel}/{channel}.{output_format}"))
+    assert len(files) == 1
+    text = files[0].read_text(encoding='utf-8')
+    if output_format == 'json':
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_channels_scraped_concurrently_with_bounded_downloads(tmp_path):
+    client = FakeClient({'chan_a': 10, 'chan_b': 10, 'chan_c': 10})
+
+    await telegram_scraper.scrape_channels(client, list(client.channels), max_concurrent=2)
+
+    assert client.max_active_channels > 1
+    assert 1 < client.max_in_flight <= 2
+    for channel in client.channels:
+        messages = read_channel(tmp_path, channel)
+        assert len(messages) == 10
+        for msg in messages:
+            assert msg['has_image'] == (msg['image_file'] is not None)
+            if msg['image_file']:
+                assert Path(msg['image_file']).exists()
+
+
+@pytest.mark.asyncio
+async def test_download_flood_wait_is_retried(tmp_path):
+    client = FakeClient({'chan_a': 2}, download_flood_waits=2)
+
+    await telegram_scraper.scrape_channels(client, ['chan_a'], max_concurrent=1)
+
+    messages = read_channel(tmp_path, 'chan_a')
+    assert messages[0]['image_file'] is not None
+    assert client.download_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_channel_flood_wait_is_retried(tmp_path):
+    client = FakeClient({'chan_a': 3}, iter_flood_waits=1)
+
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+
+    assert len(read_channel(tmp_path, 'chan_a')) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_image_is_retried_next_run(tmp_path):
+    client = FakeClient({'chan_a': 3}, download_flood_waits=telegram_scraper.MAX_FLOOD_RETRIES + 1)
+
+    await telegram_scraper.scrape_channels(client, ['chan_a'], max_concurrent=1)
+
+    # Message 1's image failed: nothing past it is saved or checkpointed
+    assert not list(tmp_path.glob('*/chan_a/chan_a.jsonl'))
+    assert telegram_scraper.load_state('chan_a') == {
+        'last_message_id': 0, 'media_retries': {'1': 1}, 'updated_at': ANY
+    }
+
+    await telegram_scraper.scrape_channels(client, ['chan_a'], max_concurrent=1)
+
+    messages = read_channel(tmp_path, 'chan_a')
+    assert [msg['message_id'] for msg in messages] == [1, 2, 3]
+    assert all(msg['image_file'] for msg in messages if msg['has_image'])
+    assert telegram_scraper.load_state('chan_a')['media_retries'] == {}
+
+
+@pytest.mark.asyncio
+async def test_download_gives_up_after_max_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_scraper, 'MAX_MEDIA_RETRIES', 2)
+    client = FakeClient({'chan_a': 1}, download_flood_waits=100)
+
+    await telegram_scraper.scrape_channels(client, ['chan_a'], max_concurrent=1)
+    assert telegram_scraper.load_state('chan_a')['last_message_id'] == 0
+    await telegram_scraper.scrape_channels(client, ['chan_a'], max_concurrent=1)
+
+    messages = read_channel(tmp_path, 'chan_a')
+    assert messages[0]['has_image'] is True
+    assert messages[0]['image_file'] is None
+    assert telegram_scraper.load_state('chan_a')['last_message_id'] == 1
+
+
+@pytest.mark.asyncio
+async def test_second_run_fetches_only_new_messages(tmp_path):
+    client = FakeClient({'chan_a': 4})
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+    downloads = client.download_calls
+
+    client.channels['chan_a'] = 6
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+
+    messages = read_channel(tmp_path, 'chan_a')
+    assert [msg['message_id'] for msg in messages] == [1, 2, 3, 4, 5, 6]
+    assert client.download_calls == downloads + 1
+    assert telegram_scraper.load_state('chan_a')['last_message_id'] == 6
+
+
+@pytest.mark.asyncio
+async def test_crash_mid_channel_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_scraper, 'CHECKPOINT_EVERY', 3)
+    client = FakeClient({'chan_a': 10}, crash_after=7)
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+
+    assert telegram_scraper.load_state('chan_a')['last_message_id'] == 6
+    assert len(read_channel(tmp_path, 'chan_a')) == 6
+
+    client.crash_after = None
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+
+    messages = read_channel(tmp_path, 'chan_a')
+    assert [msg['message_id'] for msg in messages] == list(range(1, 11))
+
+
+@pytest.mark.asyncio
+async def test_existing_images_are_not_downloaded_again(tmp_path):
+    client = FakeClient({'chan_a': 3})
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+    assert client.download_calls == 2
+
+    (tmp_path / '_state' / 'chan_a.json').unlink()
+    for data_file in tmp_path.glob('*/chan_a/chan_a.jsonl'):
+        data_file.unlink()
+    await telegram_scraper.scrape_channels(client, ['chan_a'])
+
+    assert client.download_calls == 2
+    assert all(msg['image_file'] for msg in read_channel(tmp_path, 'chan_a') if msg['has_image'])
+
+
+@pytest.mark.asyncio
+async def test_json_format_keeps_one_array(tmp_path, monkeypatch):
+    monkeypatch.setattr(telegram_scraper, 'CHECKPOINT_EVERY', 3)
+    client = FakeClient({'chan_a': 7})
+    await telegram_scraper.scrape_channels(client, ['chan_a'], output_format='json')
+
+    messages = read_channel(tmp_path, 'chan_a', 'json')
+    assert [msg['message_id'] for msg in messages] == list(range(1, 8))
+
+
+def test_scrape_partition_refuses_past_dates(monkeypatch):
+    def no_client(*args, **kwargs):
+        raise AssertionError("must not connect for a past partition")
+    monkeypatch.setattr(telegram_scraper, 'TelegramClient', no_client)
+    with pytest.raises(ValueError, match="current partition"):
+        asyncio.run(telegram_scraper.scrape_partition('Chemed123', '2025-01-01'))
+    assert telegram_scraper.current_partition() == datetime.now(timezone.utc).strftime('%Y-%m-%d')